@@ -0,0 +1,262 @@
+"""
+Local stand-in for the Discord API, so senders can be benchmarked without a bot token or real rate limits.
+Implements creating DM channels and channel messages with configurable latency, per route buckets,
+a global limit and injected 429 responses, using the same headers as Discord. Like on Discord, limits and DM channels
+are per bot token.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeDiscordServer:
+    """
+    Serves POST users/@me/channels and POST channels/{channel_id}/messages, including attachments,
+    in a background thread.
+    Every channel gets a bucket of bucket_limit requests per bucket_reset_after seconds, and all requests of a bot
+    share a global limit per second. Received messages are recorded with the time they arrived.
+    """
+    API_VERSION = 'v10'
+
+    __latency: float
+    __bucket_limit: int
+    __bucket_reset_after: float
+    __global_limit: Optional[int]
+    __inject_429_rate: float
+    __injected_retry_after: float
+    __buckets: dict[tuple[str, str], list]
+    __global_windows: dict[str, list]
+    __bots: dict[str, int]
+    __loop: Optional[asyncio.AbstractEventLoop]
+    __runner: Optional[web.AppRunner]
+    __port: Optional[int]
+
+    messages: list[tuple[float, str, dict]]
+    stats: dict
+
+    def __init__(
+            self,
+            latency: float = 0.0,
+            bucket_limit: int = 5,
+            bucket_reset_after: float = 5.0,
+            global_limit: Optional[int] = 50,
+            inject_429_rate: float = 0.0,
+            injected_retry_after: float = 0.1
+    ):
+        """
+        :param latency: Seconds every request takes
+        :param bucket_limit: The number of messages per channel per window
+        :param bucket_reset_after: The length of the window of the channel buckets in seconds
+        :param global_limit: The number of requests per second over all routes, no global limit if None
+        :param inject_429_rate: Fraction of the requests that is rate limited regardless of the buckets
+        :param injected_retry_after: The retry_after of injected rate limits
+        """
+        self.__latency = latency
+        self.__bucket_limit = bucket_limit
+        self.__bucket_reset_after = bucket_reset_after
+        self.__global_limit = global_limit
+        self.__inject_429_rate = inject_429_rate
+        self.__injected_retry_after = injected_retry_after
+        self.__buckets = {}
+        self.__global_windows = {}
+        self.__bots = {}
+        self.__loop = None
+        self.__runner = None
+        self.__port = None
+
+        self.messages = []
+        self.stats = {
+            'requests': 0,
+            'dm_channels': 0,
+            'messages': 0,
+            'rate_limited': 0,
+            'global_rate_limited': 0,
+            'attachments': 0,
+            'requests_per_bot': {}
+        }
+
+    @property
+    def base_url(self) -> str:
+        """
+        :return: The base url to use as DiscordHttpClient.DISCORD_API_BASE_URL
+        """
+        return f'http://127.0.0.1:{self.__port}/api'
+
+    def start(self) -> 'FakeDiscordServer':
+        """
+        Start serving on a free port in a background thread
+
+        :return: This instance
+        """
+        started = threading.Event()
+
+        def serve() -> None:
+            self.__loop = asyncio.new_event_loop()
+            self.__loop.run_until_complete(self.__start())
+            started.set()
+            self.__loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        started.wait()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop serving
+        """
+        if self.__loop is not None:
+            asyncio.run_coroutine_threadsafe(self.__runner.cleanup(), self.__loop).result()
+            self.__loop.call_soon_threadsafe(self.__loop.stop)
+            self.__loop = None
+
+    async def __start(self) -> None:
+        """
+        Set up the application on the loop of the server thread
+        """
+        app = web.Application()
+        app.router.add_post(f'/api/{self.API_VERSION}/users/@me/channels', self.__create_dm)
+        app.router.add_post(f'/api/{self.API_VERSION}/channels/{{channel_id}}/messages', self.__create_message)
+
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        await web.TCPSite(self.__runner, '127.0.0.1', 0).start()
+        self.__port = self.__runner.addresses[0][1]
+
+    async def __create_dm(self, request: web.Request) -> web.Response:
+        """
+        Create a DM channel, of which the id is derived from the bot and the user id
+        """
+        bot = self.__get_bot(request)
+        limited = await self.__handle_limits(bot, None)
+        if limited is not None:
+            return limited
+
+        recipient_id = (await request.json())['recipient_id']
+        self.stats['dm_channels'] += 1
+        return web.json_response({'id': f'dm-{bot}-{recipient_id}', 'type': 1})
+
+    async def __create_message(self, request: web.Request) -> web.Response:
+        """
+        Record a message, limited by the bucket of the channel. DM channels can only be used by the bot that made them.
+        """
+        bot = self.__get_bot(request)
+        channel_id = request.match_info['channel_id']
+        limited = await self.__handle_limits(bot, channel_id)
+        if limited is not None:
+            return limited
+
+        if channel_id.startswith('dm-') and channel_id.split('-')[1] != bot:
+            return web.json_response({'message': 'Missing Access', 'code': 50001}, status=403)
+
+        bucket = self.__get_bucket(bot, channel_id, time.monotonic())
+        bucket[1] += 1
+        payload = await self.__read_multipart(request) if request.content_type.startswith('multipart/') \
+            else await request.json()
+        self.messages.append((time.perf_counter(), channel_id, payload))
+        self.stats['messages'] += 1
+
+        return web.json_response(
+            {'id': str(len(self.messages)), 'channel_id': channel_id},
+            headers=self.__get_bucket_headers(channel_id, bucket)
+        )
+
+    async def __read_multipart(self, request: web.Request) -> dict:
+        """
+        Read a message with attachments
+
+        :param request: The multipart request
+        :return: The payload_json, with the text of the attached files by filename as 'files'
+        """
+        payload = {}
+        files = {}
+        reader = await request.multipart()
+        while (part := await reader.next()) is not None:
+            if part.name == 'payload_json':
+                payload = json.loads(await part.text())
+            else:
+                files[part.filename] = (await part.read()).decode()
+                self.stats['attachments'] += 1
+
+        return {**payload, 'files': files}
+
+    async def __handle_limits(self, bot: str, channel_id: Optional[str]) -> Optional[web.Response]:
+        """
+        Simulate the latency and check the rate limits of a request
+
+        :param bot: The bot making the request
+        :param channel_id: The channel of the request, None for routes without a bucket
+        :return: A 429 response if the request is rate limited, else None
+        """
+        self.stats['requests'] += 1
+        self.stats['requests_per_bot'][bot] = self.stats['requests_per_bot'].get(bot, 0) + 1
+        if self.__latency:
+            await asyncio.sleep(self.__latency)
+
+        now = time.monotonic()
+        if self.__global_limit is not None:
+            global_window = self.__global_windows.get(bot)
+            if global_window is None or now >= global_window[0] + 1.0:
+                global_window = self.__global_windows[bot] = [now, 0]
+            global_window[1] += 1
+            if global_window[1] > self.__global_limit:
+                self.stats['global_rate_limited'] += 1
+                retry_after = global_window[0] + 1.0 - now
+                return web.json_response(
+                    {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': True},
+                    status=429,
+                    headers={'X-RateLimit-Global': 'true', 'Retry-After': str(retry_after)}
+                )
+
+        if channel_id is None:
+            return None
+
+        bucket = self.__get_bucket(bot, channel_id, now)
+        injected = random.random() < self.__inject_429_rate
+        if not injected and bucket[1] < self.__bucket_limit:
+            return None
+
+        self.stats['rate_limited'] += 1
+        retry_after = self.__injected_retry_after if injected else bucket[0] + self.__bucket_reset_after - now
+        return web.json_response(
+            {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False},
+            status=429,
+            headers={**self.__get_bucket_headers(channel_id, bucket), 'Retry-After': str(retry_after)}
+        )
+
+    def __get_bot(self, request: web.Request) -> str:
+        """
+        :param request: The request
+        :return: The number of the bot of the token in the request, numbered in order of appearance
+        """
+        return str(self.__bots.setdefault(request.headers.get('Authorization', ''), len(self.__bots)))
+
+    def __get_bucket(self, bot: str, channel_id: str, now: float) -> list:
+        """
+        :param bot: The bot of the bucket
+        :param channel_id: The channel of the bucket
+        :param now: The current monotonic time
+        :return: The bucket as [window start, request count], reset if the window has passed
+        """
+        bucket = self.__buckets.get((bot, channel_id))
+        if bucket is None or now >= bucket[0] + self.__bucket_reset_after:
+            bucket = self.__buckets[(bot, channel_id)] = [now, 0]
+
+        return bucket
+
+    def __get_bucket_headers(self, channel_id: str, bucket: list) -> dict:
+        """
+        :param channel_id: The channel of the bucket
+        :param bucket: The bucket as [window start, request count]
+        :return: The rate limit headers of the bucket
+        """
+        return {
+            'X-RateLimit-Bucket': 'channel-messages',
+            'X-RateLimit-Limit': str(self.__bucket_limit),
+            'X-RateLimit-Remaining': str(max(self.__bucket_limit - bucket[1], 0)),
+            'X-RateLimit-Reset-After': f'{max(bucket[0] + self.__bucket_reset_after - time.monotonic(), 0):.3f}',
+        }
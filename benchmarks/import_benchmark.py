@@ -0,0 +1,105 @@
+"""
+Benchmark of the cold start of the package, based on python -X importtime. Every import statement runs in a fresh
+interpreter a number of times, and the median import time and the slowest modules are reported.
+Exits with status 1 if a sender stack import pulls in Scrapy or Twisted, or if an import exceeds its budget,
+so cold start regressions can be caught in CI.
+
+Usage: python benchmarks/import_benchmark.py [--runs 5] [--budget-ms 0] [--top 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import statements to measure, and whether they should be possible without importing Scrapy and Twisted
+IMPORTS = [
+    ('from scrapingcord.utils import MessageTemplate, Recipient', True),
+    ('from scrapingcord.discord import DirectDiscordMessageSender, DiscordRecipientType', True),
+    (
+        'from scrapingcord.discord import BufferedDiscordMessageSender, CoalescingDiscordMessageSender, '
+        'WebhookDiscordMessageSender',
+        True
+    ),
+    ('from scrapingcord import PingScraper', False),
+]
+FORBIDDEN_PACKAGES = ('scrapy', 'twisted')
+
+
+def measure(statement: str, startup_modules: frozenset[str] = frozenset()) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Run an import statement in a fresh interpreter
+
+    :param statement: The import statement
+    :param startup_modules: The modules the interpreter imports on startup, which are not counted
+    :return: The import time of the statement in microseconds and the self time and name of every imported module
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+        env={**os.environ, 'PYTHONPATH': ROOT}
+    )
+
+    modules = []
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_time, cumulative_time, name = line.removeprefix('import time:').split('|')
+        if name.strip() in startup_modules:
+            continue
+
+        modules.append((int(self_time), name.strip()))
+        # Top level imports are not indented, their cumulative times add up to the total
+        if not name[1:].startswith(' '):
+            total += int(cumulative_time)
+
+    return total, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters per import')
+    parser.add_argument('--budget-ms', type=float, default=0.0,
+                        help='Maximum median import time of the sender stack imports, no budget if 0')
+    parser.add_argument('--top', type=int, default=5, help='Number of slowest modules to show per import')
+    args = parser.parse_args()
+
+    # The modules imported by the interpreter itself on startup, e.g. by site, are not part of any import
+    startup_modules = frozenset(name for _, name in measure('pass')[1])
+
+    failures = []
+    for statement, scrapy_free in IMPORTS:
+        # The first run also compiles the bytecode, so it is not measured
+        measure(statement, startup_modules)
+        runs = [measure(statement, startup_modules) for _ in range(max(args.runs, 1))]
+        median_ms = statistics.median(total for total, _ in runs) / 1000
+        modules = runs[-1][1]
+
+        print(f"{median_ms:8.1f} ms  {statement}")
+        for self_time, name in sorted(modules, reverse=True)[:args.top]:
+            print(f"{self_time / 1000:17.1f} ms  {name}")
+
+        if scrapy_free:
+            forbidden = sorted({
+                name for _, name in modules if name.split('.')[0] in FORBIDDEN_PACKAGES
+            })
+            if forbidden:
+                failures.append(f"{statement!r} imports {', '.join(forbidden[:5])}")
+            if args.budget_ms and median_ms > args.budget_ms:
+                failures.append(f"{statement!r} took {median_ms:.1f} ms, the budget is {args.budget_ms:.1f} ms")
+
+    for failure in failures:
+        print('FAILED: ' + failure, file=sys.stderr)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
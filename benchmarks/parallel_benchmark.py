@@ -0,0 +1,95 @@
+"""
+Benchmark of PingScraper.run_parallel, showing how the throughput of a CPU heavy parser scales with the worker count.
+Crawls the local static site and counts the messages that reach the coordinating sender.
+
+Usage: python benchmarks/parallel_benchmark.py [--pages 200] [--rows 500] [--workers 1 2 4]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapingcord import PingScraper  # noqa: E402
+from scrapingcord.utils import MessageSender, MessageTemplate, Recipient, ScrapingImplementation  # noqa: E402
+from static_site import StaticSite  # noqa: E402
+
+PRICE_PATTERN = re.compile(r'(\d+)\.(\d{2})')
+
+
+class CountingMessageSender(MessageSender):
+    """
+    Sender that only counts the messages
+    """
+    count: int = 0
+
+    async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
+        self.count += 1
+        return True
+
+    async def flush(self) -> None:
+        pass
+
+
+def parse(response):
+    """
+    Deliberately CPU heavy parser: XPath over every row and a regex over every price
+    """
+    for row in response.xpath('//tr[@class="product"]'):
+        name = row.xpath('td[@class="name"]/text()').get()
+        price = PRICE_PATTERN.search(row.xpath('td[@class="price"]/text()').get())
+        if price is not None and int(price.group(1)) % 10 == 0:
+            yield {'name': name, 'price': price.group(0)}
+
+
+def run(worker_count: int, urls: list[str]) -> tuple[float, int]:
+    """
+    :param worker_count: The number of worker processes
+    :param urls: The start urls
+    :return: The duration of the run in seconds and the number of messages
+    """
+    sender = CountingMessageSender()
+    scraper = PingScraper().register_implementation(ScrapingImplementation(
+        'benchmark',
+        urls,
+        parse,
+        MessageTemplate('{name} costs {price}', [Recipient('0', 'user')])
+    ))
+    settings = {
+        **PingScraper.SCRAPER_SETTINGS,
+        'ROBOTSTXT_OBEY': False,
+        'LOG_LEVEL': 'ERROR',
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 16,
+    }
+
+    start = time.perf_counter()
+    scraper.run_parallel(sender, worker_count, settings, shard_start_urls=True)
+    return time.perf_counter() - start, sender.count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    site = StaticSite(args.pages, args.rows).start()
+
+    print(f"{'workers':>8} {'seconds':>8} {'messages':>9} {'pages/s':>8} {'speedup':>8}")
+    baseline = None
+    for worker_count in args.workers:
+        duration, message_count = run(worker_count, site.urls)
+        baseline = baseline or duration
+        print(
+            f"{worker_count:>8} {duration:>8.2f} {message_count:>9} "
+            f"{args.pages / duration:>8.1f} {baseline / duration:>7.2f}x"
+        )
+
+    site.stop()
+
+
+if __name__ == '__main__':
+    main()
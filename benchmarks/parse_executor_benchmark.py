@@ -0,0 +1,117 @@
+"""
+Benchmark of the parse executors, showing how a CPU heavy parser blocks the reactor when it runs on it.
+Crawls the local static site with every executor and measures the lag of the event loop while parsing,
+which is the time that downloads and Discord sends sharing the loop have to wait.
+
+Usage: python benchmarks/parse_executor_benchmark.py [--pages 50] [--rows 2000] [--executors none thread process]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapingcord import PingScraper  # noqa: E402
+from scrapingcord.utils import MessageSender, MessageTemplate, Recipient, ScrapingImplementation  # noqa: E402
+from parallel_benchmark import parse  # noqa: E402
+from static_site import StaticSite  # noqa: E402
+
+# Seconds between the ticks of the event loop probe
+TICK_INTERVAL = 0.01
+
+
+class LagProbeMessageSender(MessageSender):
+    """
+    Sender that counts the messages and measures how late a periodic tick on the event loop runs
+    """
+    count: int
+    lags: list[float]
+    __probe: Optional[asyncio.Task]
+
+    def __init__(self):
+        self.count = 0
+        self.lags = []
+        self.__probe = None
+
+    async def prepare(self, templates: list[MessageTemplate]) -> None:
+        self.__probe = asyncio.ensure_future(self.__tick())
+
+    async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
+        self.count += 1
+        return True
+
+    async def flush(self) -> None:
+        if self.__probe is not None:
+            self.__probe.cancel()
+            self.__probe = None
+
+    async def __tick(self) -> None:
+        """
+        Sleep for a tick and record how much later than requested the loop woke up
+        """
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(TICK_INTERVAL)
+            self.lags.append(time.perf_counter() - started_at - TICK_INTERVAL)
+
+
+def run(executor_type: Optional[str], urls: list[str]) -> tuple[float, int, list[float]]:
+    """
+    :param executor_type: The parse executor, None to parse on the reactor
+    :param urls: The start urls
+    :return: The duration of the run in seconds, the number of messages and the lags of the event loop
+    """
+    sender = LagProbeMessageSender()
+    scraper = PingScraper().register_implementation(ScrapingImplementation(
+        f'benchmark-{executor_type}',
+        urls,
+        parse,
+        MessageTemplate('{name} costs {price}', [Recipient('0', 'user')]),
+        parse_executor=executor_type
+    ))
+    settings = {**PingScraper.SCRAPER_SETTINGS, 'ROBOTSTXT_OBEY': False, 'LOG_LEVEL': 'ERROR'}
+
+    start = time.perf_counter()
+    scraper.run(sender, settings)
+    return time.perf_counter() - start, sender.count, sender.lags
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--executors', nargs='+', default=['none', 'thread', 'process'],
+                        choices=['none', ScrapingImplementation.EXECUTOR_THREAD,
+                                 ScrapingImplementation.EXECUTOR_PROCESS])
+    parser.add_argument('--single', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        site = StaticSite(args.pages, args.rows).start()
+        duration, count, lags = run(None if args.single == 'none' else args.single, site.urls)
+        lags = sorted(lags) or [0.0]
+        print(
+            f"{args.single:>8} {duration:8.2f} {count:8} {statistics.median(lags) * 1000:8.1f} "
+            f"{lags[int(len(lags) * 0.99)] * 1000:8.1f} {lags[-1] * 1000:8.1f}"
+        )
+        return
+
+    print(f"{'executor':>8} {'seconds':>8} {'messages':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for executor_type in args.executors:
+        # A reactor can only run once per process
+        subprocess.run(
+            [
+                sys.executable, os.path.abspath(__file__),
+                '--pages', str(args.pages), '--rows', str(args.rows), '--single', executor_type
+            ],
+            check=True
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+End to end benchmark of the Discord message senders. Crawls the local static site with PingScraper
+and sends the items to the fake Discord server, for every combination of sender, item count and recipient count.
+Every combination runs in a process of its own, since a reactor can only run once and to measure the peak RSS.
+
+Reports items/s, Discord messages/s, the p50/p99 latency between an item being parsed and the message containing
+it arriving at the server, and the peak RSS. The rate limits default to a lenient 50 messages per channel per second
+to keep the runs short; Discord itself allows 5 per 5 seconds.
+
+Usage: python benchmarks/sender_benchmark.py [--senders direct buffered coalescing] [--items 200 1000] [--recipients 1 5]
+                                                 [--tokens 1] [--recipient-type user]
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapingcord import PingScraper  # noqa: E402
+from scrapingcord.discord import DirectDiscordMessageSender, BufferedDiscordMessageSender, CoalescingDiscordMessageSender, DiscordHttpClient, \
+    DiscordRecipientType, MergingDiscordMessageSender  # noqa: E402
+from scrapingcord.utils import MessageTemplate, Recipient, ScrapingImplementation  # noqa: E402
+from fake_discord_server import FakeDiscordServer  # noqa: E402
+from static_site import StaticSite  # noqa: E402
+
+ROWS_PER_PAGE = 50
+
+# Time every item was parsed at, by name
+parsed_at: dict[str, float] = {}
+
+
+def parse(response):
+    """
+    Yield every product on the page and remember when it was parsed
+    """
+    for name in response.xpath('//td[@class="name"]/text()').getall():
+        parsed_at[name] = time.perf_counter()
+        yield {'name': name}
+
+
+def get_delivered_names(payload: dict) -> list[str]:
+    """
+    :param payload: A message received by the server
+    :return: The names of the items in the message
+    """
+    texts = [payload.get('content') or ''] + [embed.get('description', '') for embed in payload.get('embeds', [])]
+    if payload.get('files'):
+        # Attachments are text files with a message per line, next to a summary
+        texts = list(payload['files'].values())
+    return [line.removeprefix('New: ') for text in texts for line in text.split('\n') if line]
+
+
+def run_single(args: argparse.Namespace) -> dict:
+    """
+    Run a single combination in this process
+
+    :param args: The parsed arguments, with a single sender, item count and recipient count
+    :return: The results
+    """
+    server = FakeDiscordServer(
+        args.latency,
+        args.bucket_limit,
+        args.bucket_reset_after,
+        args.global_limit,
+        args.inject_429_rate
+    ).start()
+    DiscordHttpClient.DISCORD_API_BASE_URL = server.base_url
+    site = StaticSite(math.ceil(args.items[0] / ROWS_PER_PAGE), ROWS_PER_PAGE).start()
+
+    recipients = [
+        Recipient(f'{args.recipient_type}-{index}', args.recipient_type) for index in range(args.recipients[0])
+    ]
+    tokens = [f'token-{index}' for index in range(args.tokens)]
+    if args.senders[0] == 'direct':
+        sender = DirectDiscordMessageSender(tokens, args.max_concurrency)
+    elif args.senders[0] == 'coalescing':
+        sender = CoalescingDiscordMessageSender(tokens, args.window)
+    elif args.senders[0] == 'merging':
+        sender = MergingDiscordMessageSender(tokens)
+    else:
+        sender = BufferedDiscordMessageSender(tokens, attachment_threshold=args.attachment_threshold)
+    scraper = PingScraper().register_implementation(
+        ScrapingImplementation('benchmark', site.urls, parse, MessageTemplate('New: {name}', recipients))
+    )
+
+    start = time.perf_counter()
+    scraper.run(sender, {**PingScraper.SCRAPER_SETTINGS, 'ROBOTSTXT_OBEY': False, 'LOG_LEVEL': 'ERROR'})
+    duration = time.perf_counter() - start
+
+    latencies = [
+        received_at - parsed_at[name]
+        for received_at, _, payload in server.messages
+        for name in get_delivered_names(payload)
+        if name in parsed_at
+    ]
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+
+    site.stop()
+    server.stop()
+    return {
+        'sender': args.senders[0],
+        'items': len(parsed_at),
+        'recipients': len(recipients),
+        'deliveries': len(latencies),
+        'seconds': duration,
+        'items_per_second': len(parsed_at) / duration,
+        'messages_per_second': server.stats['messages'] / duration,
+        'p50_latency': quantiles[49] if quantiles else None,
+        'p99_latency': quantiles[98] if quantiles else None,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'server': server.stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--senders', nargs='+', choices=['direct', 'buffered', 'coalescing', 'merging'],
+                        default=['direct', 'buffered', 'coalescing'])
+    parser.add_argument('--items', type=int, nargs='+', default=[200, 1000])
+    parser.add_argument('--recipients', type=int, nargs='+', default=[1, 5])
+    parser.add_argument('--max-concurrency', type=int, default=8, help='Concurrency of the direct sender')
+    parser.add_argument('--window', type=float, default=1.0, help='Digest window of the coalescing sender')
+    parser.add_argument('--attachment-threshold', type=int,
+                        help='Pending characters above which the buffered sender sends an attachment')
+    parser.add_argument('--tokens', type=int, default=1, help='Number of bots to send with')
+    parser.add_argument(
+        '--recipient-type',
+        choices=[DiscordRecipientType.TYPE_USER, DiscordRecipientType.TYPE_CHANNEL],
+        default=DiscordRecipientType.TYPE_USER,
+        help='Users get a DM channel with a single bot, channels can be sent to by all bots'
+    )
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds every Discord request takes')
+    parser.add_argument('--bucket-limit', type=int, default=50)
+    parser.add_argument('--bucket-reset-after', type=float, default=1.0)
+    parser.add_argument('--global-limit', type=int, default=50)
+    parser.add_argument('--inject-429-rate', type=float, default=0.0)
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON lines')
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args)))
+        return
+
+    if not args.json:
+        print(
+            f"{'sender':>10} {'items':>6} {'recips':>6} {'seconds':>8} {'items/s':>8} {'msgs/s':>7} "
+            f"{'p50 ms':>8} {'p99 ms':>8} {'rss MB':>7} {'429s':>5}"
+        )
+
+    for sender in args.senders:
+        for item_count in args.items:
+            for recipient_count in args.recipients:
+                process = subprocess.run(
+                    [
+                        sys.executable, os.path.abspath(__file__), '--single',
+                        '--senders', sender,
+                        '--items', str(item_count),
+                        '--recipients', str(recipient_count),
+                        '--max-concurrency', str(args.max_concurrency),
+                        '--window', str(args.window),
+                        '--tokens', str(args.tokens),
+                        '--recipient-type', args.recipient_type,
+                        '--latency', str(args.latency),
+                        '--bucket-limit', str(args.bucket_limit),
+                        '--bucket-reset-after', str(args.bucket_reset_after),
+                        '--global-limit', str(args.global_limit),
+                        '--inject-429-rate', str(args.inject_429_rate),
+                    ] + (
+                        ['--attachment-threshold', str(args.attachment_threshold)]
+                        if args.attachment_threshold is not None else []
+                    ),
+                    capture_output=True,
+                    text=True,
+                    check=True
+                )
+                result = json.loads(process.stdout.strip().splitlines()[-1])
+                if args.json:
+                    print(json.dumps(result))
+                    continue
+
+                rate_limited = result['server']['rate_limited'] + result['server']['global_rate_limited']
+                print(
+                    f"{result['sender']:>10} {result['items']:>6} {result['recipients']:>6} "
+                    f"{result['seconds']:>8.2f} {result['items_per_second']:>8.1f} "
+                    f"{result['messages_per_second']:>7.1f} {(result['p50_latency'] or 0) * 1000:>8.1f} "
+                    f"{(result['p99_latency'] or 0) * 1000:>8.1f} {result['peak_rss_mb']:>7.1f} {rate_limited:>5}"
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Local static site fixture for the scraper side of the benchmarks.
+Serves generated product listings, where every page links to the next one.
+"""
+import http.server
+import threading
+from typing import Optional
+
+
+class StaticSite:
+    """
+    Serves /page/<n> with a table of products in a background thread. Page n links to page n + 1,
+    up to the page count, so the site can be crawled from the first page or from all pages at once.
+    """
+    __page_count: int
+    __rows_per_page: int
+    __server: Optional[http.server.ThreadingHTTPServer]
+
+    def __init__(self, page_count: int, rows_per_page: int = 100):
+        """
+        :param page_count: The number of pages of the site
+        :param rows_per_page: The number of products on every page
+        """
+        self.__page_count = page_count
+        self.__rows_per_page = rows_per_page
+        self.__server = None
+
+    @property
+    def base_url(self) -> str:
+        """
+        :return: The url of the running site
+        """
+        return f'http://127.0.0.1:{self.__server.server_port}'
+
+    @property
+    def urls(self) -> list[str]:
+        """
+        :return: The urls of all pages
+        """
+        return [f'{self.base_url}/page/{page}' for page in range(self.__page_count)]
+
+    def start(self) -> 'StaticSite':
+        """
+        Start serving on a free port
+
+        :return: This instance
+        """
+        site = self
+
+        class PageHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = site.render(self.path)
+                self.send_response(200 if body is not None else 404)
+                self.send_header('Content-Type', 'text/html')
+                self.end_headers()
+                self.wfile.write((body or '').encode())
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.__server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop serving
+        """
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def render(self, path: str) -> Optional[str]:
+        """
+        :param path: The requested path
+        :return: The page or None if it doesn't exist
+        """
+        page = path.removeprefix('/page/')
+        if not page.isdigit() or int(page) >= self.__page_count:
+            return None
+
+        page = int(page)
+        rows = ''.join(
+            f'<tr class="product"><td class="name">Product {page}-{row}</td>'
+            f'<td class="price">{row % 97}.{row % 100:02d}</td></tr>'
+            for row in range(self.__rows_per_page)
+        )
+        next_link = f'<a class="next" href="/page/{page + 1}">next</a>' if page + 1 < self.__page_count else ''
+        return f'<html><body><table>{rows}</table>{next_link}</body></html>'
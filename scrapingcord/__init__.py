@@ -1 +1,30 @@
-from scrapingcord.ping_scraper import PingScraper
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+VERSION = '1.0'
+
+if TYPE_CHECKING:
+    from scrapingcord.ping_scraper import PingScraper
+
+# Exported names and the modules they are defined in, imported when they are first used
+_EXPORTS = {
+    'PingScraper': 'scrapingcord.ping_scraper',
+}
+
+__all__ = ['VERSION', *_EXPORTS]
+
+
+def __getattr__(name: str):
+    """
+    Import the exported names when they are first used, so the senders and utils can be used without Scrapy
+    """
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_EXPORTS])
@@ -1,5 +1,58 @@
-from scrapingcord.discord.discord_http_client import DiscordHttpClient
-from scrapingcord.discord.direct_discord_message_sender import DirectDiscordMessageSender
-from scrapingcord.discord.buffered_discord_message_sender import BufferedDiscordMessageSender
-from scrapingcord.discord.discord_message_sender import DiscordMessageSender
-from scrapingcord.discord.discord_recipient_type import DiscordRecipientType
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from scrapingcord.discord.discord_rate_limit_bucket import DiscordRateLimitBucket
+    from scrapingcord.discord.discord_rate_limiter import DiscordRateLimiter
+    from scrapingcord.discord.discord_http_client import DiscordHttpClient
+    from scrapingcord.discord.discord_client_pool import DiscordClientPool
+    from scrapingcord.discord.discord_message_packer import DiscordMessagePacker
+    from scrapingcord.discord.discord_attachment import DiscordAttachment
+    from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
+    from scrapingcord.discord.memory_discord_dm_channel_cache import MemoryDiscordDMChannelCache
+    from scrapingcord.discord.sqlite_discord_dm_channel_cache import SqliteDiscordDMChannelCache
+    from scrapingcord.discord.direct_discord_message_sender import DirectDiscordMessageSender
+    from scrapingcord.discord.buffered_discord_message_sender import BufferedDiscordMessageSender
+    from scrapingcord.discord.webhook_discord_message_sender import WebhookDiscordMessageSender
+    from scrapingcord.discord.coalescing_discord_message_sender import CoalescingDiscordMessageSender
+    from scrapingcord.discord.merging_discord_message_sender import MergingDiscordMessageSender
+    from scrapingcord.discord.discord_message_sender import DiscordMessageSender
+    from scrapingcord.discord.discord_recipient_type import DiscordRecipientType
+
+# Exported names and the modules they are defined in, imported when they are first used
+_EXPORTS = {
+    'DiscordRateLimitBucket': 'scrapingcord.discord.discord_rate_limit_bucket',
+    'DiscordRateLimiter': 'scrapingcord.discord.discord_rate_limiter',
+    'DiscordHttpClient': 'scrapingcord.discord.discord_http_client',
+    'DiscordClientPool': 'scrapingcord.discord.discord_client_pool',
+    'DiscordMessagePacker': 'scrapingcord.discord.discord_message_packer',
+    'DiscordAttachment': 'scrapingcord.discord.discord_attachment',
+    'DiscordDMChannelCache': 'scrapingcord.discord.discord_dm_channel_cache',
+    'MemoryDiscordDMChannelCache': 'scrapingcord.discord.memory_discord_dm_channel_cache',
+    'SqliteDiscordDMChannelCache': 'scrapingcord.discord.sqlite_discord_dm_channel_cache',
+    'DirectDiscordMessageSender': 'scrapingcord.discord.direct_discord_message_sender',
+    'BufferedDiscordMessageSender': 'scrapingcord.discord.buffered_discord_message_sender',
+    'WebhookDiscordMessageSender': 'scrapingcord.discord.webhook_discord_message_sender',
+    'CoalescingDiscordMessageSender': 'scrapingcord.discord.coalescing_discord_message_sender',
+    'MergingDiscordMessageSender': 'scrapingcord.discord.merging_discord_message_sender',
+    'DiscordMessageSender': 'scrapingcord.discord.discord_message_sender',
+    'DiscordRecipientType': 'scrapingcord.discord.discord_recipient_type',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """
+    Import the exported names when they are first used, so only the modules that are used get imported
+    """
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_EXPORTS])
@@ -1,40 +1,319 @@
+import asyncio
+import logging
+from typing import Optional, Union
+
+from scrapingcord.discord.discord_attachment import DiscordAttachment
+from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
+from scrapingcord.discord.discord_message_packer import DiscordMessagePacker
 from scrapingcord.discord.discord_message_sender import DiscordMessageSender
-from scrapingcord.utils import MessageTemplate
+from scrapingcord.utils import MessageTemplate, Recipient, MessageOutbox, MemoryMessageOutbox
 
 
 class BufferedDiscordMessageSender(DiscordMessageSender):
     """
-    A Discord message sender which sends all messages in a single message when it closes.
-    Note that Discord has a content limit and no message will be sent if it errors out.
+    A Discord message sender which sends all messages per recipient when it closes.
+    The messages are packed into as few Discord messages as the content limits allow.
+    Messages wait in an outbox and are only removed once Discord confirms them. Messages that could not be delivered
+    are sent again on the next flush, and with a persistent outbox also by the next run.
+    Messages that Discord rejects, and the messages of recipients that failed max_attempts flushes in a row,
+    are moved to the dead letter outbox if given, else they are dropped with an error in the log.
+    Recipients with more pending characters than the attachment threshold get a short summary with the messages
+    in an attached file instead, which takes a single API call.
     """
-    __messages_buffer: dict = {}
+    ATTACHMENT_SUMMARY = '{count} new messages, see the attached file'
+    ATTACHMENT_NAME = 'messages'
+
+    __outbox: MessageOutbox
+    __packer: DiscordMessagePacker
+    __flush_lock: asyncio.Lock
+    __attachment_threshold: Optional[int]
+    __attachment_format: str
+    __max_attempts: Optional[int]
+    __dead_letter_outbox: Optional[MessageOutbox]
+    __failed_attempts: dict[str, int]
+    __delivered_chunks: dict[tuple[str, int], int]
+
+    def __init__(
+            self,
+            token: Union[str, list[str]],
+            use_embeds: bool = False,
+            dm_channel_cache: Optional[DiscordDMChannelCache] = None,
+            outbox: Optional[MessageOutbox] = None,
+            attachment_threshold: Optional[int] = None,
+            attachment_format: str = DiscordAttachment.FORMAT_TXT,
+            max_attempts: Optional[int] = DiscordMessageSender.DEFAULT_MAX_ATTEMPTS,
+            dead_letter_outbox: Optional[MessageOutbox] = None
+    ):
+        """
+        :param token: The Discord bot token or a list of tokens to send with multiple bots
+        :param use_embeds: Pack the messages in embeds, which fit more characters per message
+        :param dm_channel_cache: Cache for the DM channels of users. Only cached in memory if not given
+        :param outbox: Outbox for the messages that are not delivered yet. Only kept in memory if not given
+        :param attachment_threshold: Number of pending characters of a recipient above which the messages are sent
+            as a file attachment, never if not given
+        :param attachment_format: Format of the attachments, DiscordAttachment.FORMAT_TXT, FORMAT_CSV or FORMAT_JSON
+        :param max_attempts: Number of flushes in a row a recipient may fail before its messages are given up.
+            Retried forever if None, in which case the outbox of an unreachable recipient keeps growing
+        :param dead_letter_outbox: Outbox for the messages that are given up, only logged if not given
+        """
+        if attachment_format not in DiscordAttachment.CONTENT_TYPES:
+            raise ValueError(f"Unknown attachment format {attachment_format!r}")
+
+        super().__init__(token, dm_channel_cache)
+        self.__outbox = outbox if outbox is not None else MemoryMessageOutbox()
+        self.__packer = DiscordMessagePacker(use_embeds)
+        self.__flush_lock = asyncio.Lock()
+        self.__attachment_threshold = attachment_threshold
+        self.__attachment_format = attachment_format
+        self.__max_attempts = max_attempts
+        self.__dead_letter_outbox = dead_letter_outbox
+        self.__failed_attempts = {}
+        self.__delivered_chunks = {}
 
     async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
         """
-        Add the message to the buffer per recipient
+        Add the message to the outbox per recipient
 
         :param template: The message template to send
         :param template_data: The data to substitute in the template
         :return Always True since we don't send the messages yet
         """
-        for message, recipient in template.get_message_list(template_data):
-            recipient_buffer = self.__messages_buffer.get(recipient.recipient_id, {
-                'recipient': recipient,
-                'messages': []
-            })
-            recipient_buffer['messages'].append(message)
-            self.__messages_buffer[recipient.recipient_id] = recipient_buffer
+        message, recipients = self.render_message(template, template_data)
+        for recipient in recipients:
+            self.__outbox.add(recipient, message)
 
         return True
 
+    async def prepare(self, templates: list[MessageTemplate]) -> None:
+        """
+        Resolve the DM channels and replay the messages that an earlier run left in the outbox
+
+        :param templates: The message templates that will be used
+        """
+        await super().prepare(templates)
+        await self.flush()
+
     async def flush(self) -> None:
         """
-        Send all messages and close the client
+        Send all messages in the outbox.
+        Recipients are sent to concurrently, the messages of a single recipient are sent in order.
+        Concurrent flushes wait for each other, so no message is sent twice.
         """
-        for recipient_dict in self.__messages_buffer.values():
-            await self.send_message(
-                recipient_dict['recipient'],
-                {'content': '\n'.join(recipient_dict['messages'])}
+        async with self.__flush_lock:
+            self.__outbox.flush()
+            recipients = self.__outbox.get_recipients()
+            results = await asyncio.gather(
+                *[self.__send_outbox(recipient) for recipient in recipients],
+                return_exceptions=True
             )
 
+        for recipient, result in zip(recipients, results):
+            if isinstance(result, Exception):
+                logging.getLogger('BufferedDiscordMessageSender').warning(
+                    f"Failed sending to {recipient.recipient_id}, keeping its messages in the outbox: {result!r}"
+                )
+
+        if self.__dead_letter_outbox is not None:
+            self.__dead_letter_outbox.flush()
+
         await super().flush()
+
+    async def close(self) -> None:
+        """
+        Close the client, the DM channel cache and the outboxes
+        """
+        await super().close()
+        self.__outbox.close()
+        if self.__dead_letter_outbox is not None:
+            self.__dead_letter_outbox.close()
+
+    async def __send_outbox(self, recipient: Recipient) -> None:
+        """
+        Pack and send the pending messages of a recipient.
+        Messages are grouped so every group fits in a single Discord message, and a group is removed
+        from the outbox once it is confirmed. Sending stops at the first failure to keep the messages in order,
+        unless the failed messages were given up.
+
+        :param recipient: The recipient of the messages
+        """
+        if self.__exceeds_attachment_threshold(recipient):
+            await self.__send_outbox_attachments(recipient)
+            return
+
+        entry_ids = []
+        lines = []
+        length = 0
+        for entry_id, message in self.__outbox.iterate_entries(recipient.recipient_id):
+            line_length = len(message) + (1 if lines else 0)
+            if lines and length + line_length > self.__packer.message_limit:
+                if not (await self.__send_group(recipient, entry_ids, lines)):
+                    return
+
+                entry_ids = []
+                lines = []
+                line_length = len(message)
+                length = 0
+
+            entry_ids.append(entry_id)
+            lines.append(message)
+            length += line_length
+
+        if lines:
+            await self.__send_group(recipient, entry_ids, lines)
+
+    async def __send_group(self, recipient: Recipient, entry_ids: list[int], lines: list[str]) -> bool:
+        """
+        Send a group of messages and remove them from the outbox if they were delivered.
+        Only a single message that is too long on its own is packed into more than one Discord message. The chunks
+        of such a message that were delivered are remembered in memory, so they are skipped by the next flush.
+
+        :param recipient: The recipient of the messages
+        :param entry_ids: The outbox entries of the messages
+        :param lines: The messages
+        :return: True if the messages were delivered or given up, else False
+        """
+        chunk_key = (recipient.recipient_id, entry_ids[0])
+        delivered_chunks = self.__delivered_chunks.get(chunk_key, 0)
+        for index, message_contents in enumerate(self.__packer.pack(lines)):
+            if index < delivered_chunks:
+                continue
+
+            result = await self.deliver_message(recipient, message_contents)
+            if result != self.RESULT_SENT:
+                if index > 0:
+                    self.__delivered_chunks[chunk_key] = index
+
+                return self.__handle_failure(recipient, entry_ids, result)
+
+        self.__delivered_chunks.pop(chunk_key, None)
+        self.__failed_attempts.pop(recipient.recipient_id, None)
+        self.__outbox.delete(entry_ids)
+        return True
+
+    def __handle_failure(self, recipient: Recipient, entry_ids: list[int], result: str) -> bool:
+        """
+        Give up the messages Discord rejected, and all pending messages of a recipient that failed too often.
+        Other messages are kept in the outbox for the next flush.
+
+        :param recipient: The recipient of the messages
+        :param entry_ids: The outbox entries of the messages that failed
+        :param result: The result of sending the messages
+        :return: True if the messages were given up, so sending can go on with the next messages, else False
+        """
+        if result == self.RESULT_REJECTED:
+            self.__give_up(recipient, entry_ids, 'rejected by Discord')
+            return True
+
+        attempts = self.__failed_attempts.get(recipient.recipient_id, 0) + 1
+        if self.__max_attempts is None or attempts < self.__max_attempts:
+            self.__failed_attempts[recipient.recipient_id] = attempts
+            logging.getLogger('BufferedDiscordMessageSender').warning(
+                f"Failed sending to {recipient.recipient_id}, keeping its messages in the outbox"
+            )
+            return False
+
+        self.__failed_attempts.pop(recipient.recipient_id, None)
+        pending_entry_ids = [entry_id for entry_id, _ in self.__outbox.iterate_entries(recipient.recipient_id)]
+        self.__give_up(recipient, pending_entry_ids, f"failed {attempts} flushes in a row")
+        return False
+
+    def __give_up(self, recipient: Recipient, entry_ids: list[int], reason: str) -> None:
+        """
+        Move messages from the outbox to the dead letter outbox, or drop them if there is none
+
+        :param recipient: The recipient of the messages
+        :param entry_ids: The outbox entries of the messages
+        :param reason: Why the messages are given up, for the log
+        """
+        selected_entry_ids = set(entry_ids)
+        messages = [
+            message for entry_id, message in self.__outbox.iterate_entries(recipient.recipient_id)
+            if entry_id in selected_entry_ids
+        ]
+        if self.__dead_letter_outbox is not None:
+            for message in messages:
+                self.__dead_letter_outbox.add(recipient, message)
+
+        for entry_id in entry_ids:
+            self.__delivered_chunks.pop((recipient.recipient_id, entry_id), None)
+
+        self.__outbox.delete(entry_ids)
+        logging.getLogger('BufferedDiscordMessageSender').error(
+            f"Gave up {len(messages)} messages to {recipient.recipient_id}, {reason}"
+            + (", moved them to the dead letter outbox" if self.__dead_letter_outbox is not None else "")
+        )
+        if self.metrics.enabled:
+            self.metrics.increment('scrapingcord_dead_letter_messages_total', len(messages), {
+                'recipient': recipient.recipient_id
+            })
+
+    def __exceeds_attachment_threshold(self, recipient: Recipient) -> bool:
+        """
+        :param recipient: The recipient of the messages
+        :return: True if the pending messages of the recipient should be sent as attachment
+        """
+        if self.__attachment_threshold is None:
+            return False
+
+        length = -1
+        for _, message in self.__outbox.iterate_entries(recipient.recipient_id):
+            length += len(message) + 1
+            if length > self.__attachment_threshold:
+                return True
+
+        return False
+
+    async def __send_outbox_attachments(self, recipient: Recipient) -> None:
+        """
+        Write the pending messages of a recipient to attachments and send them.
+        A new attachment is started when one reaches the upload limit, sending stops at the first failure
+        unless the failed messages were given up.
+
+        :param recipient: The recipient of the messages
+        """
+        attachment = DiscordAttachment(self.__attachment_format)
+        entry_ids = []
+        try:
+            for entry_id, message in self.__outbox.iterate_entries(recipient.recipient_id):
+                if not attachment.write(message):
+                    if not (await self.__send_attachment(recipient, attachment, entry_ids)):
+                        return
+
+                    attachment.delete()
+                    attachment = DiscordAttachment(self.__attachment_format)
+                    entry_ids = []
+                    attachment.write(message)
+
+                entry_ids.append(entry_id)
+
+            if entry_ids:
+                await self.__send_attachment(recipient, attachment, entry_ids)
+        finally:
+            attachment.delete()
+
+    async def __send_attachment(
+            self,
+            recipient: Recipient,
+            attachment: DiscordAttachment,
+            entry_ids: list[int]
+    ) -> bool:
+        """
+        Send a summary with an attachment and remove its messages from the outbox if it was delivered
+
+        :param recipient: The recipient of the messages
+        :param attachment: The attachment with the messages
+        :param entry_ids: The outbox entries of the messages
+        :return: True if the attachment was delivered or its messages were given up, else False
+        """
+        attachment.finish()
+        result = await self.deliver_message(
+            recipient,
+            {'content': self.ATTACHMENT_SUMMARY.format(count=attachment.count)},
+            files=[(attachment.get_filename(self.ATTACHMENT_NAME), attachment.path, attachment.content_type)]
+        )
+        if result != self.RESULT_SENT:
+            return self.__handle_failure(recipient, entry_ids, result)
+
+        self.__failed_attempts.pop(recipient.recipient_id, None)
+        self.__outbox.delete(entry_ids)
+        return True
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from typing import Optional, Union
+
+from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
+from scrapingcord.discord.discord_message_packer import DiscordMessagePacker
+from scrapingcord.discord.discord_message_sender import DiscordMessageSender
+from scrapingcord.utils import MessageTemplate, Recipient
+
+
+class CoalescingDiscordMessageSender(DiscordMessageSender):
+    """
+    A Discord message sender which groups the messages per recipient into digests.
+    A digest is sent as soon as its time window has passed or it reaches the maximum number of characters or items,
+    so notifications arrive within a bounded time while bursts take only a few API calls.
+    Digests are sent in the background, the digests of a single recipient are sent in order.
+    """
+    __window: float
+    __max_chars: int
+    __max_items: int
+    __packer: DiscordMessagePacker
+    __digests: dict[str, dict]
+    __recipient_locks: dict[str, asyncio.Lock]
+    __pending_sends: set[asyncio.Task]
+
+    def __init__(
+            self,
+            token: Union[str, list[str]],
+            window: float = 10.0,
+            max_chars: Optional[int] = None,
+            max_items: int = 50,
+            use_embeds: bool = False,
+            dm_channel_cache: Optional[DiscordDMChannelCache] = None
+    ):
+        """
+        :param token: The Discord bot token or a list of tokens to send with multiple bots
+        :param window: Seconds after the first message of a digest at which the digest is sent
+        :param max_chars: Number of characters at which a digest is sent. Defaults to what fits in a single message
+        :param max_items: Number of messages at which a digest is sent
+        :param use_embeds: Pack the digests in embeds, which fit more characters per message
+        :param dm_channel_cache: Cache for the DM channels of users. Only cached in memory if not given
+        """
+        super().__init__(token, dm_channel_cache)
+        self.__packer = DiscordMessagePacker(use_embeds)
+        self.__window = max(window, 0.0)
+        self.__max_chars = max_chars if max_chars is not None else self.__packer.message_limit
+        self.__max_items = max(max_items, 1)
+        self.__digests = {}
+        self.__recipient_locks = {}
+        self.__pending_sends = set()
+
+    async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
+        """
+        Add the message to the digest of every recipient, sending the digests that are full
+
+        :param template: The message template to send
+        :param template_data: The data to substitute in the template
+        :return Always True since the digests are sent in the background
+        """
+        message, recipients = self.render_message(template, template_data)
+        for recipient in recipients:
+            digest = self.__digests.get(recipient.recipient_id)
+            if digest is not None and digest['length'] + 1 + len(message) > self.__max_chars:
+                # Send the digest before it outgrows the limit
+                self.__send_digest(recipient.recipient_id)
+                digest = None
+
+            if digest is None:
+                digest = self.__digests[recipient.recipient_id] = {
+                    'recipient': recipient,
+                    'messages': [],
+                    'length': -1,
+                    'timer': asyncio.get_running_loop().call_later(
+                        self.__window,
+                        self.__send_digest,
+                        recipient.recipient_id
+                    )
+                }
+
+            digest['messages'].append(message)
+            digest['length'] += len(message) + 1
+            if len(digest['messages']) >= self.__max_items or digest['length'] >= self.__max_chars:
+                self.__send_digest(recipient.recipient_id)
+
+        return True
+
+    async def drain(self) -> None:
+        """
+        Wait until the digests that are being sent are handled
+        """
+        while self.__pending_sends:
+            await asyncio.gather(*list(self.__pending_sends))
+
+    async def flush(self) -> None:
+        """
+        Send all digests, regardless of their windows
+        """
+        for recipient_id in list(self.__digests):
+            self.__send_digest(recipient_id)
+
+        await self.drain()
+        await super().flush()
+
+    def __send_digest(self, recipient_id: str) -> None:
+        """
+        Take the digest of a recipient and send it in the background
+
+        :param recipient_id: The id of the recipient
+        """
+        digest = self.__digests.pop(recipient_id, None)
+        if digest is None:
+            return
+
+        digest['timer'].cancel()
+        task = asyncio.ensure_future(self.__send_messages(digest['recipient'], digest['messages']))
+        self.__pending_sends.add(task)
+        task.add_done_callback(self.__pending_sends.discard)
+
+    async def __send_messages(self, recipient: Recipient, messages: list[str]) -> None:
+        """
+        Pack and send the messages of a digest, after the earlier digests of the recipient
+
+        :param recipient: The recipient of the messages
+        :param messages: The messages of the digest
+        """
+        lock = self.__recipient_locks.setdefault(recipient.recipient_id, asyncio.Lock())
+        async with lock:
+            failed_count = 0
+            for message_contents in self.__packer.pack(messages):
+                try:
+                    if not (await self.send_message(recipient, message_contents)):
+                        failed_count += 1
+                except Exception:
+                    logging.getLogger('CoalescingDiscordMessageSender').exception(
+                        f"Failed sending a digest to {recipient.recipient_id}"
+                    )
+                    failed_count += 1
+
+        if failed_count:
+            logging.getLogger('CoalescingDiscordMessageSender').warning(
+                f"Failed sending {failed_count} message(s) of a digest of {len(messages)} to {recipient.recipient_id}"
+            )
@@ -1,22 +1,68 @@
+import asyncio
+import logging
+from typing import Optional, Union
+
+from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
 from scrapingcord.discord.discord_message_sender import DiscordMessageSender
-from scrapingcord.utils import MessageTemplate
+from scrapingcord.utils import MessageTemplate, Recipient
 
 
 class DirectDiscordMessageSender(DiscordMessageSender):
     """
-    A Discord message sender which immediately send any message added
+    A Discord message sender which immediately send any message added.
+    Messages to multiple recipients can be sent in parallel by raising the max concurrency.
     """
+    __semaphore: asyncio.Semaphore
+
+    def __init__(
+            self,
+            token: Union[str, list[str]],
+            max_concurrency: int = 1,
+            dm_channel_cache: Optional[DiscordDMChannelCache] = None
+    ):
+        """
+        :param token: The Discord bot token or a list of tokens to send with multiple bots
+        :param max_concurrency: The maximum number of messages that are being sent at the same time
+        :param dm_channel_cache: Cache for the DM channels of users. Only cached in memory if not given
+        """
+        super().__init__(token, dm_channel_cache)
+        self.__semaphore = asyncio.Semaphore(max(max_concurrency, 1))
 
     async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
         """
-        Send the message to the recipient directly. Make a DM channel first if the recipient is a user.
+        Send the message to all recipients directly. Make a DM channel first if the recipient is a user.
+        A failure for one recipient does not stop the message from being sent to the others.
 
         :param template: The message template to send
         :param template_data: The data to substitute in the template
-        :return True if adding the message went well, else False
+        :return True if the message was sent to all recipients, else False
         """
-        for message, recipient in template.get_message_list(template_data):
-            if not (await self.send_message(recipient, {'content': message})):
-                return False
+        message, recipients = self.render_message(template, template_data)
+        results = await asyncio.gather(
+            *[self.__send_bounded(recipient, message) for recipient in recipients],
+            return_exceptions=True
+        )
+
+        failed_recipients = [
+            f"{recipient.recipient_id} ({result})" if isinstance(result, Exception) else recipient.recipient_id
+            for recipient, result in zip(recipients, results)
+            if result is not True
+        ]
+        if failed_recipients:
+            logging.getLogger('DirectDiscordMessageSender').warning(
+                f"Failed sending message to {len(failed_recipients)}/{len(recipients)} recipients: "
+                + ', '.join(failed_recipients)
+            )
 
-        return True
+        return not failed_recipients
+
+    async def __send_bounded(self, recipient: Recipient, message: str) -> bool:
+        """
+        Send a message while respecting the max concurrency
+
+        :param recipient: The recipient of the message
+        :param message: The message content
+        :return: True if sending the message went well, else False
+        """
+        async with self.__semaphore:
+            return await self.send_message(recipient, {'content': message})
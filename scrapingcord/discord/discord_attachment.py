@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+
+class DiscordAttachment:
+    """
+    File attachment for a Discord message, written incrementally to a temporary file so large digests
+    are not kept in memory twice. Messages are written one per line as text, as a single column CSV or as a JSON array.
+    """
+    FORMAT_TXT = 'txt'
+    FORMAT_CSV = 'csv'
+    FORMAT_JSON = 'json'
+    CONTENT_TYPES = {
+        FORMAT_TXT: 'text/plain; charset=utf-8',
+        FORMAT_CSV: 'text/csv; charset=utf-8',
+        FORMAT_JSON: 'application/json',
+    }
+
+    # Default upload limit of bots in bytes
+    SIZE_LIMIT = 10 * 1024 * 1024
+
+    __file_format: str
+    __max_size: int
+    __file: io.BufferedRandom
+    __size: int
+    __count: int
+
+    def __init__(self, file_format: str = FORMAT_TXT, max_size: int = SIZE_LIMIT):
+        """
+        :param file_format: FORMAT_TXT, FORMAT_CSV or FORMAT_JSON
+        :param max_size: The maximum size of the file in bytes
+        """
+        if file_format not in self.CONTENT_TYPES:
+            raise ValueError(f"Unknown attachment format {file_format!r}")
+
+        self.__file_format = file_format
+        self.__max_size = max_size
+        self.__file = tempfile.NamedTemporaryFile('w+b', suffix='.' + file_format, delete=False)
+        self.__size = 0
+        self.__count = 0
+        if file_format == self.FORMAT_CSV:
+            self.__write(self.__encode_csv_row('message'))
+
+    @property
+    def count(self) -> int:
+        """
+        :return: The number of messages in the file
+        """
+        return self.__count
+
+    @property
+    def path(self) -> str:
+        """
+        :return: The path of the temporary file
+        """
+        return self.__file.name
+
+    @property
+    def content_type(self) -> str:
+        """
+        :return: The content type of the file
+        """
+        return self.CONTENT_TYPES[self.__file_format]
+
+    def get_filename(self, name: str) -> str:
+        """
+        :param name: The name of the file without extension
+        :return: The filename shown in Discord
+        """
+        return f"{name}.{self.__file_format}"
+
+    def write(self, message: str) -> bool:
+        """
+        Append a message to the file if it still fits
+
+        :param message: The rendered message
+        :return: True if the message was written, False if the file is full. The first message is always written
+        """
+        if self.__file_format == self.FORMAT_CSV:
+            data = self.__encode_csv_row(message)
+        elif self.__file_format == self.FORMAT_JSON:
+            data = ('[' if not self.__count else ',\n').encode() + json.dumps(message).encode()
+        else:
+            data = message.encode() + b'\n'
+
+        # Keep room for the closing bracket of JSON
+        if self.__count and self.__size + len(data) + 2 > self.__max_size:
+            return False
+
+        self.__write(data)
+        self.__count += 1
+        return True
+
+    def finish(self) -> None:
+        """
+        Complete the file and write it to disk, so it can be uploaded
+        """
+        if self.__file_format == self.FORMAT_JSON:
+            self.__write(b']\n' if self.__count else b'[]\n')
+        self.__file.close()
+
+    def delete(self) -> None:
+        """
+        Remove the temporary file
+        """
+        self.__file.close()
+        try:
+            os.remove(self.__file.name)
+        except FileNotFoundError:
+            pass
+
+    def __write(self, data: bytes) -> None:
+        """
+        :param data: The data to append to the file
+        """
+        self.__file.write(data)
+        self.__size += len(data)
+
+    @staticmethod
+    def __encode_csv_row(value: str) -> bytes:
+        """
+        :param value: The value of the single column
+        :return: The CSV row
+        """
+        row = io.StringIO()
+        csv.writer(row).writerow([value])
+        return row.getvalue().encode()
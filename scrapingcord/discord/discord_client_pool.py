@@ -0,0 +1,125 @@
+import hashlib
+from contextlib import contextmanager
+from typing import Optional, Iterator, Iterable
+
+from scrapingcord.discord.discord_http_client import DiscordHttpClient
+from scrapingcord.utils import Metrics
+
+
+class DiscordClientPool:
+    """
+    Pool of HTTP clients for one or more bots, which each have rate limits of their own.
+    Requests are routed to the client that can make them the soonest, based on the rate limit state of every client.
+    """
+    __clients: list[DiscordHttpClient]
+    __client_keys: list[str]
+    __in_flight: list[int]
+    __request_counts: list[int]
+
+    def __init__(self, tokens: list[Optional[str]]):
+        """
+        :param tokens: The Discord bot tokens, at least one. Can be [None] if only webhook recipients are used
+        """
+        if not tokens:
+            raise ValueError('A client pool needs at least one token')
+
+        self.__clients = [DiscordHttpClient(token) for token in tokens]
+        # Identify the bots by a digest of their token, so cached DM channels can't be mixed up between bots
+        self.__client_keys = [
+            hashlib.sha256(token.encode()).hexdigest()[:16] if token is not None else ''
+            for token in tokens
+        ]
+        self.__in_flight = [0] * len(tokens)
+        self.__request_counts = [0] * len(tokens)
+
+    @property
+    def size(self) -> int:
+        """
+        :return: The number of clients in the pool
+        """
+        return len(self.__clients)
+
+    def get_client(self, index: int) -> DiscordHttpClient:
+        """
+        :param index: The index of the client
+        :return: The client
+        """
+        return self.__clients[index]
+
+    def get_client_key(self, index: int) -> str:
+        """
+        :param index: The index of the client
+        :return: A stable key of the bot of the client, which does not reveal its token
+        """
+        return self.__client_keys[index]
+
+    def set_metrics(self, metrics: Metrics) -> None:
+        """
+        Record the API calls and rate limits of all clients
+
+        :param metrics: The metrics of the run
+        """
+        for client in self.__clients:
+            client.set_metrics(metrics)
+
+    def choose(
+            self,
+            method: str,
+            route: str,
+            route_parameters: Optional[dict] = None,
+            candidates: Optional[Iterable[int]] = None
+    ) -> Optional[int]:
+        """
+        Choose the least loaded client for a request: the one with the shortest rate limit delay,
+        then the fewest requests in flight and then the fewest requests routed to it, so the load is spread evenly.
+
+        :param method: The HTTP method
+        :param route: The API route with placeholders for the parameters
+        :param route_parameters: The values of the placeholders in the route
+        :param candidates: The indices of the clients to choose from, all clients if not given
+        :return: The index of the chosen client or None if there are no candidates
+        """
+        candidates = list(candidates) if candidates is not None else range(len(self.__clients))
+        index = min(
+            candidates,
+            key=lambda candidate: (
+                self.__clients[candidate].get_rate_limit_delay(method, route, route_parameters),
+                self.__in_flight[candidate],
+                self.__request_counts[candidate]
+            ),
+            default=None
+        )
+        if index is not None:
+            # Count the request right away, so concurrent requests that are routed before it starts spread as well
+            self.__request_counts[index] += 1
+
+        return index
+
+    @contextmanager
+    def use(self, index: int) -> Iterator[DiscordHttpClient]:
+        """
+        Use a client for a request, keeping track of its load
+
+        :param index: The index of the client
+        :return: The client
+        """
+        self.__in_flight[index] += 1
+        try:
+            yield self.__clients[index]
+        finally:
+            self.__in_flight[index] -= 1
+
+    async def close(self) -> None:
+        """
+        Close all clients
+        """
+        for client in self.__clients:
+            await client.close()
+
+    @staticmethod
+    def is_rate_limited(response: dict) -> bool:
+        """
+        :param response: The response of a request that was made through a client
+        :return: True if the request was still rate limited after all retries of the client
+        """
+        return response.get('retry_after') is not None
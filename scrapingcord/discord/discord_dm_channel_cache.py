@@ -0,0 +1,116 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class DiscordDMChannelCache(ABC):
+    """
+    Base class for caches of the DM channels of users.
+    Users that Discord refused a DM channel for are cached as well, with a backoff that doubles on every failure.
+    """
+    __ttl: Optional[float]
+    __failure_backoff: float
+    __max_failure_backoff: float
+
+    def __init__(
+            self,
+            ttl: Optional[float] = None,
+            failure_backoff: float = 300.0,
+            max_failure_backoff: float = 86400.0
+    ):
+        """
+        :param ttl: Seconds after which a cached channel expires, None to never expire
+        :param failure_backoff: Seconds before retrying a user for which creating a DM channel failed
+        :param max_failure_backoff: The maximum backoff in seconds after repeated failures
+        """
+        self.__ttl = ttl
+        self.__failure_backoff = failure_backoff
+        self.__max_failure_backoff = max_failure_backoff
+
+    def get(self, recipient_id: str) -> Optional[dict]:
+        """
+        Get the cache entry of a user if it hasn't expired
+
+        :param recipient_id: The user id
+        :return: Dict with the 'channel_id' (None for a failure), 'expires_at' and 'failures' or None if not cached
+        """
+        entry = self.load_entry(recipient_id)
+        if entry is None:
+            return None
+
+        if entry['expires_at'] is not None and entry['expires_at'] <= time.time():
+            # Failures are kept around so the backoff keeps growing
+            if entry['channel_id'] is not None:
+                self.delete_entry(recipient_id)
+            return None
+
+        return entry
+
+    def set_channel(self, recipient_id: str, channel_id: str) -> None:
+        """
+        Cache the DM channel of a user
+
+        :param recipient_id: The user id
+        :param channel_id: The id of the DM channel
+        """
+        self.store_entry(recipient_id, {
+            'channel_id': channel_id,
+            'expires_at': time.time() + self.__ttl if self.__ttl is not None else None,
+            'failures': 0
+        })
+
+    def set_failure(self, recipient_id: str) -> None:
+        """
+        Cache that a DM channel could not be created for a user
+
+        :param recipient_id: The user id
+        """
+        previous_entry = self.load_entry(recipient_id)
+        failures = previous_entry['failures'] + 1 if previous_entry is not None else 1
+        backoff = min(self.__failure_backoff * 2 ** (failures - 1), self.__max_failure_backoff)
+        self.store_entry(recipient_id, {
+            'channel_id': None,
+            'expires_at': time.time() + backoff,
+            'failures': failures
+        })
+
+    @abstractmethod
+    def load_entry(self, recipient_id: str) -> Optional[dict]:
+        """
+        Load the raw cache entry of a user, regardless of whether it expired
+
+        :param recipient_id: The user id
+        :return: The cache entry or None
+        """
+        pass
+
+    @abstractmethod
+    def store_entry(self, recipient_id: str, entry: dict) -> None:
+        """
+        Store the cache entry of a user
+
+        :param recipient_id: The user id
+        :param entry: The cache entry
+        """
+        pass
+
+    @abstractmethod
+    def delete_entry(self, recipient_id: str) -> None:
+        """
+        Remove the cache entry of a user
+
+        :param recipient_id: The user id
+        """
+        pass
+
+    def evict_expired(self) -> None:
+        """
+        Remove all expired channels from the cache
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Release the resources of the cache
+        """
+        pass
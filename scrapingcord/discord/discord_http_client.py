@@ -1,29 +1,16 @@
+import asyncio
 import functools
+import json
 import logging
-from asyncio import sleep, Lock
-from typing import Union
+import time
+from contextlib import ExitStack
+from typing import Union, Optional
 
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientResponse, TCPConnector, ClientError, FormData
 
-from scrapingcord import PingScraper
-
-
-def rate_limit(api_call_func):
-    """
-    Decorator for rate-limiting Discord API calls
-    """
-
-    @functools.wraps(api_call_func)
-    async def retry_on_rate_limit(*args, **kwargs):
-        async with DiscordHttpClient.lock:
-            response = await api_call_func(*args, **kwargs)
-            if response.get('retry_after') is not None:
-                await sleep(float(response.get('retry_after')))
-                response = await api_call_func(*args, **kwargs)
-
-            return response
-
-    return retry_on_rate_limit
+from scrapingcord import VERSION
+from scrapingcord.discord.discord_rate_limiter import DiscordRateLimiter
+from scrapingcord.utils import Metrics
 
 
 def log_api_errors(api_call_func):
@@ -48,19 +35,46 @@ class DiscordHttpClient:
     DISCORD_API_BASE_URL = 'https://discord.com/api'
     API_VERSION = 'v10'
 
-    __token: str
-    __session: Union[ClientSession, None] = None
+    # Route parameters that get their own rate limit bucket
+    MAJOR_PARAMETERS = ('channel_id', 'guild_id', 'webhook_id')
+    # Number of times a rate limited request is retried before giving up
+    MAX_RETRIES = 5
+
+    # Connection pool settings of the session, which is reused for the whole run
+    CONNECTION_LIMIT = 50
+    KEEPALIVE_TIMEOUT = 60.0
+    DNS_CACHE_TTL = 600
 
-    # Lock to avoid problems when we are being rate limited
-    lock = Lock()
+    __token: Optional[str]
+    __session: Union[ClientSession, None] = None
+    __rate_limiter: DiscordRateLimiter
+    __metrics: Metrics
 
-    def __init__(self, token: str):
+    def __init__(self, token: Optional[str]):
         """
         Create a new HTTP client and set the token
 
-        :param token: The Discord token for the bot user
+        :param token: The Discord token for the bot user, can be None if only webhooks are used
         """
         self.__token = token
+        self.__rate_limiter = DiscordRateLimiter()
+        self.__metrics = Metrics.DISABLED
+
+    @property
+    def rate_limiter(self) -> DiscordRateLimiter:
+        """
+        :return: The rate limiter keeping track of the buckets of this client
+        """
+        return self.__rate_limiter
+
+    def set_metrics(self, metrics: Metrics) -> None:
+        """
+        Record the latency and responses of the API calls per route, and the rate limits
+
+        :param metrics: The metrics of the run
+        """
+        self.__metrics = metrics
+        self.__rate_limiter.set_metrics(metrics)
 
     def create_api_url(self, api_route: str):
         """
@@ -71,8 +85,82 @@ class DiscordHttpClient:
         """
         return '/'.join([self.DISCORD_API_BASE_URL, self.API_VERSION, api_route])
 
+    async def request(
+            self,
+            method: str,
+            route: str,
+            route_parameters: Optional[dict] = None,
+            files: Optional[list[tuple[str, str, str]]] = None,
+            **kwargs
+    ) -> dict:
+        """
+        Make a rate limited request to the Discord API. Rate limited requests are retried up to MAX_RETRIES times.
+        Connection errors are returned as an error response, so they can be handled like errors of the API.
+
+        :param method: The HTTP method
+        :param route: The API route with placeholders for the parameters, e.g. 'channels/{channel_id}/messages'
+        :param route_parameters: The values of the placeholders in the route
+        :param files: Files to upload as filename, path and content type. The request is sent as multipart form,
+            with the JSON body as payload_json
+        :param kwargs: Extra arguments for the aiohttp request
+        :return: The parsed JSON response. Error responses also have their HTTP status as 'http_status'
+        """
+        route_parameters = route_parameters if route_parameters is not None else {}
+        bucket_route, major_parameter = self.__get_bucket_route(method, route, route_parameters)
+        url = self.create_api_url(route.format(**route_parameters))
+
+        response_data = {}
+        for _ in range(self.MAX_RETRIES + 1):
+            async with self.__rate_limiter.acquire(bucket_route, major_parameter):
+                started_at = time.perf_counter() if self.__metrics.enabled else None
+                try:
+                    # The form is built for every attempt, since its files are closed once they are sent.
+                    # The stack closes them as well if the request fails before they are sent
+                    with ExitStack() as open_files:
+                        request_kwargs = self.__create_multipart_kwargs(kwargs, files, open_files) if files \
+                            else kwargs
+                        async with self.get_session().request(method, url, **request_kwargs) as response:
+                            response_data = await self.__read_json(response)
+                            if not response.ok:
+                                response_data = {**response_data, 'http_status': response.status}
+                            self.__rate_limiter.update(
+                                bucket_route,
+                                major_parameter,
+                                response.status,
+                                response.headers,
+                                response_data
+                            )
+                except (ClientError, asyncio.TimeoutError, OSError) as error:
+                    logging.getLogger('DiscordHttpClient').warning(f"Request to {bucket_route} failed: {error!r}")
+                    return {'code': 0, 'message': f"Request failed: {error!r}"}
+
+                if started_at is not None:
+                    duration = time.perf_counter() - started_at
+                    self.__metrics.observe('scrapingcord_discord_request_seconds', duration, {'route': bucket_route})
+                    self.__metrics.increment('scrapingcord_discord_responses_total', labels={
+                        'route': bucket_route,
+                        'status': response.status
+                    })
+
+            if response.status != 429:
+                return response_data
+
+        return response_data
+
+    def get_rate_limit_delay(self, method: str, route: str, route_parameters: Optional[dict] = None) -> float:
+        """
+        Get the time a request would currently have to wait for the rate limits of this client
+
+        :param method: The HTTP method
+        :param route: The API route with placeholders for the parameters
+        :param route_parameters: The values of the placeholders in the route
+        :return: The delay in seconds, 0 if the request can be made right away
+        """
+        return self.__rate_limiter.get_delay(
+            *self.__get_bucket_route(method, route, route_parameters if route_parameters is not None else {})
+        )
+
     @log_api_errors
-    @rate_limit
     async def create_dm(self, recipient_id: str) -> dict:
         """
         Create a DM channel with a specific User
@@ -81,41 +169,83 @@ class DiscordHttpClient:
         :param recipient_id: The Snowflake ID of the User
         :return: A DM Channel object https://discord.com/developers/docs/resources/channel#channel-object
         """
-        async with self.get_session().post(
-                self.create_api_url('users/@me/channels'),
-                json={'recipient_id': recipient_id}
-        ) as response:
-            return await response.json()
+        return await self.request('POST', 'users/@me/channels', json={'recipient_id': recipient_id})
 
     @log_api_errors
-    @rate_limit
-    async def create_message(self, channel_id: str, message_contents: dict) -> dict:
+    async def create_message(
+            self,
+            channel_id: str,
+            message_contents: dict,
+            files: Optional[list[tuple[str, str, str]]] = None
+    ) -> dict:
         """
         Send a message to a specific channel
         https://discord.com/developers/docs/resources/channel#create-message
 
         :param channel_id: The ID of the guild or DM channel
         :param message_contents: https://discord.com/developers/docs/reference#message-formatting
+        :param files: Files to attach as filename, path and content type, see
+            https://discord.com/developers/docs/reference#uploading-files
         :return:
         """
-        async with self.get_session().post(
-                self.create_api_url(f"channels/{channel_id}/messages"),
-                json=message_contents
-        ) as response:
-            return await response.json()
+        return await self.request(
+            'POST',
+            'channels/{channel_id}/messages',
+            {'channel_id': channel_id},
+            files,
+            json=message_contents
+        )
+
+    @log_api_errors
+    async def execute_webhook(
+            self,
+            webhook_id: str,
+            webhook_token: str,
+            message_contents: dict,
+            wait: bool = True,
+            files: Optional[list[tuple[str, str, str]]] = None,
+            query: Optional[dict[str, str]] = None
+    ) -> dict:
+        """
+        Send a message using a webhook, which doesn't require a bot token
+        https://discord.com/developers/docs/resources/webhook#execute-webhook
+
+        :param webhook_id: The ID of the webhook
+        :param webhook_token: The token of the webhook
+        :param message_contents: https://discord.com/developers/docs/reference#message-formatting
+        :param wait: Wait for the message to be created. Without waiting, an empty dict is returned on success
+        :param files: Files to attach as filename, path and content type
+        :param query: Extra query parameters, like the thread_id to send the message in a thread
+        :return: The message object if waiting, else an empty dict
+        """
+        return await self.request(
+            'POST',
+            'webhooks/{webhook_id}/{webhook_token}',
+            {'webhook_id': webhook_id, 'webhook_token': webhook_token},
+            files,
+            params={**(query or {}), 'wait': 'true' if wait else 'false'},
+            json=message_contents
+        )
 
     def get_session(self) -> ClientSession:
         """
-        Lazy getter for the ClientSession
+        Lazy getter for the ClientSession. The session is bound to the running event loop,
+        so it should only be used from the loop of the reactor.
 
         :return: A configured ClientSession
         """
         if self.__session is None:
             headers = {
-                'Authorization': 'Bot ' + self.__token,
-                'User-Agent': f"ScraPingCord (https://github.com/DavidHidde/scrapingcord, {PingScraper.VERSION})"
+                'User-Agent': f"ScraPingCord (https://github.com/DavidHidde/scrapingcord, {VERSION})"
             }
-            self.__session = ClientSession(headers=headers)
+            if self.__token is not None:
+                headers['Authorization'] = 'Bot ' + self.__token
+            connector = TCPConnector(
+                limit=self.CONNECTION_LIMIT,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=self.DNS_CACHE_TTL
+            )
+            self.__session = ClientSession(headers=headers, connector=connector)
 
         return self.__session
 
@@ -125,3 +255,55 @@ class DiscordHttpClient:
         """
         if self.__session is not None:
             await self.__session.close()
+            self.__session = None
+
+    def __get_bucket_route(self, method: str, route: str, route_parameters: dict) -> tuple[str, Optional[str]]:
+        """
+        :param method: The HTTP method
+        :param route: The API route with placeholders for the parameters
+        :param route_parameters: The values of the placeholders in the route
+        :return: The route including the method and the value of its major parameter, which identify its bucket
+        """
+        major_parameter = next(
+            (str(route_parameters[key]) for key in self.MAJOR_PARAMETERS if key in route_parameters),
+            None
+        )
+        return f"{method} {route}", major_parameter
+
+    @staticmethod
+    def __create_multipart_kwargs(kwargs: dict, files: list[tuple[str, str, str]], open_files: ExitStack) -> dict:
+        """
+        Turn the arguments of a JSON request into those of a multipart request with files.
+        The files are streamed from disk while the request is sent.
+
+        :param kwargs: The arguments for the aiohttp request, with the JSON body as 'json'
+        :param files: The files to upload as filename, path and content type
+        :param open_files: The stack that closes the files once the request is done
+        :return: The arguments with the form as 'data'
+        """
+        request_kwargs = dict(kwargs)
+        payload = dict(request_kwargs.pop('json', None) or {})
+        payload['attachments'] = [{'id': index, 'filename': filename} for index, (filename, _, _) in enumerate(files)]
+
+        form = FormData()
+        form.add_field('payload_json', json.dumps(payload), content_type='application/json')
+        for index, (filename, path, content_type) in enumerate(files):
+            file = open_files.enter_context(open(path, 'rb'))
+            form.add_field(f'files[{index}]', file, filename=filename, content_type=content_type)
+
+        request_kwargs['data'] = form
+        return request_kwargs
+
+    @staticmethod
+    async def __read_json(response: ClientResponse) -> dict:
+        """
+        Read the JSON body of a response, which can be empty or not JSON at all (e.g. errors from a proxy)
+
+        :param response: The response to read
+        :return: The parsed JSON body, an empty dict for empty successful responses or a dict with the error code
+        """
+        if response.content_type != 'application/json':
+            return {} if response.ok else {'code': response.status, 'message': response.reason}
+
+        data = await response.json()
+        return data if isinstance(data, dict) else {}
@@ -0,0 +1,154 @@
+from typing import Iterable, Generator
+
+
+class DiscordMessagePacker:
+    """
+    Packs lines of text into as few Discord messages as possible without exceeding the Discord limits.
+    Messages are cut on line boundaries, only lines that don't fit in a message on their own are split.
+    Discord rejects messages and embeds without text, so chunks that would only hold whitespace are left out.
+    See https://discord.com/developers/docs/resources/channel#create-message-jsonform-params
+    """
+    CONTENT_LIMIT = 2000
+    EMBED_DESCRIPTION_LIMIT = 4096
+    EMBEDS_PER_MESSAGE = 10
+    EMBEDS_TOTAL_LIMIT = 6000
+
+    __use_embeds: bool
+
+    def __init__(self, use_embeds: bool = False):
+        """
+        :param use_embeds: Pack the lines in embed descriptions instead of the message content.
+            Embeds allow for three times as many characters per message.
+        """
+        self.__use_embeds = use_embeds
+
+    @property
+    def message_limit(self) -> int:
+        """
+        :return: The number of characters of lines joined by newlines that always fit in a single message
+        """
+        return self.EMBEDS_TOTAL_LIMIT if self.__use_embeds else self.CONTENT_LIMIT
+
+    def pack(self, lines: Iterable[str]) -> Generator[dict, None, None]:
+        """
+        Pack the lines into message contents
+
+        :param lines: The lines of text to send, in order
+        :return: Generator of message content dictionaries that can be sent as is, nothing if there is no text
+        """
+        if self.__use_embeds:
+            yield from self.__pack_embeds(lines)
+        else:
+            for content in self.__pack_lines(lines, self.CONTENT_LIMIT):
+                yield {'content': content}
+
+    def pack_items(self, items: Iterable[str]) -> Generator[dict, None, None]:
+        """
+        Pack every item in an embed of its own, with as many embeds per message as the limits allow.
+        Items that are too long for a single embed are spread over multiple embeds.
+
+        :param items: The texts to send, in order
+        :return: Generator of message content dictionaries with embeds
+        """
+        embeds = []
+        message_length = 0
+        for item in items:
+            for description in self.__pack_lines([item], self.EMBED_DESCRIPTION_LIMIT):
+                if embeds and (
+                        len(embeds) >= self.EMBEDS_PER_MESSAGE or
+                        message_length + len(description) > self.EMBEDS_TOTAL_LIMIT
+                ):
+                    yield {'embeds': embeds}
+                    embeds = []
+                    message_length = 0
+
+                embeds.append({'description': description})
+                message_length += len(description)
+
+        if embeds:
+            yield {'embeds': embeds}
+
+    def __pack_embeds(self, lines: Iterable[str]) -> Generator[dict, None, None]:
+        """
+        Pack the lines into embed descriptions, with as many embeds per message as the limits allow
+
+        :param lines: The lines of text to send
+        :return: Generator of message content dictionaries with embeds
+        """
+        descriptions = []
+        description_lines = []
+        description_length = 0
+        message_length = 0
+
+        for line in self.__split_long_lines(lines, self.EMBED_DESCRIPTION_LIMIT):
+            line_length = len(line) + (1 if description_lines else 0)
+            if description_lines and (
+                    description_length + line_length > self.EMBED_DESCRIPTION_LIMIT or
+                    message_length + line_length > self.EMBEDS_TOTAL_LIMIT
+            ):
+                descriptions.extend(self.__join_lines(description_lines))
+                description_lines = []
+                description_length = 0
+                line_length = len(line)
+
+            if descriptions and (
+                    len(descriptions) >= self.EMBEDS_PER_MESSAGE or
+                    message_length + line_length > self.EMBEDS_TOTAL_LIMIT
+            ):
+                yield {'embeds': [{'description': description} for description in descriptions]}
+                descriptions = []
+                message_length = 0
+
+            description_lines.append(line)
+            description_length += line_length
+            message_length += line_length
+
+        descriptions.extend(self.__join_lines(description_lines))
+        if descriptions:
+            yield {'embeds': [{'description': description} for description in descriptions]}
+
+    def __pack_lines(self, lines: Iterable[str], limit: int) -> Generator[str, None, None]:
+        """
+        Greedily join lines as long as they fit within the limit
+
+        :param lines: The lines to join
+        :param limit: The maximum length of a joined string
+        :return: Generator of joined strings
+        """
+        chunk = []
+        chunk_length = 0
+        for line in self.__split_long_lines(lines, limit):
+            line_length = len(line) + (1 if chunk else 0)
+            if chunk and chunk_length + line_length > limit:
+                yield from self.__join_lines(chunk)
+                chunk = []
+                chunk_length = 0
+                line_length = len(line)
+
+            chunk.append(line)
+            chunk_length += line_length
+
+        yield from self.__join_lines(chunk)
+
+    @staticmethod
+    def __join_lines(lines: list[str]) -> list[str]:
+        """
+        :param lines: The lines to join
+        :return: The lines joined by newlines, or nothing if they only hold whitespace
+        """
+        text = '\n'.join(lines)
+        return [text] if text.strip() else []
+
+    @staticmethod
+    def __split_long_lines(lines: Iterable[str], limit: int) -> Generator[str, None, None]:
+        """
+        Split lines (including lines with newlines) into parts that fit within the limit
+
+        :param lines: The lines to split
+        :param limit: The maximum length of a line
+        :return: Generator of lines no longer than the limit
+        """
+        for text in lines:
+            for line in text.split('\n'):
+                for start in range(0, max(len(line), 1), limit):
+                    yield line[start:start + limit]
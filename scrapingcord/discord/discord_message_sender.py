@@ -1,54 +1,278 @@
+import asyncio
+import logging
 from abc import ABC
-from typing import Optional
+from typing import Optional, Union
+from urllib.parse import urlsplit, parse_qsl
 
+from scrapingcord.discord.discord_client_pool import DiscordClientPool
+from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
 from scrapingcord.discord.discord_recipient_type import DiscordRecipientType
-from scrapingcord.discord.discord_http_client import DiscordHttpClient
-from scrapingcord.utils import MessageSender, Recipient
+from scrapingcord.discord.memory_discord_dm_channel_cache import MemoryDiscordDMChannelCache
+from scrapingcord.utils import MessageSender, MessageTemplate, Recipient, Metrics
 
 
 class DiscordMessageSender(MessageSender, ABC):
     """
     Abstract base class with functions for sending Discord messages.
-    Keep in mind the Discord Rate limiting, so only 50 requests per second are possible
+    Keep in mind the Discord Rate limiting, so only 50 requests per second are possible per bot.
+    With multiple bot tokens, every message is sent by the bot that can send it the soonest. DM channels belong to
+    a single bot, so users stick to the bot that has a DM channel with them.
     """
-    __client: DiscordHttpClient
-    __user_dm_channel_cache: dict = {}
+    # Results of delivering a message. Rejected messages got a client error other than a rate limit from Discord,
+    # like a user that doesn't accept DMs or a deleted channel, so sending them again will fail as well
+    RESULT_SENT = 'sent'
+    RESULT_FAILED = 'failed'
+    RESULT_REJECTED = 'rejected'
+    # Number of flushes in a row a recipient may fail before senders that retry give up its messages
+    DEFAULT_MAX_ATTEMPTS = 10
 
-    def __init__(self, token: str):
+    __pool: DiscordClientPool
+    __user_dm_channel_cache: DiscordDMChannelCache
+    __pending_dm_channels: dict[str, asyncio.Task]
+
+    def __init__(
+            self,
+            token: Union[Optional[str], list[str]],
+            dm_channel_cache: Optional[DiscordDMChannelCache] = None
+    ):
+        """
+        :param token: The Discord bot token or a list of tokens of bots that share the channels of the recipients.
+            Can be None if only webhook recipients are used
+        :param dm_channel_cache: Cache for the DM channels of users. Only cached in memory if not given
+        """
+        self.__pool = DiscordClientPool(token if isinstance(token, list) else [token])
+        self.__user_dm_channel_cache = dm_channel_cache if dm_channel_cache is not None \
+            else MemoryDiscordDMChannelCache()
+        self.__pending_dm_channels = {}
+
+    def set_metrics(self, metrics: Metrics) -> None:
+        """
+        Set the metrics to record while sending, including those of the API calls
+
+        :param metrics: The metrics of the run
+        """
+        super().set_metrics(metrics)
+        self.__pool.set_metrics(metrics)
+
+    async def prepare(self, templates: list[MessageTemplate]) -> None:
         """
-        :param token: The Discord bot token
+        Resolve the DM channels of all users in the templates concurrently
+
+        :param templates: The message templates that will be used
         """
-        self.__client = DiscordHttpClient(token)
+        user_ids = {
+            recipient.recipient_id
+            for template in templates
+            for recipient in template.recipients
+            if recipient.recipient_type == DiscordRecipientType.TYPE_USER
+        }
+        await asyncio.gather(*[self.get_user_dm_channel(user_id) for user_id in user_ids])
 
     async def flush(self) -> None:
         """
-        Close the client
+        Nothing is buffered by default
         """
-        await self.__client.close()
+        pass
 
-    async def send_message(self, recipient: Recipient, message_contents: dict) -> bool:
+    async def close(self) -> None:
+        """
+        Close the clients and the DM channel cache
+        """
+        await self.__pool.close()
+        self.__user_dm_channel_cache.close()
+
+    async def send_message(
+            self,
+            recipient: Recipient,
+            message_contents: dict,
+            wait: bool = True,
+            files: Optional[list[tuple[str, str, str]]] = None
+    ) -> bool:
         """
         Send the message to the recipient. Make a DM channel first if the recipient is a user.
+        If the message stays rate limited, it is sent by another bot if there is one.
 
         :param recipient: The recipient of the message
         :param message_contents: The content dictionary of the message
+        :param wait: Wait for Discord to confirm the message was created, only used for webhooks
+        :param files: Files to attach as filename, path and content type
         :return: True if sending the message went well, if there were errors return False
         """
-        channel_id = recipient.recipient_id
-        if recipient.recipient_type == DiscordRecipientType.TYPE_USER:
-            channel_id = await self.get_user_dm_channel(recipient.recipient_id)
+        return (await self.deliver_message(recipient, message_contents, wait, files)) == self.RESULT_SENT
+
+    async def deliver_message(
+            self,
+            recipient: Recipient,
+            message_contents: dict,
+            wait: bool = True,
+            files: Optional[list[tuple[str, str, str]]] = None
+    ) -> str:
+        """
+        Send the message to the recipient like send_message, telling apart failures that are worth retrying
 
-        return channel_id is not None and (await self.__client.create_message(channel_id, message_contents)).get('id') is not None
+        :param recipient: The recipient of the message
+        :param message_contents: The content dictionary of the message
+        :param wait: Wait for Discord to confirm the message was created, only used for webhooks
+        :param files: Files to attach as filename, path and content type
+        :return: RESULT_SENT, RESULT_FAILED if sending can be tried again or RESULT_REJECTED if Discord refused it
+        """
+        if recipient.recipient_type == DiscordRecipientType.TYPE_WEBHOOK:
+            try:
+                webhook_id, webhook_token, query = self.parse_webhook_url(recipient.recipient_id)
+            except ValueError as error:
+                logging.getLogger('DiscordMessageSender').error(str(error))
+                return self.RESULT_REJECTED
+
+            # Webhooks are rate limited per webhook rather than per bot, so they are all sent by the same client
+            with self.__pool.use(0) as client:
+                response = await client.execute_webhook(
+                    webhook_id, webhook_token, message_contents, wait, files, query
+                )
+            sent = response.get('id') is not None if wait else response.get('code') is None
+            return self.RESULT_SENT if sent else self.get_failure_result(response)
+
+        tried_indices = set()
+        while True:
+            if recipient.recipient_type == DiscordRecipientType.TYPE_USER:
+                index, channel_id = await self.__get_user_dm_channel(recipient.recipient_id, tried_indices)
+            else:
+                channel_id = recipient.recipient_id
+                index = self.__pool.choose(
+                    'POST',
+                    'channels/{channel_id}/messages',
+                    {'channel_id': channel_id},
+                    self.__get_untried_indices(tried_indices)
+                )
+
+            if index is None or channel_id is None:
+                return self.RESULT_FAILED
+
+            with self.__pool.use(index) as client:
+                response = await client.create_message(channel_id, message_contents, files)
+            if response.get('id') is not None:
+                return self.RESULT_SENT
+
+            tried_indices.add(index)
+            if not DiscordClientPool.is_rate_limited(response) or len(tried_indices) >= self.__pool.size:
+                return self.get_failure_result(response)
+
+            logging.getLogger('DiscordMessageSender').warning(
+                f"Bot {index + 1} stays rate limited, sending to {recipient.recipient_id} with another bot"
+            )
+
+    @staticmethod
+    def parse_webhook_url(url: str) -> tuple[str, str, dict[str, str]]:
+        """
+        Parse a webhook URL like https://discord.com/api/webhooks/<id>/<token>?thread_id=<thread id>.
+        The query parameters are kept, except wait which is set by the sender. The /slack and /github suffixes are
+        dropped, since the messages are always in the Discord format.
+
+        :param url: The webhook URL
+        :return: The webhook id, the webhook token and the query parameters
+        """
+        parts = urlsplit(url)
+        path = [part for part in parts.path.split('/') if part]
+        if 'webhooks' not in path or len(path) < path.index('webhooks') + 3:
+            raise ValueError(f"Invalid webhook URL {url!r}")
+
+        index = path.index('webhooks')
+        query = {key: value for key, value in parse_qsl(parts.query) if key != 'wait'}
+        return path[index + 1], path[index + 2], query
+
+    @classmethod
+    def get_failure_result(cls, response: dict) -> str:
+        """
+        :param response: The response of a message that was not sent
+        :return: RESULT_REJECTED for client errors other than rate limits, else RESULT_FAILED
+        """
+        status = response.get('http_status')
+        if status is not None and 400 <= status < 500 and status != 429:
+            return cls.RESULT_REJECTED
+
+        return cls.RESULT_FAILED
 
     async def get_user_dm_channel(self, recipient_id: str) -> Optional[str]:
         """
         Get the cached DM channel associated with a user.
+        Concurrent calls for the same user share a single request.
+
+        :param recipient_id: The user id
+        :return: The channel ID if making a DM channel was successful, else None
+        """
+        return (await self.__get_user_dm_channel(recipient_id, set()))[1]
+
+    async def __get_user_dm_channel(
+            self,
+            recipient_id: str,
+            excluded_indices: set[int]
+    ) -> tuple[Optional[int], Optional[str]]:
+        """
+        Get the DM channel of a user and the client of the bot it belongs to.
+        A bot that already has a DM channel with the user is used, otherwise the least loaded bot creates one.
+
+        :param recipient_id: The user id
+        :param excluded_indices: The indices of the clients that should not be used
+        :return: The index of the client and the channel ID, the channel ID is None if no DM channel could be made
+        """
+        candidates = self.__get_untried_indices(excluded_indices)
+        cache_entries = {
+            index: self.__user_dm_channel_cache.get(self.__get_cache_key(recipient_id, index))
+            for index in candidates
+        }
+        for index, entry in cache_entries.items():
+            if entry is not None and entry['channel_id'] is not None:
+                return index, entry['channel_id']
+
+        index = self.__pool.choose(
+            'POST',
+            'users/@me/channels',
+            candidates=[index for index, entry in cache_entries.items() if entry is None]
+        )
+        if index is None:
+            # Every bot failed to make a DM channel recently
+            return (candidates[0] if candidates else None), None
+
+        cache_key = self.__get_cache_key(recipient_id, index)
+        pending_request = self.__pending_dm_channels.get(cache_key)
+        if pending_request is None:
+            pending_request = asyncio.ensure_future(self.__create_dm_channel(recipient_id, index))
+            pending_request.add_done_callback(lambda _: self.__pending_dm_channels.pop(cache_key, None))
+            self.__pending_dm_channels[cache_key] = pending_request
+
+        return index, await asyncio.shield(pending_request)
+
+    async def __create_dm_channel(self, recipient_id: str, index: int) -> Optional[str]:
+        """
+        Create a DM channel between a user and a bot and cache the result.
+        Only failures that Discord rejected are cached, transient failures like connection errors and rate limits
+        are tried again by the next message.
 
         :param recipient_id: The user id
+        :param index: The index of the client of the bot
         :return: The channel ID if making a DM channel was successful, else None
         """
-        if self.__user_dm_channel_cache.get(recipient_id) is None:
-            response = await self.__client.create_dm(recipient_id)
-            self.__user_dm_channel_cache[recipient_id] = response.get('id')
+        cache_key = self.__get_cache_key(recipient_id, index)
+        with self.__pool.use(index) as client:
+            response = await client.create_dm(recipient_id)
+        channel_id = response.get('id')
+        if channel_id is not None:
+            self.__user_dm_channel_cache.set_channel(cache_key, channel_id)
+        elif self.get_failure_result(response) == self.RESULT_REJECTED:
+            self.__user_dm_channel_cache.set_failure(cache_key)
+
+        return channel_id
 
-        return self.__user_dm_channel_cache[recipient_id]
+    def __get_cache_key(self, recipient_id: str, index: int) -> str:
+        """
+        :param recipient_id: The user id
+        :param index: The index of the client of the bot
+        :return: The key of the DM channel of the user and the bot. Just the user id if there is a single bot
+        """
+        return recipient_id if self.__pool.size == 1 else f"{recipient_id}:{self.__pool.get_client_key(index)}"
+
+    def __get_untried_indices(self, tried_indices: set[int]) -> list[int]:
+        """
+        :param tried_indices: The indices of the clients that were tried already
+        :return: The indices of the other clients
+        """
+        return [index for index in range(self.__pool.size) if index not in tried_indices]
@@ -0,0 +1,100 @@
+from asyncio import Lock
+from typing import Optional
+
+
+class DiscordRateLimitBucket:
+    """
+    State of a single Discord rate limit bucket, as reported by the X-RateLimit-* headers.
+    See https://discord.com/developers/docs/topics/rate-limits
+    """
+    # Assumed length of a window in seconds, until a response reports one
+    DEFAULT_RESET_AFTER = 1.0
+
+    limit: Optional[int]
+    remaining: Optional[int]
+    reset_at: float
+    reset_after: Optional[float]
+    estimated: bool
+    discovered: bool
+    lock: Lock
+
+    def __init__(self) -> None:
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.reset_after = None
+        self.estimated = False
+        self.discovered = False
+        self.lock = Lock()
+
+    def get_delay(self, now: float) -> float:
+        """
+        Get the time that should be waited before a request can be made in this bucket
+
+        :param now: The current monotonic time
+        :return: The delay in seconds, 0 if a request can be made right away
+        """
+        if self.remaining is None or self.remaining > 0 or now >= self.reset_at:
+            return 0.0
+
+        return self.reset_at - now
+
+    def reserve(self, now: float) -> None:
+        """
+        Reserve a request in this bucket, starting a new window if the previous one has passed.
+        The new window is assumed to last as long as the last known one, until a response tells otherwise,
+        so the requests made before that response arrives still count against the limit.
+
+        :param now: The current monotonic time
+        """
+        if self.limit is not None and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + (self.reset_after if self.reset_after is not None else self.DEFAULT_RESET_AFTER)
+            self.estimated = True
+
+        if self.remaining is not None:
+            self.remaining = max(self.remaining - 1, 0)
+
+    def update(
+            self,
+            limit: Optional[int],
+            remaining: Optional[int],
+            reset_at: Optional[float],
+            reset_after: Optional[float] = None
+    ) -> None:
+        """
+        Update the bucket with the rate limit information of a response
+
+        :param limit: The number of requests that can be made per window
+        :param remaining: The number of requests left in the window
+        :param reset_at: The monotonic time at which the window resets
+        :param reset_after: The number of seconds until the window resets, as reported by the response
+        """
+        self.discovered = True
+        if limit is not None:
+            self.limit = limit
+        # A fresh window reports the full length of a window
+        if reset_after is not None and (self.reset_after is None or reset_after > self.reset_after):
+            self.reset_after = reset_after
+
+        if remaining is None or reset_at is None:
+            return
+
+        # Responses of concurrent requests can arrive out of order, so only trust the lowest count within a window
+        if self.remaining is None or reset_at > self.reset_at + 0.001:
+            self.remaining = remaining
+        else:
+            self.remaining = min(self.remaining, remaining)
+        # The reset time of a window that was started locally is only an estimate, Discord knows better
+        self.reset_at = reset_at if self.estimated else max(self.reset_at, reset_at)
+        self.estimated = False
+
+    def exhaust(self, reset_at: float) -> None:
+        """
+        Mark the bucket as empty until the given time, used when we get rate limited anyway
+
+        :param reset_at: The monotonic time at which requests can be made again
+        """
+        self.discovered = True
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, reset_at)
@@ -0,0 +1,213 @@
+import logging
+import time
+from asyncio import sleep
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional, AsyncIterator, Mapping
+
+from scrapingcord.discord.discord_rate_limit_bucket import DiscordRateLimitBucket
+from scrapingcord.utils import Metrics
+
+
+class DiscordRateLimiter:
+    """
+    Scheduler for Discord API calls based on the rate limit headers.
+    Every bucket is tracked separately, so only requests that would hit an exhausted bucket are queued.
+    See https://discord.com/developers/docs/topics/rate-limits
+    """
+    HEADER_BUCKET = 'X-RateLimit-Bucket'
+    HEADER_LIMIT = 'X-RateLimit-Limit'
+    HEADER_REMAINING = 'X-RateLimit-Remaining'
+    HEADER_RESET_AFTER = 'X-RateLimit-Reset-After'
+    HEADER_GLOBAL = 'X-RateLimit-Global'
+    HEADER_RETRY_AFTER = 'Retry-After'
+
+    # Requests per second a bot can make over all routes, which Discord doesn't report in headers.
+    # The window has a margin for requests that wait for a connection after leaving the limiter
+    GLOBAL_LIMIT = 50
+    GLOBAL_WINDOW = 1.05
+
+    __route_buckets: dict[str, str]
+    __buckets: dict[str, DiscordRateLimitBucket]
+    __global_request_times: deque[float]
+    __global_reset_at: float
+    __metrics: Metrics
+
+    def __init__(self) -> None:
+        self.__route_buckets = {}
+        self.__buckets = {}
+        self.__global_request_times = deque(maxlen=self.GLOBAL_LIMIT)
+        self.__global_reset_at = 0.0
+        self.__metrics = Metrics.DISABLED
+
+    def set_metrics(self, metrics: Metrics) -> None:
+        """
+        Record the time spent waiting for rate limits and the number of rate limited requests
+
+        :param metrics: The metrics of the run
+        """
+        self.__metrics = metrics
+
+    def get_bucket(self, route: str, major_parameter: Optional[str] = None) -> DiscordRateLimitBucket:
+        """
+        Get the bucket of a route. Routes of which the bucket hash is not known yet get a bucket of their own.
+
+        :param route: The unformatted route including the HTTP method, e.g. 'POST channels/{channel_id}/messages'
+        :param major_parameter: The value of the major parameter of the route, like the channel id
+        :return: The bucket that tracks the route
+        """
+        bucket_key = f"{self.__route_buckets.get(route, route)}:{major_parameter}"
+        if bucket_key not in self.__buckets:
+            self.__buckets[bucket_key] = DiscordRateLimitBucket()
+
+        return self.__buckets[bucket_key]
+
+    def get_delay(self, route: str, major_parameter: Optional[str] = None) -> float:
+        """
+        Get the time a request for the route would currently have to wait
+
+        :param route: The unformatted route including the HTTP method
+        :param major_parameter: The value of the major parameter of the route
+        :return: The delay in seconds, 0 if a request can be made right away
+        """
+        now = time.monotonic()
+        return max(
+            self.__global_reset_at - now,
+            self.__get_global_delay(now),
+            self.get_bucket(route, major_parameter).get_delay(now),
+            0.0
+        )
+
+    @asynccontextmanager
+    async def acquire(self, route: str, major_parameter: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Wait until a request can be made for the route.
+        Requests to a bucket of which the limits are still unknown are made one at a time.
+
+        :param route: The unformatted route including the HTTP method
+        :param major_parameter: The value of the major parameter of the route
+        """
+        bucket = self.get_bucket(route, major_parameter)
+        waiting_since = time.monotonic() if self.__metrics.enabled else None
+        await bucket.lock.acquire()
+        # A response can map the route to a shared bucket while waiting for the bucket of the route itself
+        while (current_bucket := self.get_bucket(route, major_parameter)) is not bucket:
+            bucket.lock.release()
+            bucket = current_bucket
+            await bucket.lock.acquire()
+        locked = True
+        try:
+            await self.__wait_until_available(bucket)
+            if waiting_since is not None:
+                self.__metrics.observe('scrapingcord_rate_limit_wait_seconds', time.monotonic() - waiting_since, {
+                    'route': route
+                })
+            self.__global_request_times.append(time.monotonic())
+            if bucket.discovered:
+                bucket.reserve(time.monotonic())
+                bucket.lock.release()
+                locked = False
+            yield
+        finally:
+            if locked:
+                bucket.lock.release()
+
+    def update(
+            self,
+            route: str,
+            major_parameter: Optional[str],
+            status: int,
+            headers: Mapping[str, str],
+            response: dict
+    ) -> None:
+        """
+        Update the rate limit state with the response of a request
+
+        :param route: The unformatted route including the HTTP method
+        :param major_parameter: The value of the major parameter of the route
+        :param status: The HTTP status of the response
+        :param headers: The headers of the response
+        :param response: The parsed JSON body of the response
+        """
+        now = time.monotonic()
+        bucket = self.get_bucket(route, major_parameter)
+
+        bucket_hash = headers.get(self.HEADER_BUCKET)
+        if bucket_hash is not None and self.__route_buckets.get(route) != bucket_hash:
+            self.__route_buckets[route] = bucket_hash
+            bucket = self.__buckets.setdefault(f"{bucket_hash}:{major_parameter}", bucket)
+
+        reset_after = self.__parse_float(headers.get(self.HEADER_RESET_AFTER))
+        bucket.update(
+            self.__parse_int(headers.get(self.HEADER_LIMIT)),
+            self.__parse_int(headers.get(self.HEADER_REMAINING)),
+            now + reset_after if reset_after is not None else None,
+            reset_after
+        )
+
+        if status != 429:
+            return
+
+        retry_after = self.__parse_float(response.get('retry_after'))
+        if retry_after is None:
+            retry_after = self.__parse_float(headers.get(self.HEADER_RETRY_AFTER)) or 1.0
+
+        is_global = response.get('global') or headers.get(self.HEADER_GLOBAL) is not None
+        self.__metrics.increment('scrapingcord_discord_rate_limited_total', labels={
+            'route': route,
+            'scope': 'global' if is_global else 'bucket'
+        })
+        if is_global:
+            logging.getLogger('DiscordRateLimiter').warning(f"Hit the global rate limit, pausing for {retry_after}s")
+            self.__global_reset_at = max(self.__global_reset_at, now + retry_after)
+        else:
+            logging.getLogger('DiscordRateLimiter').warning(f"Hit the rate limit of {route}, pausing for {retry_after}s")
+            bucket.exhaust(now + retry_after)
+
+    async def __wait_until_available(self, bucket: DiscordRateLimitBucket) -> None:
+        """
+        Sleep until both the global rate limits and the bucket allow a new request
+
+        :param bucket: The bucket the request will be made in
+        """
+        while True:
+            now = time.monotonic()
+            delay = max(self.__global_reset_at - now, self.__get_global_delay(now), bucket.get_delay(now))
+            if delay <= 0:
+                return
+            await sleep(delay)
+
+    def __get_global_delay(self, now: float) -> float:
+        """
+        Get the time until the global limit allows a new request. The limit is tracked over a sliding window,
+        since the windows of Discord start when the requests arrive rather than when they are sent
+
+        :param now: The current monotonic time
+        :return: The delay in seconds, 0 or less if a request can be made right away
+        """
+        if len(self.__global_request_times) < self.GLOBAL_LIMIT:
+            return 0.0
+
+        return self.__global_request_times[0] + self.GLOBAL_WINDOW - now
+
+    @staticmethod
+    def __parse_float(value) -> Optional[float]:
+        """
+        :param value: A header or response value
+        :return: The value as float or None if it is missing or invalid
+        """
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def __parse_int(value) -> Optional[int]:
+        """
+        :param value: A header or response value
+        :return: The value as int or None if it is missing or invalid
+        """
+        try:
+            return int(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
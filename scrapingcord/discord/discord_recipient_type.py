@@ -4,3 +4,4 @@ class DiscordRecipientType:
     """
     TYPE_USER = 'user'
     TYPE_CHANNEL = 'channel'
+    TYPE_WEBHOOK = 'webhook'  # The recipient id is the webhook URL
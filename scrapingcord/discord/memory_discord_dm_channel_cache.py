@@ -0,0 +1,34 @@
+import time
+from typing import Optional
+
+from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
+
+
+class MemoryDiscordDMChannelCache(DiscordDMChannelCache):
+    """
+    DM channel cache that only lives as long as the process
+    """
+    __entries: dict[str, dict]
+
+    def __init__(self, *args, **kwargs):
+        """
+        See DiscordDMChannelCache for the arguments
+        """
+        super().__init__(*args, **kwargs)
+        self.__entries = {}
+
+    def load_entry(self, recipient_id: str) -> Optional[dict]:
+        return self.__entries.get(recipient_id)
+
+    def store_entry(self, recipient_id: str, entry: dict) -> None:
+        self.__entries[recipient_id] = entry
+
+    def delete_entry(self, recipient_id: str) -> None:
+        self.__entries.pop(recipient_id, None)
+
+    def evict_expired(self) -> None:
+        now = time.time()
+        self.__entries = {
+            recipient_id: entry for recipient_id, entry in self.__entries.items()
+            if entry['channel_id'] is None or entry['expires_at'] is None or entry['expires_at'] > now
+        }
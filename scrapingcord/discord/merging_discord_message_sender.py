@@ -0,0 +1,252 @@
+import asyncio
+import logging
+from typing import Optional, Union
+
+from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
+from scrapingcord.discord.discord_message_packer import DiscordMessagePacker
+from scrapingcord.discord.discord_message_sender import DiscordMessageSender
+from scrapingcord.discord.discord_recipient_type import DiscordRecipientType
+from scrapingcord.utils import MessageTemplate, Recipient, MessageOutbox
+
+
+class MergingDiscordMessageSender(DiscordMessageSender):
+    """
+    A Discord message sender which merges the messages of all templates per channel until the sender is flushed.
+    Users are mapped to their DM channels first, so every channel gets its messages once, no matter how many
+    templates or recipients lead to it. The messages of every template are grouped in a section with a header,
+    and the sections are sent in order of priority, packed into as few Discord messages as possible.
+    Priorities only order the sections within a channel. Channels are sent to concurrently, so a channel with
+    high priority sections may still receive its messages after other channels.
+    Messages that could not be delivered are kept and sent again on the next flush. Messages that Discord rejects,
+    and the messages of channels that failed max_attempts flushes in a row, are moved to the dead letter outbox
+    if given, else they are dropped with an error in the log.
+    """
+    SECTION_HEADER = '**{section}**'
+
+    __packer: DiscordMessagePacker
+    __batches: dict[str, dict]
+    __flush_lock: asyncio.Lock
+    __max_attempts: Optional[int]
+    __dead_letter_outbox: Optional[MessageOutbox]
+    __failed_attempts: dict[str, int]
+
+    def __init__(
+            self,
+            token: Union[str, list[str]],
+            use_embeds: bool = False,
+            dm_channel_cache: Optional[DiscordDMChannelCache] = None,
+            max_attempts: Optional[int] = DiscordMessageSender.DEFAULT_MAX_ATTEMPTS,
+            dead_letter_outbox: Optional[MessageOutbox] = None
+    ):
+        """
+        :param token: The Discord bot token or a list of tokens to send with multiple bots
+        :param use_embeds: Pack the messages in embeds, which fit more characters per message
+        :param dm_channel_cache: Cache for the DM channels of users. Only cached in memory if not given
+        :param max_attempts: Number of flushes in a row a channel may fail before its messages are given up,
+            retried forever if None
+        :param dead_letter_outbox: Outbox for the messages that are given up, only logged if not given
+        """
+        super().__init__(token, dm_channel_cache)
+        self.__packer = DiscordMessagePacker(use_embeds)
+        self.__batches = {}
+        self.__flush_lock = asyncio.Lock()
+        self.__max_attempts = max_attempts
+        self.__dead_letter_outbox = dead_letter_outbox
+        self.__failed_attempts = {}
+
+    async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
+        """
+        Add the message to the section of its template in the batch of every channel it should be sent to
+
+        :param template: The message template to send
+        :param template_data: The data to substitute in the template
+        :return Always True since we don't send the messages yet
+        """
+        message, recipients = self.render_message(template, template_data)
+        channel_keys = set()
+        for recipient in recipients:
+            channel_key = await self.__get_channel_key(recipient)
+            if channel_key in channel_keys:
+                # Recipients that lead to the same channel get the message once
+                continue
+
+            channel_keys.add(channel_key)
+            priority = template.priority if template.priority is not None else 0
+            self.__add_entries(channel_key, recipient, [(template.section, priority, message)])
+
+        return True
+
+    async def flush(self) -> None:
+        """
+        Send the batches of all channels.
+        Channels are sent to concurrently, so priorities don't order the channels, only the sections within each.
+        Concurrent flushes wait for each other, so no message is sent twice.
+        """
+        async with self.__flush_lock:
+            batches = list(self.__batches.items())
+            self.__batches = {}
+            results = await asyncio.gather(
+                *[self.__send_batch(channel_key, batch) for channel_key, batch in batches],
+                return_exceptions=True
+            )
+
+        for (channel_key, _), result in zip(batches, results):
+            if isinstance(result, Exception):
+                logging.getLogger('MergingDiscordMessageSender').warning(
+                    f"Failed sending to channel {channel_key}: {result!r}"
+                )
+
+        if self.__dead_letter_outbox is not None:
+            self.__dead_letter_outbox.flush()
+
+        await super().flush()
+
+    async def close(self) -> None:
+        """
+        Close the client, the DM channel cache and the dead letter outbox
+        """
+        await super().close()
+        if self.__dead_letter_outbox is not None:
+            self.__dead_letter_outbox.close()
+
+    async def __get_channel_key(self, recipient: Recipient) -> str:
+        """
+        :param recipient: The recipient of a message
+        :return: The id of the channel the recipient reads, the DM channel for users.
+            The recipient id for webhooks and for users without DM channel
+        """
+        if recipient.recipient_type == DiscordRecipientType.TYPE_USER:
+            channel_id = await self.get_user_dm_channel(recipient.recipient_id)
+            if channel_id is not None:
+                return channel_id
+
+        return recipient.recipient_id
+
+    def __add_entries(
+            self,
+            channel_key: str,
+            recipient: Recipient,
+            entries: list[tuple[Optional[str], int, str]]
+    ) -> None:
+        """
+        Add messages to the sections of the batch of a channel
+
+        :param channel_key: The key of the channel
+        :param recipient: The recipient the batch is sent to, if the channel has no batch yet
+        :param entries: The section, priority and message of every message
+        """
+        batch = self.__batches.setdefault(channel_key, {'recipient': recipient, 'sections': {}})
+        for section_name, priority, message in entries:
+            section = batch['sections'].setdefault(section_name, {'priority': priority, 'messages': []})
+            section['priority'] = max(section['priority'], priority)
+            section['messages'].append(message)
+
+    async def __send_batch(self, channel_key: str, batch: dict) -> None:
+        """
+        Pack and send the sections of a channel in order of priority.
+        Groups that Discord rejects are given up and sending goes on. Sending stops at any other failure,
+        the messages that were not delivered are put back in front of the batch of the channel, or given up
+        if the channel failed max_attempts flushes in a row.
+
+        :param channel_key: The key of the channel
+        :param batch: The recipient and the sections of the channel
+        """
+        recipient = batch['recipient']
+        # Messages without section go first among equal priorities, so they don't look like part of a section
+        groups = self.__group_sections(sorted(
+            batch['sections'].items(),
+            key=lambda item: (item[1]['priority'], item[0] is None),
+            reverse=True
+        ))
+
+        for index, (lines, entries) in enumerate(groups):
+            result = self.RESULT_SENT
+            # Only a single message that is too long on its own is packed into more than one Discord message
+            for message_contents in self.__packer.pack(lines):
+                result = await self.deliver_message(recipient, message_contents)
+                if result != self.RESULT_SENT:
+                    break
+
+            if result == self.RESULT_SENT:
+                self.__failed_attempts.pop(channel_key, None)
+                continue
+            if result == self.RESULT_REJECTED:
+                self.__give_up(recipient, entries, 'rejected by Discord')
+                continue
+
+            undelivered = [entry for _, group_entries in groups[index:] for entry in group_entries]
+            pending_batch = self.__batches.pop(channel_key, None)
+            if pending_batch is not None:
+                undelivered.extend(
+                    (section_name, section['priority'], message)
+                    for section_name, section in pending_batch['sections'].items()
+                    for message in section['messages']
+                )
+
+            attempts = self.__failed_attempts.get(channel_key, 0) + 1
+            if self.__max_attempts is None or attempts < self.__max_attempts:
+                self.__failed_attempts[channel_key] = attempts
+                logging.getLogger('MergingDiscordMessageSender').warning(
+                    f"Failed sending to {recipient.recipient_id}, keeping its messages for the next flush"
+                )
+                self.__add_entries(channel_key, recipient, undelivered)
+            else:
+                self.__failed_attempts.pop(channel_key, None)
+                self.__give_up(recipient, undelivered, f"failed {attempts} flushes in a row")
+            return
+
+    def __give_up(self, recipient: Recipient, entries: list[tuple[Optional[str], int, str]], reason: str) -> None:
+        """
+        Move messages to the dead letter outbox, or drop them if there is none
+
+        :param recipient: The recipient of the messages
+        :param entries: The section, priority and message of every message
+        :param reason: Why the messages are given up, for the log
+        """
+        if self.__dead_letter_outbox is not None:
+            for _, _, message in entries:
+                self.__dead_letter_outbox.add(recipient, message)
+
+        logging.getLogger('MergingDiscordMessageSender').error(
+            f"Gave up {len(entries)} messages to {recipient.recipient_id}, {reason}"
+            + (", moved them to the dead letter outbox" if self.__dead_letter_outbox is not None else "")
+        )
+        if self.metrics.enabled:
+            self.metrics.increment('scrapingcord_dead_letter_messages_total', len(entries), {
+                'recipient': recipient.recipient_id
+            })
+
+    def __group_sections(
+            self,
+            sections: list[tuple[Optional[str], dict]]
+    ) -> list[tuple[list[str], list[tuple[Optional[str], int, str]]]]:
+        """
+        Group the lines of the sections so every group fits in a single Discord message.
+        Every group starts with the header of its first section, also when it continues a section.
+
+        :param sections: The name and the priority and messages of every section, in the order to send them
+        :return: The lines of every group and the section, priority and message of the messages in it
+        """
+        groups = []
+        lines = []
+        entries = []
+        length = -1
+        for section_name, section in sections:
+            header = [self.SECTION_HEADER.format(section=section_name)] if section_name is not None else []
+            for position, message in enumerate(section['messages']):
+                new_lines = header + [message] if position == 0 else [message]
+                if lines and length + sum(len(line) + 1 for line in new_lines) > self.__packer.message_limit:
+                    groups.append((lines, entries))
+                    lines = []
+                    entries = []
+                    length = -1
+                    new_lines = header + [message]
+
+                lines.extend(new_lines)
+                entries.append((section_name, section['priority'], message))
+                length += sum(len(line) + 1 for line in new_lines)
+
+        if lines:
+            groups.append((lines, entries))
+
+        return groups
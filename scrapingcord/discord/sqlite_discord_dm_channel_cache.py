@@ -0,0 +1,55 @@
+import sqlite3
+import time
+from typing import Optional
+
+from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
+
+
+class SqliteDiscordDMChannelCache(DiscordDMChannelCache):
+    """
+    DM channel cache stored in a SQLite database, so channels survive restarts
+    """
+    __connection: sqlite3.Connection
+
+    def __init__(self, path: str, *args, **kwargs):
+        """
+        :param path: Path to the database file, which is created if it doesn't exist
+        See DiscordDMChannelCache for the other arguments
+        """
+        super().__init__(*args, **kwargs)
+        self.__connection = sqlite3.connect(path)
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS dm_channels ('
+            'recipient_id TEXT PRIMARY KEY, channel_id TEXT, expires_at REAL, failures INTEGER NOT NULL)'
+        )
+        self.evict_expired()
+
+    def load_entry(self, recipient_id: str) -> Optional[dict]:
+        row = self.__connection.execute(
+            'SELECT channel_id, expires_at, failures FROM dm_channels WHERE recipient_id = ?',
+            (recipient_id,)
+        ).fetchone()
+
+        return {'channel_id': row[0], 'expires_at': row[1], 'failures': row[2]} if row is not None else None
+
+    def store_entry(self, recipient_id: str, entry: dict) -> None:
+        with self.__connection:
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO dm_channels (recipient_id, channel_id, expires_at, failures) '
+                'VALUES (?, ?, ?, ?)',
+                (recipient_id, entry['channel_id'], entry['expires_at'], entry['failures'])
+            )
+
+    def delete_entry(self, recipient_id: str) -> None:
+        with self.__connection:
+            self.__connection.execute('DELETE FROM dm_channels WHERE recipient_id = ?', (recipient_id,))
+
+    def evict_expired(self) -> None:
+        with self.__connection:
+            self.__connection.execute(
+                'DELETE FROM dm_channels WHERE channel_id IS NOT NULL AND expires_at IS NOT NULL AND expires_at <= ?',
+                (time.time(),)
+            )
+
+    def close(self) -> None:
+        self.__connection.close()
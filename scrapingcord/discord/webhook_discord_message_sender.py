@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from typing import Optional, Union
+
+from scrapingcord.discord.discord_dm_channel_cache import DiscordDMChannelCache
+from scrapingcord.discord.discord_message_packer import DiscordMessagePacker
+from scrapingcord.discord.discord_message_sender import DiscordMessageSender
+from scrapingcord.utils import MessageTemplate, Recipient
+
+
+class WebhookDiscordMessageSender(DiscordMessageSender):
+    """
+    A Discord message sender which batches messages as embeds, up to 10 per API call.
+    Meant for webhook recipients, which don't need a bot token or DM channel and have rate limits of their own.
+    Channel and user recipients are batched the same way if a token is given.
+    """
+    __messages_buffer: dict
+    __packer: DiscordMessagePacker
+    __wait: bool
+
+    def __init__(
+            self,
+            token: Union[Optional[str], list[str]] = None,
+            wait: bool = False,
+            dm_channel_cache: Optional[DiscordDMChannelCache] = None
+    ):
+        """
+        :param token: The Discord bot token or a list of tokens to send with multiple bots,
+            only needed for channel and user recipients
+        :param wait: Wait for Discord to confirm webhook messages were created
+        :param dm_channel_cache: Cache for the DM channels of users. Only cached in memory if not given
+        """
+        super().__init__(token, dm_channel_cache)
+        self.__messages_buffer = {}
+        self.__packer = DiscordMessagePacker()
+        self.__wait = wait
+
+    async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
+        """
+        Add the message to the batch of every recipient, sending batches that are full
+
+        :param template: The message template to send
+        :param template_data: The data to substitute in the template
+        :return True if all full batches were sent successfully, else False
+        """
+        full_batches = []
+        message, recipients = self.render_message(template, template_data)
+        for recipient in recipients:
+            recipient_buffer = self.__messages_buffer.setdefault(recipient.recipient_id, {
+                'recipient': recipient,
+                'messages': []
+            })
+            recipient_buffer['messages'].append(message)
+
+            if len(recipient_buffer['messages']) >= DiscordMessagePacker.EMBEDS_PER_MESSAGE:
+                full_batches.append((recipient, recipient_buffer['messages']))
+                recipient_buffer['messages'] = []
+
+        results = await asyncio.gather(*[self.__send_batch(recipient, messages) for recipient, messages in full_batches])
+        return all(results)
+
+    async def flush(self) -> None:
+        """
+        Send all partial batches.
+        The buffer is swapped out first, so messages added while flushing are kept for the next flush.
+        """
+        messages_buffer = self.__messages_buffer
+        self.__messages_buffer = {}
+        await asyncio.gather(*[
+            self.__send_batch(recipient_dict['recipient'], recipient_dict['messages'])
+            for recipient_dict in messages_buffer.values()
+            if recipient_dict['messages']
+        ])
+
+    async def __send_batch(self, recipient: Recipient, messages: list[str]) -> bool:
+        """
+        Send a batch of messages as embeds
+
+        :param recipient: The recipient of the messages
+        :param messages: The messages to send, one embed each
+        :return: True if all messages were sent, else False
+        """
+        success = True
+        for message_contents in self.__packer.pack_items(messages):
+            if not (await self.send_message(recipient, message_contents, self.__wait)):
+                success = False
+
+        if not success:
+            logging.getLogger('WebhookDiscordMessageSender').warning(
+                f"Failed sending a batch of {len(messages)} message(s) to {recipient.recipient_id}"
+            )
+
+        return success
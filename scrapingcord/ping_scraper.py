@@ -1,19 +1,42 @@
 import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import random
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
 from typing import Optional, Callable, Iterable, Union, Generator
 
 from scrapy import Request
-from scrapy.crawler import CrawlerProcess
+from scrapy.crawler import CrawlerProcess, CrawlerRunner
 from scrapy.http import Response
+from scrapy.utils.defer import deferred_from_coro, maybe_deferred_to_future
+from scrapy.utils.log import configure_logging
+from scrapy.utils.reactor import install_reactor
 
-from scrapingcord.scraper import TemplateSpider
-from scrapingcord.utils import ScrapingImplementation, MessageTemplate, MessageSender
+from scrapingcord import VERSION
+from scrapingcord.scraper import TemplateSpider, DeduplicationPipeline, ParserExecutor
+from scrapingcord.utils import ScrapingImplementation, MessageTemplate, MessageSender, SeenItemStore, \
+    ConditionalRequestStore, StartUrls, StartUrlSource, ForwardingMessageSender, Metrics, MetricsExporter, \
+    WatermarkStore
 
 
 class PingScraper:
     """
     Main class that handles setting up the scraper and manages implementations
     """
-    VERSION = '1.0'
+    VERSION = VERSION
+
+    # Seconds between crawls of implementations without a poll interval when running forever
+    DEFAULT_POLL_INTERVAL = 300.0
+
+    # Maximum number of messages on their way from the worker processes to the coordinator when running in parallel
+    PARALLEL_QUEUE_SIZE = 10000
+    # Maximum number of messages the coordinator takes from the queue at once
+    PARALLEL_BATCH_SIZE = 1000
+    # Seconds between checks whether the worker processes are still alive
+    PARALLEL_POLL_TIMEOUT = 1.0
 
     SCRAPER_SETTINGS = {
         'BOT_NAME': 'scrapingcord',
@@ -21,16 +44,30 @@ class PingScraper:
         'ROBOTSTXT_OBEY': True,
         'LOG_LEVEL': 'WARNING',
         'ITEM_PIPELINES': {
+            'scrapingcord.scraper.DeduplicationPipeline': 200,
             'scrapingcord.scraper.PingPipeline': 300,
         },
         'SPIDER_MIDDLEWARES': {
             'scrapingcord.scraper.ImplementationMapperMiddleware': 543,
         },
+        'EXTENSIONS': {
+            'scrapingcord.scraper.ImplementationThrottle': 500,
+        },
+        'DOWNLOADER_MIDDLEWARES': {
+            # After decompression, so the hash is taken over the actual body
+            'scrapingcord.scraper.ConditionalRequestMiddleware': 580,
+        },
         'TWISTED_REACTOR': 'twisted.internet.asyncioreactor.AsyncioSelectorReactor',
         'REQUEST_FINGERPRINTER_IMPLEMENTATION': '2.7'
     }
 
     __mapping: dict = {}
+    __seen_item_store: Optional[SeenItemStore] = None
+    __conditional_request_store: Optional[ConditionalRequestStore] = None
+    __watermark_store: Optional[WatermarkStore] = None
+    __metrics: Metrics = Metrics.DISABLED
+    __metrics_exporters: tuple[MetricsExporter, ...] = ()
+    __parser_executor: Optional[ParserExecutor] = None
 
     def register_implementation(self, implementation: ScrapingImplementation):
         """
@@ -39,19 +76,25 @@ class PingScraper:
         :param implementation: The implementation to be added
         :return: This instance
         """
-        self.__mapping[implementation.implementation_id] = implementation.export()
+        implementation_dict = implementation.export()
+        implementation_dict[ScrapingImplementation.KEY_TEMPLATE] = self.__get_section_template(
+            implementation.implementation_id,
+            implementation.message_template,
+            implementation.priority
+        )
+        self.__mapping[implementation.implementation_id] = implementation_dict
         return self
 
-    def register_start_urls(self, key: str, urls: list[str]):
+    def register_start_urls(self, key: str, urls: StartUrls):
         """
         Add/replace start urls of an implementation
 
         :param key: The id of the implementation
-        :param urls: List of start urls
+        :param urls: The start urls, as list, (async) iterable, file path or function, see StartUrlSource
         :return: This instance
         """
         if self.__mapping.get(key) is None:
-            self.__mapping[key] = {}
+            self.__mapping[key] = {ScrapingImplementation.KEY_ID: key}
 
         self.__mapping[key][ScrapingImplementation.KEY_URLS] = urls
         return self
@@ -68,10 +111,11 @@ class PingScraper:
         :param parser_func: Function used for parsing Scrapy responses.
             Should follow https://docs.scrapy.org/en/latest/topics/spiders.html#scrapy.Spider.parse but return a
             generator of Requests/dicts. Requests will automatically bind the callback if it's not set.
+            Async generators are supported as well.
         :return: This instance
         """
         if self.__mapping.get(key) is None:
-            self.__mapping[key] = {}
+            self.__mapping[key] = {ScrapingImplementation.KEY_ID: key}
 
         self.__mapping[key][ScrapingImplementation.KEY_PARSER] = parser_func
         return self
@@ -85,9 +129,58 @@ class PingScraper:
         :return: This instance
         """
         if self.__mapping.get(key) is None:
-            self.__mapping[key] = {}
+            self.__mapping[key] = {ScrapingImplementation.KEY_ID: key}
 
-        self.__mapping[key][ScrapingImplementation.KEY_TEMPLATE] = message_template
+        self.__mapping[key][ScrapingImplementation.KEY_TEMPLATE] = self.__get_section_template(
+            key,
+            message_template,
+            self.__mapping[key].get(ScrapingImplementation.KEY_PRIORITY) or 0
+        )
+        return self
+
+    def register_seen_item_store(self, seen_item_store: SeenItemStore):
+        """
+        Set the store used to remember items, so only items that have not been seen before are sent
+
+        :param seen_item_store: The store of seen items
+        :return: This instance
+        """
+        self.__seen_item_store = seen_item_store
+        return self
+
+    def register_conditional_request_store(self, conditional_request_store: ConditionalRequestStore):
+        """
+        Set the store used to remember the validators of start urls,
+        so implementations with conditional requests only parse pages that changed
+
+        :param conditional_request_store: The store of start url validators
+        :return: This instance
+        """
+        self.__conditional_request_store = conditional_request_store
+        return self
+
+    def register_watermark_store(self, watermark_store: WatermarkStore):
+        """
+        Set the store used to remember the watermarks of implementations,
+        so implementations with a watermark key stop following pages without new items
+
+        :param watermark_store: The store of watermarks
+        :return: This instance
+        """
+        self.__watermark_store = watermark_store
+        return self
+
+    def register_metrics(self, metrics: Metrics, exporters: Iterable[MetricsExporter] = ()):
+        """
+        Record metrics of the scraping and sending, like parse times, items per implementation and Discord latency
+
+        :param metrics: The metrics to record in
+        :param exporters: Exporters that make the metrics available, e.g. PrometheusMetricsExporter
+            or JsonMetricsExporter
+        :return: This instance
+        """
+        self.__metrics = metrics
+        self.__metrics_exporters = tuple(exporters)
         return self
 
     def run(
@@ -97,14 +190,381 @@ class PingScraper:
     ) -> None:
         """
         Runs the scraper with the registered implementations.
-        Can't be run inside a asyncio loop and also ends with a asyncio loop.
+        Can't be run inside a asyncio loop. The message sender is flushed and closed on the loop of the reactor
+        before it shuts down, so all sending happens on a single loop.
 
         :param message_sender: The message sender that should be used to send messages
         :param settings: Scrapy settings dictionary. Uses default settings if not given
         """
-        settings = settings if settings is not None else self.SCRAPER_SETTINGS
+        settings = self.__get_settings(settings)
+        self.__start_metrics(message_sender)
+        self.__parser_executor = ParserExecutor()
 
         process = CrawlerProcess(settings=settings)
-        process.crawl(TemplateSpider, mapping=self.__mapping, message_sender=message_sender)
+        process.crawl(TemplateSpider, **self.__get_spider_kwargs(self.__mapping, message_sender))
+
+        # The crawl installs the configured reactor
+        from twisted.internet import reactor
+        reactor.addSystemEventTrigger('before', 'shutdown', lambda: deferred_from_coro(self.__close(message_sender)))
         process.start()
-        asyncio.run(message_sender.flush())
+
+    def run_forever(
+            self,
+            message_sender: MessageSender,
+            settings: Optional[dict] = None
+    ) -> None:
+        """
+        Keeps crawling the registered implementations, each at its own poll interval.
+        All crawls share a single reactor and event loop, so the message sender and stores stay warm between crawls.
+        Blocks until the reactor is stopped, e.g. by an interrupt, after which the message sender is flushed.
+
+        :param message_sender: The message sender that should be used to send messages
+        :param settings: Scrapy settings dictionary. Uses default settings if not given
+        """
+        settings = self.__get_settings(settings)
+
+        self.__start_metrics(message_sender)
+        # The parser pools are shared by all crawls, so processes aren't spawned again for every crawl
+        self.__parser_executor = ParserExecutor()
+
+        install_reactor(settings.get('TWISTED_REACTOR', self.SCRAPER_SETTINGS['TWISTED_REACTOR']))
+        from twisted.internet import reactor
+
+        configure_logging(settings)
+        runner = CrawlerRunner(settings=settings)
+        for key in self.__mapping:
+            reactor.callWhenRunning(lambda k=key: deferred_from_coro(self.__poll(runner, k, message_sender)))
+        reactor.addSystemEventTrigger('before', 'shutdown', lambda: deferred_from_coro(self.__close(message_sender)))
+        reactor.run()
+
+    def run_parallel(
+            self,
+            message_sender: MessageSender,
+            worker_count: Optional[int] = None,
+            settings: Optional[dict] = None,
+            shard_start_urls: bool = False
+    ) -> None:
+        """
+        Runs the registered implementations in a pool of worker processes, each with its own reactor,
+        so CPU heavy parsers can use multiple cores. The implementations are divided over the workers,
+        or with shard_start_urls the start urls of every implementation are.
+        The messages flow back to this process, where the message sender handles them on a single event loop,
+        so rate limits and buffering per recipient stay global. Deduplication also happens here,
+        conditional requests and watermarks are not used. Metrics only cover the sending, since the workers don't share them.
+
+        The implementations are pickled to the workers, so parsers, start urls and template data must be picklable,
+        e.g. module level functions and lists. Scripts have to guard the run with `if __name__ == '__main__'`.
+
+        :param message_sender: The message sender that should be used to send messages
+        :param worker_count: The number of worker processes. Uses the number of CPUs if not given
+        :param settings: Scrapy settings dictionary. Uses default settings if not given
+        :param shard_start_urls: Let every worker crawl every implementation, each taking a share of the start urls.
+            Useful for a single large implementation
+        """
+        settings = self.__get_settings(settings)
+        worker_count = max(worker_count or os.cpu_count() or 1, 1)
+        if self.__conditional_request_store is not None:
+            logging.getLogger('PingScraper').warning('Conditional requests are not used when running in parallel')
+        if self.__watermark_store is not None:
+            logging.getLogger('PingScraper').warning('Watermarks are not used when running in parallel')
+
+        self.__start_metrics(message_sender)
+
+        # Spawn, so every worker starts without the state of this process and can install a reactor of its own
+        context = multiprocessing.get_context('spawn')
+        message_queue = context.Queue(self.PARALLEL_QUEUE_SIZE)
+        workers = [
+            context.Process(target=PingScraper.run_shard, args=(shard, settings, message_queue), daemon=True)
+            for shard in self.__get_shards(worker_count, shard_start_urls)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            asyncio.run(self.__coordinate(message_sender, message_queue, workers))
+        finally:
+            for worker in workers:
+                worker.join(self.PARALLEL_POLL_TIMEOUT)
+                if worker.is_alive():
+                    worker.terminate()
+
+    @staticmethod
+    def run_shard(mapping: dict, settings: dict, message_queue: Queue) -> None:
+        """
+        Entry point of the worker processes of run_parallel. Crawls a shard of the implementations and forwards
+        the messages to the coordinator, followed by None once the crawl is done.
+
+        :param mapping: The exported implementations of the shard by id
+        :param settings: Scrapy settings dictionary
+        :param message_queue: The queue the coordinator reads the messages from
+        """
+        try:
+            process = CrawlerProcess(settings=settings)
+            process.crawl(TemplateSpider, mapping=mapping, message_sender=ForwardingMessageSender(message_queue, mapping))
+            process.start()
+        finally:
+            message_queue.put(None)
+
+    async def __coordinate(self, message_sender: MessageSender, message_queue: Queue, workers: list[BaseProcess]) -> None:
+        """
+        Hand the messages of the worker processes to the message sender until all workers are done.
+        The message sender is always flushed and closed, also when the coordination fails.
+
+        :param message_sender: The message sender that should be used to send messages
+        :param message_queue: The queue the workers forward the messages to
+        :param workers: The worker processes
+        """
+        try:
+            await message_sender.prepare([
+                implementation_dict[ScrapingImplementation.KEY_TEMPLATE]
+                for implementation_dict in self.__mapping.values()
+                if implementation_dict.get(ScrapingImplementation.KEY_TEMPLATE) is not None
+            ])
+            if self.__seen_item_store is not None:
+                DeduplicationPipeline.evict_expired(self.__seen_item_store, self.__mapping)
+
+            pending_fingerprints = set()
+            running_count = len(workers)
+            while running_count:
+                messages = await self.__receive(message_queue, workers)
+                if messages is None:
+                    logging.getLogger('PingScraper').error(f"{running_count} worker(s) stopped without finishing")
+                    break
+
+                for message in messages:
+                    if message is None:
+                        running_count -= 1
+                        continue
+
+                    implementation_id, template_data = message
+                    await self.__forward(message_sender, implementation_id, template_data, pending_fingerprints)
+
+            await message_sender.drain()
+        finally:
+            if self.__seen_item_store is not None:
+                self.__seen_item_store.flush()
+            await self.__close(message_sender)
+
+    async def __forward(
+            self,
+            message_sender: MessageSender,
+            implementation_id: str,
+            template_data: dict,
+            pending_fingerprints: set[tuple[str, str]]
+    ) -> None:
+        """
+        Hand a message of a worker to the message sender, unless its item has been seen before like the
+        DeduplicationPipeline does. The item is only marked as seen once the sender accepted the message.
+
+        :param message_sender: The message sender that should be used to send messages
+        :param implementation_id: The id of the implementation that yielded the item
+        :param template_data: The template data of the item
+        :param pending_fingerprints: The items that were already handed to the sender during this run
+        """
+        implementation_dict = self.__mapping[implementation_id]
+        fingerprint = None
+        if self.__seen_item_store is not None:
+            fingerprint = DeduplicationPipeline.get_fingerprint(implementation_dict, template_data)
+            if self.__seen_item_store.contains(implementation_id, fingerprint):
+                # Refresh items that are still being seen, so they don't get evicted
+                self.__seen_item_store.add(implementation_id, fingerprint)
+                return
+            if (implementation_id, fingerprint) in pending_fingerprints:
+                return
+
+            pending_fingerprints.add((implementation_id, fingerprint))
+
+        try:
+            sent = await message_sender.add_message(
+                implementation_dict[ScrapingImplementation.KEY_TEMPLATE],
+                template_data
+            )
+        except Exception:
+            logging.getLogger('PingScraper').exception(f"Failed sending a message of {implementation_id}")
+            sent = False
+
+        if not sent:
+            self.__metrics.increment('scrapingcord_dropped_items_total', labels={
+                'implementation': implementation_id,
+                'reason': 'send_failed'
+            })
+            return
+
+        if fingerprint is not None:
+            self.__seen_item_store.add(implementation_id, fingerprint)
+
+    async def __receive(self, message_queue: Queue, workers: list[BaseProcess]) -> Optional[list]:
+        """
+        Wait for the next messages of the workers without blocking the event loop
+
+        :param message_queue: The queue the workers forward the messages to
+        :param workers: The worker processes
+        :return: The messages that are available, up to the batch size, or None if all workers stopped
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                messages = [await loop.run_in_executor(None, message_queue.get, True, self.PARALLEL_POLL_TIMEOUT)]
+                break
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    return None
+
+        try:
+            while len(messages) < self.PARALLEL_BATCH_SIZE:
+                messages.append(message_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        return messages
+
+    def __get_shards(self, worker_count: int, shard_start_urls: bool) -> list[dict]:
+        """
+        Divide the implementations over the workers
+
+        :param worker_count: The number of workers
+        :param shard_start_urls: Give every worker all implementations with a share of the start urls
+        :return: The mapping of every worker
+        """
+        if shard_start_urls:
+            return [
+                {
+                    key: {
+                        **implementation_dict,
+                        ScrapingImplementation.KEY_URLS: StartUrlSource(
+                            implementation_dict.get(ScrapingImplementation.KEY_URLS, []),
+                            shard_index,
+                            worker_count
+                        )
+                    }
+                    for key, implementation_dict in self.__mapping.items()
+                }
+                for shard_index in range(worker_count)
+            ]
+
+        shards = [{} for _ in range(min(worker_count, len(self.__mapping)))]
+        for index, (key, implementation_dict) in enumerate(self.__mapping.items()):
+            shards[index % len(shards)][key] = implementation_dict
+
+        return shards
+
+    async def __poll(self, runner: CrawlerRunner, key: str, message_sender: MessageSender) -> None:
+        """
+        Keep crawling a single implementation and flush the messages after every crawl.
+        A failing crawl or flush is logged and retried after the interval, so the implementation keeps being polled.
+
+        :param runner: The crawler runner of the reactor
+        :param key: The id of the implementation
+        :param message_sender: The message sender that should be used to send messages
+        """
+        implementation_dict = self.__mapping[key]
+        interval = implementation_dict.get(ScrapingImplementation.KEY_POLL_INTERVAL) or self.DEFAULT_POLL_INTERVAL
+        jitter = implementation_dict.get(ScrapingImplementation.KEY_POLL_JITTER) or 0.0
+
+        while True:
+            try:
+                await maybe_deferred_to_future(
+                    runner.crawl(TemplateSpider, **self.__get_spider_kwargs({key: implementation_dict}, message_sender))
+                )
+                await message_sender.flush()
+                for store in (self.__conditional_request_store, self.__watermark_store):
+                    if store is not None:
+                        store.flush()
+            except Exception:
+                logging.getLogger('PingScraper').exception(f"Polling {key} failed, retrying after the interval")
+
+            await asyncio.sleep(interval + random.uniform(0, jitter))
+
+    def __get_settings(self, settings: Optional[dict]) -> dict:
+        """
+        Add the downloader slots of the implementations that limit their requests to the settings
+
+        :param settings: Scrapy settings dictionary. Uses default settings if not given
+        :return: The settings to run with
+        """
+        settings = dict(settings if settings is not None else self.SCRAPER_SETTINGS)
+        download_slots = dict(settings.get('DOWNLOAD_SLOTS', {}))
+
+        for implementation_dict in self.__mapping.values():
+            download_slot = ScrapingImplementation.get_download_slot(implementation_dict)
+            if download_slot is None:
+                continue
+
+            slot_settings = {}
+            if implementation_dict.get(ScrapingImplementation.KEY_MAX_CONCURRENCY) is not None:
+                slot_settings['concurrency'] = implementation_dict[ScrapingImplementation.KEY_MAX_CONCURRENCY]
+            if implementation_dict.get(ScrapingImplementation.KEY_DOWNLOAD_DELAY) is not None:
+                slot_settings['delay'] = implementation_dict[ScrapingImplementation.KEY_DOWNLOAD_DELAY]
+            download_slots[download_slot] = slot_settings
+
+        settings['DOWNLOAD_SLOTS'] = download_slots
+        return settings
+
+    def __get_spider_kwargs(self, mapping: dict, message_sender: MessageSender) -> dict:
+        """
+        :param mapping: The implementations the spider should crawl
+        :param message_sender: The message sender that should be used to send messages
+        :return: The arguments for a TemplateSpider
+        """
+        return {
+            'mapping': mapping,
+            'message_sender': message_sender,
+            'seen_item_store': self.__seen_item_store,
+            'conditional_request_store': self.__conditional_request_store,
+            'metrics': self.__metrics,
+            'watermark_store': self.__watermark_store,
+            'parser_executor': self.__parser_executor
+        }
+
+    @staticmethod
+    def __get_section_template(
+            key: str,
+            message_template: MessageTemplate,
+            priority: int
+    ) -> MessageTemplate:
+        """
+        Name the section of the messages of an implementation after it, unless the template has a section already.
+        The priority of the implementation is used if the template doesn't set one.
+
+        :param key: The id of the implementation
+        :param message_template: The message template of the implementation
+        :param priority: The priority of the implementation
+        :return: The message template with a section
+        """
+        if message_template is None or message_template.section is not None:
+            return message_template
+
+        if message_template.priority is not None:
+            priority = message_template.priority
+
+        return message_template.with_section(key, priority)
+
+    def __start_metrics(self, message_sender: MessageSender) -> None:
+        """
+        Let the message sender record metrics and start the exporters
+
+        :param message_sender: The message sender that should be used to send messages
+        """
+        message_sender.set_metrics(self.__metrics)
+        for exporter in self.__metrics_exporters:
+            exporter.start(self.__metrics)
+
+    async def __close(self, message_sender: MessageSender) -> None:
+        """
+        Flush and close the message sender, stop the parser pools, close the stores and export the final metrics
+
+        :param message_sender: The message sender that was used to send messages
+        """
+        await message_sender.flush()
+        await message_sender.close()
+
+        if self.__parser_executor is not None:
+            self.__parser_executor.close()
+            self.__parser_executor = None
+
+        for store in (self.__seen_item_store, self.__conditional_request_store, self.__watermark_store):
+            if store is not None:
+                store.close()
+
+        for exporter in self.__metrics_exporters:
+            exporter.close(self.__metrics)
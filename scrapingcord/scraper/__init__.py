@@ -1,4 +1,8 @@
 from scrapingcord.scraper.template_spider import TemplateSpider
 from scrapingcord.scraper.ping_pipeline import PingPipeline
+from scrapingcord.scraper.deduplication_pipeline import DeduplicationPipeline
 from scrapingcord.scraper.template_item import TemplateItem
 from scrapingcord.scraper.implementation_mapper_middleware import ImplementationMapperMiddleware
+from scrapingcord.scraper.conditional_request_middleware import ConditionalRequestMiddleware
+from scrapingcord.scraper.implementation_throttle import ImplementationThrottle
+from scrapingcord.scraper.parser_executor import ParserExecutor
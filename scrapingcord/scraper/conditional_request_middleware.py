@@ -0,0 +1,91 @@
+import hashlib
+import logging
+from typing import Union
+
+from scrapy import Request
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import Response
+
+from scrapingcord.scraper.template_spider import TemplateSpider
+from scrapingcord.utils import ScrapingImplementation
+
+
+class ConditionalRequestMiddleware:
+    """
+    Downloader middleware that makes conditional requests for the start urls of implementations that opt in.
+    Responses that are not modified, or of which the body did not change, are ignored so the parser is not called.
+    The validators of a response are stored by the spider once the crawl finished without failures.
+    """
+
+    def process_request(self, request: Request, spider: TemplateSpider) -> None:
+        """
+        Add the If-None-Match and If-Modified-Since headers based on the previous response
+
+        :param request: The request that is about to be downloaded
+        :param spider: The running spider
+        """
+        implementation_id = self.__get_implementation_id(request, spider)
+        if implementation_id is None:
+            return
+
+        validators = spider.conditional_request_store.get(implementation_id, request.url)
+        if validators is None:
+            return
+
+        if validators.get('etag'):
+            request.headers.setdefault('If-None-Match', validators['etag'])
+        if validators.get('last_modified'):
+            request.headers.setdefault('If-Modified-Since', validators['last_modified'])
+
+    def process_response(
+            self,
+            request: Request,
+            response: Response,
+            spider: TemplateSpider
+    ) -> Union[Request, Response]:
+        """
+        Ignore the response if it is unchanged, otherwise let the spider store its validators after the crawl
+
+        :param request: The downloaded request
+        :param response: The response of the request
+        :param spider: The running spider
+        :return: The response if it changed
+        """
+        implementation_id = self.__get_implementation_id(request, spider)
+        if implementation_id is None:
+            return response
+
+        store = spider.conditional_request_store
+        if response.status == 304:
+            logging.getLogger('ConditionalRequestMiddleware').debug(f"Not modified: {request.url}")
+            raise IgnoreRequest(f"Not modified: {request.url}")
+        if response.status != 200:
+            return response
+
+        previous_validators = store.get(implementation_id, request.url)
+        body_hash = hashlib.sha256(response.body).hexdigest()
+        spider.set_validators(implementation_id, request.url, {
+            'etag': response.headers.get('ETag', b'').decode('latin-1') or None,
+            'last_modified': response.headers.get('Last-Modified', b'').decode('latin-1') or None,
+            'body_hash': body_hash
+        })
+
+        if previous_validators is not None and previous_validators.get('body_hash') == body_hash:
+            logging.getLogger('ConditionalRequestMiddleware').debug(f"Body unchanged: {request.url}")
+            raise IgnoreRequest(f"Body unchanged: {request.url}")
+
+        return response
+
+    @staticmethod
+    def __get_implementation_id(request: Request, spider: TemplateSpider) -> Union[str, None]:
+        """
+        Get the implementation id of a start url request that should be conditional
+
+        :param request: The request
+        :param spider: The running spider
+        :return: The implementation id or None if the request should not be conditional
+        """
+        if spider.conditional_request_store is None or not request.meta.get(TemplateSpider.META_CONDITIONAL_REQUEST):
+            return None
+
+        return request.meta.get(ScrapingImplementation.KEY_ID)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import time
+from typing import Optional
+
+from scrapy.exceptions import DropItem
+
+from scrapingcord.utils import SeenItemStore, ScrapingImplementation
+from scrapingcord.scraper.template_item import TemplateItem
+from scrapingcord.scraper.template_spider import TemplateSpider
+
+
+class DeduplicationPipeline:
+    """
+    Pipeline that drops items which have been seen before, so only new content is sent.
+    Items are only marked as seen by the PingPipeline once their message has been accepted by the sender,
+    so items of which the message failed are sent again by a later crawl.
+    Only active if the spider has a SeenItemStore.
+    """
+    __seen_item_store: Optional[SeenItemStore]
+    __pending_fingerprints: set[tuple[str, str]]
+
+    def open_spider(self, spider: TemplateSpider) -> None:
+        """
+        Get the store of the spider and evict items that have passed the retention of their implementation
+
+        :param spider: The running spider
+        """
+        self.__seen_item_store = spider.seen_item_store
+        self.__pending_fingerprints = set()
+        if self.__seen_item_store is not None:
+            self.evict_expired(self.__seen_item_store, spider.get_implementations())
+
+    def close_spider(self, spider: TemplateSpider) -> None:
+        """
+        Persist the seen items
+
+        :param spider: The running spider
+        """
+        if self.__seen_item_store is not None:
+            self.__seen_item_store.flush()
+
+    def process_item(self, item: TemplateItem, spider: TemplateSpider) -> TemplateItem:
+        """
+        Drop the item if it has been seen before or is already being sent by this crawl
+
+        :param item:
+        :param spider:
+        :return: The item if it is new
+        """
+        implementation_id = item.implementation_id
+        template_data = item.template_data
+        if self.__seen_item_store is None or implementation_id is None or template_data is None:
+            return item
+
+        fingerprint = self.get_fingerprint(spider.get_implementations().get(implementation_id, {}), template_data)
+        is_seen = self.__seen_item_store.contains(implementation_id, fingerprint)
+        if is_seen:
+            # Refresh items that are still being seen, so they don't get evicted
+            self.__seen_item_store.add(implementation_id, fingerprint)
+
+        if is_seen or (implementation_id, fingerprint) in self.__pending_fingerprints:
+            spider.metrics.increment('scrapingcord_dropped_items_total', labels={
+                'implementation': implementation_id,
+                'reason': 'duplicate'
+            })
+            raise DropItem(f"Duplicate item of {implementation_id}", log_level="DEBUG")
+
+        self.__pending_fingerprints.add((implementation_id, fingerprint))
+        item.fingerprint = fingerprint
+        return item
+
+    @staticmethod
+    def evict_expired(seen_item_store: SeenItemStore, implementations: dict) -> None:
+        """
+        Evict the items that have passed the retention of their implementation
+
+        :param seen_item_store: The store of seen items
+        :param implementations: The exported implementations by id
+        """
+        for implementation_id, implementation_dict in implementations.items():
+            retention = implementation_dict.get(ScrapingImplementation.KEY_DEDUP_RETENTION)
+            if retention is not None:
+                seen_item_store.evict(implementation_id, time.time() - retention)
+
+    @staticmethod
+    def get_fingerprint(implementation_dict: dict, template_data: dict) -> str:
+        """
+        Fingerprint an item by its deduplication key
+
+        :param implementation_dict: The exported implementation of the item
+        :param template_data: The template data of the item
+        :return: The fingerprint of the item
+        """
+        key_func = implementation_dict.get(ScrapingImplementation.KEY_DEDUP_KEY)
+        key = key_func(template_data) if key_func is not None else template_data
+        return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
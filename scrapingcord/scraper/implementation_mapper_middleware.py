@@ -1,4 +1,5 @@
-from typing import Union, Generator
+import logging
+from typing import Union, Generator, AsyncIterable, AsyncGenerator, Optional
 
 from scrapy import Request
 from scrapy.http import Response
@@ -10,14 +11,16 @@ from scrapingcord.utils import ScrapingImplementation
 
 class ImplementationMapperMiddleware:
     """
-    Middleware that binds the implementation to the parse response
+    Middleware that binds the implementation to the parse response.
+    For implementations with a watermark, the Requests of a response are held back until all its items are known,
+    and dropped if all items are at or below the watermark.
     """
     def process_spider_output(
             self,
             response: Response,
             result: Generator[Union[Request, dict], Union[Request, dict], None],
             spider: TemplateSpider
-    ) -> Generator[Union[Request, dict], Union[Request, dict], None]:
+    ) -> Generator[Union[Request, TemplateItem], None, None]:
         """
         Couple the implementation to all new requests or parse dicts into TemplateItems
 
@@ -26,16 +29,161 @@ class ImplementationMapperMiddleware:
         :param spider:
         :return:
         """
-        implementation = response.meta
+        implementation = spider.get_implementation(response)
+        uses_watermark = implementation.get(ScrapingImplementation.KEY_WATERMARK_KEY) is not None
+        held_requests = []
+        item_count = 0
+        new_item_count = 0
 
         for item in result:
-            if type(item) == Request:
-                yield item.replace(
-                    callback=(item.callback if item.callback else implementation.get(ScrapingImplementation.KEY_PARSER)),
-                    meta=implementation
-                )
-            if type(item) == dict:
-                yield TemplateItem(
-                    template=implementation.get(ScrapingImplementation.KEY_TEMPLATE),
-                    template_data=item
-                )
+            mapped_item = self.__map_item(item, implementation)
+            if isinstance(mapped_item, TemplateItem):
+                item_count += 1
+                new_item_count += self.__track_watermark(spider, implementation, mapped_item)
+            if uses_watermark and isinstance(mapped_item, Request):
+                held_requests.append(mapped_item)
+            elif mapped_item is not None:
+                yield mapped_item
+
+        yield from self.__release_requests(spider, response, implementation, held_requests, item_count, new_item_count)
+        self.__count_items(spider, implementation, item_count)
+
+    async def process_spider_output_async(
+            self,
+            response: Response,
+            result: AsyncIterable[Union[Request, dict]],
+            spider: TemplateSpider
+    ) -> AsyncGenerator[Union[Request, TemplateItem], None]:
+        """
+        Asynchronous version of process_spider_output, used when the output comes from an async generator
+
+        :param response: The original response for the parse function
+        :param result: Async iterable of Requests and dicts
+        :param spider:
+        :return:
+        """
+        implementation = spider.get_implementation(response)
+        uses_watermark = implementation.get(ScrapingImplementation.KEY_WATERMARK_KEY) is not None
+        held_requests = []
+        item_count = 0
+        new_item_count = 0
+
+        async for item in result:
+            mapped_item = self.__map_item(item, implementation)
+            if isinstance(mapped_item, TemplateItem):
+                item_count += 1
+                new_item_count += self.__track_watermark(spider, implementation, mapped_item)
+            if uses_watermark and isinstance(mapped_item, Request):
+                held_requests.append(mapped_item)
+            elif mapped_item is not None:
+                yield mapped_item
+
+        for request in self.__release_requests(
+                spider, response, implementation, held_requests, item_count, new_item_count
+        ):
+            yield request
+        self.__count_items(spider, implementation, item_count)
+
+    @staticmethod
+    def __track_watermark(spider: TemplateSpider, implementation: dict, item: TemplateItem) -> int:
+        """
+        Raise the watermark of the crawl with the ordering key of an item
+
+        :param spider:
+        :param implementation: The implementation dict the response belongs to
+        :param item: The item yielded by the parser
+        :return: 1 if the item is above the watermark of the previous crawl or has no key, else 0
+        """
+        watermark_key_func = implementation.get(ScrapingImplementation.KEY_WATERMARK_KEY)
+        if watermark_key_func is None:
+            return 1
+
+        key = watermark_key_func(item.template_data)
+        if key is None:
+            return 1
+
+        implementation_id = implementation.get(ScrapingImplementation.KEY_ID)
+        spider.raise_watermark(implementation_id, key)
+        watermark = spider.get_watermark(implementation_id)
+        return 1 if watermark is None or key > watermark else 0
+
+    @staticmethod
+    def __release_requests(
+            spider: TemplateSpider,
+            response: Response,
+            implementation: dict,
+            requests: list[Request],
+            item_count: int,
+            new_item_count: int
+    ) -> list[Request]:
+        """
+        Decide whether the held back Requests of a response are followed.
+        Responses without items, like index pages, are always followed.
+
+        :param spider:
+        :param response: The original response for the parse function
+        :param implementation: The implementation dict the response belongs to
+        :param requests: The Requests yielded by the parser
+        :param item_count: The number of items yielded by the parser
+        :param new_item_count: The number of those items above the watermark
+        :return: The Requests to follow
+        """
+        if not requests or not item_count or new_item_count:
+            return requests
+
+        implementation_id = implementation.get(ScrapingImplementation.KEY_ID)
+        logging.getLogger('ImplementationMapperMiddleware').debug(
+            f"All items of {response.url} are at or below the watermark of {implementation_id}, "
+            f"not following {len(requests)} request(s)"
+        )
+        if spider.metrics.enabled:
+            spider.metrics.increment('scrapingcord_watermark_stops_total', labels={'implementation': implementation_id})
+
+        return []
+
+    @staticmethod
+    def __count_items(spider: TemplateSpider, implementation: dict, item_count: int) -> None:
+        """
+        Record the number of items a response yielded
+
+        :param spider:
+        :param implementation: The implementation dict the response belongs to
+        :param item_count: The number of items
+        """
+        if item_count and spider.metrics.enabled:
+            spider.metrics.increment('scrapingcord_items_total', item_count, {
+                'implementation': implementation.get(ScrapingImplementation.KEY_ID)
+            })
+
+    @staticmethod
+    def __map_item(item: Union[Request, dict], implementation: dict) -> Optional[Union[Request, TemplateItem]]:
+        """
+        Tag a Request (or any subclass) with the implementation id, slot and priority
+        or turn a dict into a TemplateItem.
+        Requests without a callback are parsed by the parser of the implementation through the spider.
+
+        :param item: A Request or dict yielded by the parser
+        :param implementation: The implementation dict the response belongs to
+        :return: The mapped Request or TemplateItem, None if the output is not supported
+        """
+        if isinstance(item, Request):
+            item.meta.setdefault(ScrapingImplementation.KEY_ID, implementation.get(ScrapingImplementation.KEY_ID))
+
+            download_slot = ScrapingImplementation.get_download_slot(implementation)
+            if download_slot is not None:
+                item.meta.setdefault('download_slot', download_slot)
+            if implementation.get(ScrapingImplementation.KEY_AUTOTHROTTLE_TARGET):
+                # Throttled by the ImplementationThrottle instead of Scrapy's AutoThrottle
+                item.meta.setdefault('autothrottle_dont_adjust_delay', True)
+            if item.priority == 0:
+                item.priority = implementation.get(ScrapingImplementation.KEY_PRIORITY) or 0
+
+            return item
+        if isinstance(item, dict):
+            return TemplateItem(
+                template=implementation.get(ScrapingImplementation.KEY_TEMPLATE),
+                template_data=item,
+                implementation_id=implementation.get(ScrapingImplementation.KEY_ID)
+            )
+
+        return None
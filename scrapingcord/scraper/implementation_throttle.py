@@ -0,0 +1,53 @@
+from scrapy import Request, signals
+from scrapy.crawler import Crawler
+from scrapy.http import Response
+
+from scrapingcord.utils import ScrapingImplementation
+
+
+class ImplementationThrottle:
+    """
+    Extension that adjusts the download delay of implementations with an autothrottle target,
+    using the same policy as Scrapy's AutoThrottle but with a target concurrency per implementation
+    """
+    __crawler: Crawler
+    __max_delay: float
+
+    def __init__(self, crawler: Crawler):
+        """
+        :param crawler: The running crawler
+        """
+        self.__crawler = crawler
+        self.__max_delay = crawler.settings.getfloat('AUTOTHROTTLE_MAX_DELAY', 60.0)
+        crawler.signals.connect(self.response_downloaded, signal=signals.response_downloaded)
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler):
+        return cls(crawler)
+
+    def response_downloaded(self, response: Response, request: Request) -> None:
+        """
+        Move the delay of the slot of the implementation towards latency / target
+
+        :param response: The downloaded response
+        :param request: The request of the response
+        """
+        implementation = self.__crawler.spider.get_implementations().get(
+            request.meta.get(ScrapingImplementation.KEY_ID),
+            {}
+        )
+        target = implementation.get(ScrapingImplementation.KEY_AUTOTHROTTLE_TARGET)
+        latency = request.meta.get('download_latency')
+        slot = self.__crawler.engine.downloader.slots.get(request.meta.get('download_slot'))
+        if not target or latency is None or slot is None:
+            return
+
+        target_delay = latency / target
+        new_delay = max(target_delay, (slot.delay + target_delay) / 2.0)
+        new_delay = min(max(implementation.get(ScrapingImplementation.KEY_DOWNLOAD_DELAY) or 0.0, new_delay), self.__max_delay)
+
+        # Error pages tend to be fast, so don't let them lower the delay
+        if response.status != 200 and new_delay <= slot.delay:
+            return
+
+        slot.delay = new_delay
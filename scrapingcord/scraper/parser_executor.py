@@ -0,0 +1,220 @@
+import asyncio
+import importlib
+import multiprocessing
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Optional, Any
+
+from scrapy import Request, Spider
+from scrapy.http import Response, TextResponse
+from scrapy.utils.misc import arg_to_iter
+from scrapy.utils.request import request_from_dict
+
+from scrapingcord.utils import ScrapingImplementation
+
+
+class ParserExecutor:
+    """
+    Runs parsers in a pool of threads or processes, so heavy parsing doesn't block the reactor.
+    Processes get a picklable snapshot of the response and send back the parsed dicts and the Requests as dicts.
+    Callbacks and errbacks of those Requests are sent back by their import path, so they should be defined at the top
+    level of a module.
+    """
+    # Types of meta values that are copied into the snapshot of a response
+    SNAPSHOT_META_TYPES = (str, int, float, bool, type(None), bytes, list, tuple, dict)
+
+    __max_workers: Optional[int]
+    __executors: dict[str, Executor]
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        :param max_workers: The number of workers of each pool, the defaults of the pools if not given
+        """
+        self.__max_workers = max_workers
+        self.__executors = {}
+
+    async def parse(
+            self,
+            executor_type: str,
+            parser: Callable,
+            response: Response,
+            spider: Spider,
+            kwargs: dict
+    ) -> tuple[list, float]:
+        """
+        Run a parser in a pool and collect its output
+
+        :param executor_type: ScrapingImplementation.EXECUTOR_THREAD or ScrapingImplementation.EXECUTOR_PROCESS
+        :param parser: The parser of the implementation
+        :param response: The response to parse
+        :param spider: The spider, used to restore the Requests of parsers run in processes
+        :param kwargs: The keyword arguments of the callback
+        :return: The Requests and dicts the parser returned and the seconds spent parsing
+        """
+        loop = asyncio.get_running_loop()
+        if executor_type == ScrapingImplementation.EXECUTOR_THREAD:
+            return await loop.run_in_executor(
+                self.__get_executor(executor_type),
+                self.run_parser,
+                parser,
+                response,
+                kwargs
+            )
+
+        output, duration = await loop.run_in_executor(
+            self.__get_executor(executor_type),
+            self.parse_snapshot,
+            parser,
+            self.create_snapshot(response),
+            kwargs
+        )
+        return [
+            self.restore_request(result, spider) if is_request else result
+            for is_request, result in output
+        ], duration
+
+    def close(self) -> None:
+        """
+        Stop the pools without waiting for them
+        """
+        for executor in self.__executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.__executors = {}
+
+    def __get_executor(self, executor_type: str) -> Executor:
+        """
+        Lazily create the pool of a type.
+        Processes are spawned rather than forked, since forking a process with a running reactor is not safe.
+
+        :param executor_type: ScrapingImplementation.EXECUTOR_THREAD or ScrapingImplementation.EXECUTOR_PROCESS
+        :return: The pool
+        """
+        if executor_type not in self.__executors:
+            self.__executors[executor_type] = ThreadPoolExecutor(self.__max_workers, 'scrapingcord-parser') \
+                if executor_type == ScrapingImplementation.EXECUTOR_THREAD \
+                else ProcessPoolExecutor(self.__max_workers, multiprocessing.get_context('spawn'))
+
+        return self.__executors[executor_type]
+
+    @classmethod
+    def create_snapshot(cls, response: Response) -> dict:
+        """
+        Copy everything a parser needs from a response into a picklable dict
+
+        :param response: The response
+        :return: The snapshot of the response
+        """
+        return {
+            'class': type(response),
+            'url': response.url,
+            # The url of the request differs from that of the response after a redirect
+            'request_url': response.request.url if response.request is not None else response.url,
+            'status': response.status,
+            'headers': {key: list(values) for key, values in response.headers.items()},
+            'body': response.body,
+            'flags': list(response.flags),
+            'encoding': response.encoding if isinstance(response, TextResponse) else None,
+            'meta': {
+                key: value for key, value in response.meta.items() if isinstance(value, cls.SNAPSHOT_META_TYPES)
+            }
+        }
+
+    @staticmethod
+    def restore_snapshot(snapshot: dict) -> Response:
+        """
+        Create a response from a snapshot, including a request carrying its meta
+
+        :param snapshot: The snapshot of a response
+        :return: The response
+        """
+        kwargs = {'encoding': snapshot['encoding']} if snapshot['encoding'] is not None else {}
+        return snapshot['class'](
+            snapshot['url'],
+            status=snapshot['status'],
+            headers=snapshot['headers'],
+            body=snapshot['body'],
+            flags=snapshot['flags'],
+            request=Request(snapshot['request_url'], meta=snapshot['meta']),
+            **kwargs
+        )
+
+    @staticmethod
+    def run_parser(parser: Callable, response: Response, kwargs: dict) -> tuple[list, float]:
+        """
+        Run a parser and collect its output
+
+        :param parser: The parser
+        :param response: The response to parse
+        :param kwargs: The keyword arguments of the callback
+        :return: The Requests and dicts the parser returned and the seconds spent parsing
+        """
+        started_at = time.perf_counter()
+        output = list(arg_to_iter(parser(response, **kwargs)))
+        return output, time.perf_counter() - started_at
+
+    @staticmethod
+    def parse_snapshot(parser: Callable, snapshot: dict, kwargs: dict) -> tuple[list[tuple[bool, Any]], float]:
+        """
+        Run a parser on a snapshot in a worker process. Requests are turned into dicts, so they can be sent back.
+
+        :param parser: The parser, which should be defined at the top level of a module
+        :param snapshot: The snapshot of the response
+        :param kwargs: The keyword arguments of the callback
+        :return: Whether every result is a Request and the result, and the seconds spent parsing
+        """
+        output, duration = ParserExecutor.run_parser(parser, ParserExecutor.restore_snapshot(snapshot), kwargs)
+        return [
+            (True, ParserExecutor.serialize_request(result)) if isinstance(result, Request) else (False, result)
+            for result in output
+        ], duration
+
+    @staticmethod
+    def serialize_request(request: Request) -> dict:
+        """
+        Turn a Request into a picklable dict, with its callback and errback as import paths
+
+        :param request: The Request
+        :return: The Request as dict
+        :raises ValueError: If the callback or errback can't be imported, like lambdas and nested functions
+        """
+        callback_paths = {}
+        for name in ('callback', 'errback'):
+            function = getattr(request, name)
+            if function is None:
+                continue
+
+            path = f"{getattr(function, '__module__', None)}:{getattr(function, '__qualname__', '')}"
+            if '<' in path or path.startswith('None:'):
+                raise ValueError(
+                    f"The {name} {function!r} of a Request yielded by a parser run in a process can't be sent back, "
+                    f"use a function defined at the top level of a module"
+                )
+            callback_paths[name] = path
+
+        return {
+            'request': request.replace(callback=None, errback=None).to_dict(),
+            'callback_paths': callback_paths
+        }
+
+    @staticmethod
+    def restore_request(request_dict: dict, spider: Spider) -> Request:
+        """
+        Create a Request from a dict made by serialize_request, importing its callback and errback
+
+        :param request_dict: The Request as dict
+        :param spider: The spider the Request belongs to
+        :return: The Request
+        """
+        request = request_from_dict(request_dict['request'], spider=spider)
+        if not request_dict['callback_paths']:
+            return request
+
+        functions = {}
+        for name, path in request_dict['callback_paths'].items():
+            module_name, qualname = path.split(':', 1)
+            function = importlib.import_module(module_name)
+            for attribute in qualname.split('.'):
+                function = getattr(function, attribute)
+            functions[name] = function
+
+        return request.replace(**functions)
@@ -2,27 +2,39 @@
 from typing import Optional
 from scrapy.exceptions import DropItem
 
-from scrapingcord.utils import MessageSender
+from scrapingcord.utils import MessageSender, Metrics
 from scrapingcord.scraper.template_item import TemplateItem
 from scrapingcord.scraper.template_spider import TemplateSpider
 
 
 class PingPipeline:
     """
-    Pipeline that sends a message using the MessageSender
+    Pipeline that sends a message using the MessageSender, and marks deduplicated items as seen once it is sent
     """
     __message_sender: Optional[MessageSender]
+    __metrics: Metrics
 
-    def open_spider(self, spider: TemplateSpider) -> None:
+    async def open_spider(self, spider: TemplateSpider) -> None:
         """
-        Start the Discord client given the token
+        Get the message sender of the spider and let it prepare for the templates of the implementations
 
         :param spider: The running spider
         """
         self.__message_sender = spider.message_sender
+        self.__metrics = spider.metrics
         if self.__message_sender is None:
             raise Exception('Missing MessageSender')
 
+        await self.__message_sender.prepare(spider.get_message_templates())
+
+    async def close_spider(self, spider: TemplateSpider) -> None:
+        """
+        Wait for messages that are still being sent in the background
+
+        :param spider: The running spider
+        """
+        await self.__message_sender.drain()
+
     async def process_item(self, item: TemplateItem, spider: TemplateSpider) -> None:
         """
         Send the scraped messages
@@ -30,13 +42,29 @@ class PingPipeline:
         :param item:
         :param spider:
         """
-        template = item.get('template')
-        template_data = item.get('template_data')
+        template = item.template
+        template_data = item.template_data
 
         # Check for missing data
         if template is None or template_data is None:
+            self.__metrics.increment('scrapingcord_dropped_items_total', labels={
+                'implementation': item.implementation_id,
+                'reason': 'missing_data'
+            })
             raise DropItem(f"Missing data: template={template is None}, template_data={template_data is None}")
 
         # Data has been verified; get the loop and send the messages
         if not (await self.__message_sender.add_message(template, template_data)):
+            self.__metrics.increment('scrapingcord_dropped_items_total', labels={
+                'implementation': item.implementation_id,
+                'reason': 'send_failed'
+            })
+            if item.implementation_id is not None:
+                spider.mark_failed(item.implementation_id)
             raise DropItem(f"Failed sending message")
+
+        if item.fingerprint is not None and spider.seen_item_store is not None:
+            spider.seen_item_store.add(item.implementation_id, item.fingerprint)
+
+        if self.__metrics.enabled:
+            self.__metrics.increment('scrapingcord_added_items_total', labels={'implementation': item.implementation_id})
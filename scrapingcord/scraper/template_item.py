@@ -1,9 +1,15 @@
-import scrapy
+from dataclasses import dataclass
+from typing import Optional
 
+from scrapingcord.utils import MessageTemplate
 
-class TemplateItem(scrapy.Item):
+
+@dataclass(slots=True)
+class TemplateItem:
     """
     Simple custom item containing a message template and the data to fill it
     """
-    template = scrapy.Field()        # MessageTemplate
-    template_data = scrapy.Field()   # dict of formatting arguments
+    template: MessageTemplate
+    template_data: dict                 # formatting arguments
+    implementation_id: Optional[str] = None
+    fingerprint: Optional[str] = None   # set by the DeduplicationPipeline, marked as seen once it is sent
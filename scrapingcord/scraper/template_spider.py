@@ -1,10 +1,16 @@
-from typing import Generator
+import inspect
+import time
+from typing import AsyncGenerator, Optional, Any, Iterable, AsyncIterable, Generator
 
-from scrapy import Spider, Request
+from scrapy import Spider, Request, signals
+from scrapy.crawler import Crawler
 from scrapy.http import Response
+from twisted.python.failure import Failure
 
-from scrapingcord.utils import MessageSender
-from scrapingcord.utils import ScrapingImplementation
+from scrapingcord.scraper.parser_executor import ParserExecutor
+from scrapingcord.utils import MessageSender, MessageTemplate, SeenItemStore, ConditionalRequestStore, Metrics, \
+    WatermarkStore
+from scrapingcord.utils import ScrapingImplementation, StartUrlSource
 
 
 class TemplateSpider(Spider):
@@ -13,35 +19,323 @@ class TemplateSpider(Spider):
     This spider has none of the important logic, since it is located in the pipeline and middleware
     """
     name: str = 'template_spider'
+    META_CONDITIONAL_REQUEST = 'conditional_request'
+
     message_sender: MessageSender
+    seen_item_store: Optional[SeenItemStore]
+    conditional_request_store: Optional[ConditionalRequestStore]
+    metrics: Metrics
+    watermark_store: Optional[WatermarkStore]
     __mapping: dict
+    __parser_executor: ParserExecutor
+    __owns_parser_executor: bool
+    __watermarks: dict[str, Any]
+    __crawl_watermarks: dict[str, Any]
+    __crawl_validators: dict[tuple[str, str], dict]
+    __failed_implementations: set[str]
 
-    def __init__(self, mapping: dict, message_sender: MessageSender):
+    def __init__(
+            self,
+            mapping: dict,
+            message_sender: MessageSender,
+            seen_item_store: Optional[SeenItemStore] = None,
+            conditional_request_store: Optional[ConditionalRequestStore] = None,
+            metrics: Optional[Metrics] = None,
+            watermark_store: Optional[WatermarkStore] = None,
+            parser_executor: Optional[ParserExecutor] = None
+    ):
         """
         :param mapping: Mapping created in the PingScraper
         :param message_sender: The message sender that should be used to send messages
+        :param seen_item_store: Store used to drop items that have been seen before, no deduplication if not given
+        :param conditional_request_store: Store used to skip unchanged start urls, no conditional requests if not given
+        :param metrics: The metrics to record the parsing in, disabled if not given
+        :param watermark_store: Store of the watermarks of the implementations, no early stops if not given
+        :param parser_executor: The pools to run parsers in, shared between the crawls of a run.
+            The spider starts and stops pools of its own if not given
         """
         self.__mapping = mapping
         self.message_sender = message_sender
+        self.seen_item_store = seen_item_store
+        self.conditional_request_store = conditional_request_store
+        self.metrics = metrics if metrics is not None else Metrics.DISABLED
+        self.watermark_store = watermark_store
+        self.__owns_parser_executor = parser_executor is None
+        self.__parser_executor = parser_executor if parser_executor is not None else ParserExecutor()
+        self.__watermarks = {}
+        self.__crawl_watermarks = {}
+        self.__crawl_validators = {}
+        self.__failed_implementations = set()
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler, *args, **kwargs) -> 'TemplateSpider':
+        """
+        Create the spider, keep track of failing parsers and count the downloaded bytes if metrics are enabled
+
+        :param crawler: The crawler running the spider
+        :return: The spider
+        """
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.spider_error, signal=signals.spider_error)
+        if spider.metrics.enabled:
+            crawler.signals.connect(spider.response_downloaded, signal=signals.response_downloaded)
+
+        return spider
+
+    def response_downloaded(self, response: Response, request: Request) -> None:
+        """
+        Count the downloaded bytes per implementation, before decompression and any middleware.
+        Requests made by Scrapy itself, like those for robots.txt, are not counted.
+
+        :param response: The downloaded response
+        :param request: The request of the response
+        """
+        implementation_id = request.meta.get(ScrapingImplementation.KEY_ID)
+        if implementation_id is not None:
+            self.metrics.increment('scrapingcord_downloaded_bytes_total', len(response.body), {
+                'implementation': implementation_id
+            })
+
+    def spider_error(self, failure: Failure, response: Response, spider: Spider) -> None:
+        """
+        Mark the implementation of which the parser raised as failed
+
+        :param failure: The exception of the parser
+        :param response: The response that was being parsed
+        :param spider: The spider
+        """
+        implementation_id = response.meta.get(ScrapingImplementation.KEY_ID)
+        if implementation_id is not None:
+            self.mark_failed(implementation_id)
+
+    def mark_failed(self, implementation_id: str) -> None:
+        """
+        Mark that a response or item of an implementation could not be handled in this crawl,
+        so the validators of its start urls are not stored and its pages are parsed again by the next crawl
+
+        :param implementation_id: The id of the implementation
+        """
+        self.__failed_implementations.add(implementation_id)
 
-    def start_requests(self) -> Generator[Request, None, None]:
+    def set_validators(self, implementation_id: str, url: str, validators: dict) -> None:
         """
-        Start making requests with the specified callbacks based on the mapping
+        Remember the validators of a start url, to store them once the crawl has handled its responses
+
+        :param implementation_id: The id of the implementation
+        :param url: The start url
+        :param validators: The validators of the response
+        """
+        self.__crawl_validators[(implementation_id, url)] = validators
+
+    def get_implementations(self) -> dict:
+        """
+        :return: The mapping of implementation ids to implementation dicts
+        """
+        return self.__mapping
+
+    def get_message_templates(self) -> list[MessageTemplate]:
+        """
+        :return: The message templates of all implementations in the mapping
+        """
+        return [
+            implementation_dict[ScrapingImplementation.KEY_TEMPLATE]
+            for implementation_dict in self.__mapping.values()
+            if implementation_dict.get(ScrapingImplementation.KEY_TEMPLATE) is not None
+        ]
+
+    async def start(self) -> AsyncGenerator[Request, None]:
+        """
+        Start making requests based on the mapping.
+        The start urls of all implementations are read lazily and interleaved, so no implementation starves the others.
+        Requests only carry the implementation id, the parser is looked up when the response is parsed.
+        """
+        sources = []
+        for implementation_id, implementation_dict in self.__mapping.items():
+            meta = {ScrapingImplementation.KEY_ID: implementation_id}
+            if implementation_dict.get(ScrapingImplementation.KEY_CONDITIONAL_REQUESTS):
+                meta[self.META_CONDITIONAL_REQUEST] = True
+
+            download_slot = ScrapingImplementation.get_download_slot(implementation_dict)
+            if download_slot is not None:
+                meta['download_slot'] = download_slot
+            if implementation_dict.get(ScrapingImplementation.KEY_AUTOTHROTTLE_TARGET):
+                meta['autothrottle_dont_adjust_delay'] = True
+
+            urls = StartUrlSource(implementation_dict.get(ScrapingImplementation.KEY_URLS, []))
+            priority = implementation_dict.get(ScrapingImplementation.KEY_PRIORITY) or 0
+            sources.append((meta, priority, aiter(urls)))
+
+        while sources:
+            for source in list(sources):
+                meta, priority, url_iterator = source
+                try:
+                    url = await anext(url_iterator)
+                except StopAsyncIteration:
+                    sources.remove(source)
+                    continue
+
+                yield Request(url, meta=dict(meta), priority=priority)
+
+    def get_implementation(self, response: Response) -> dict:
+        """
+        Get the implementation a response belongs to
+
+        :param response: A response of a request made for an implementation
+        :return: The implementation dict, empty if the implementation is unknown
         """
-        for implementation_dict in self.__mapping.values():
-            for url in implementation_dict.get(ScrapingImplementation.KEY_URLS, []):
-                yield Request(
-                    url,
-                    implementation_dict.get(ScrapingImplementation.KEY_PARSER, self.parse),
-                    meta=implementation_dict
-                )
+        return self.__mapping.get(response.meta.get(ScrapingImplementation.KEY_ID), {})
 
-    def parse(self, response: Response, **kwargs) -> None:
+    def parse(self, response: Response, **kwargs) -> Any:
         """
-        Standard empty parsing function to catch implementations with missing parsing functions
+        Parse the response with the parser of its implementation, in the executor of the implementation if it has one.
+        Asynchronous parsers always run on the reactor.
+        Responses of implementations with missing parsing functions are ignored.
 
         :param response:
         :param kwargs:
-        :return:
+        :return: The output of the parser
         """
-        pass
+        implementation = self.get_implementation(response)
+        parser = implementation.get(ScrapingImplementation.KEY_PARSER)
+        if parser is None:
+            return None
+
+        labels = {'implementation': response.meta.get(ScrapingImplementation.KEY_ID)}
+        executor_type = implementation.get(ScrapingImplementation.KEY_PARSE_EXECUTOR)
+        is_async = inspect.isasyncgenfunction(parser) or inspect.iscoroutinefunction(parser)
+        if executor_type is not None and not is_async:
+            return self.__parse_in_executor(executor_type, parser, response, kwargs, labels)
+        if not self.metrics.enabled:
+            return parser(response, **kwargs)
+
+        output = parser(response, **kwargs)
+        if isinstance(output, AsyncIterable):
+            return self.__measure_async_parser(output, labels)
+        if isinstance(output, Iterable):
+            return self.__measure_parser(output, labels)
+
+        return output
+
+    def get_watermark(self, implementation_id: str) -> Optional[Any]:
+        """
+        Get the watermark an implementation had when this crawl started
+
+        :param implementation_id: The id of the implementation
+        :return: The watermark or None if there is none
+        """
+        if self.watermark_store is None:
+            return None
+        if implementation_id not in self.__watermarks:
+            self.__watermarks[implementation_id] = self.watermark_store.get(implementation_id)
+
+        return self.__watermarks[implementation_id]
+
+    def raise_watermark(self, implementation_id: str, key: Any) -> None:
+        """
+        Remember the ordering key of an item if it is the highest of this crawl
+
+        :param implementation_id: The id of the implementation
+        :param key: The ordering key of the item
+        """
+        watermark = self.__crawl_watermarks.get(implementation_id)
+        if watermark is None or key > watermark:
+            self.__crawl_watermarks[implementation_id] = key
+
+    def closed(self, reason: str) -> None:
+        """
+        Stop the parser pools of the spider and store the validators and watermarks when the spider closes.
+        Both are only stored after complete crawls, so newer items on pages that weren't reached aren't skipped.
+        Validators and watermarks of implementations of which a parser raised or a message failed are not stored,
+        so the next crawl reaches their failed items again.
+
+        :param reason: The reason the spider closed
+        """
+        if self.__owns_parser_executor:
+            self.__parser_executor.close()
+        if reason != 'finished':
+            return
+
+        if self.conditional_request_store is not None:
+            for (implementation_id, url), validators in self.__crawl_validators.items():
+                if implementation_id not in self.__failed_implementations:
+                    self.conditional_request_store.set(implementation_id, url, validators)
+
+        if self.watermark_store is None:
+            return
+
+        for implementation_id, key in self.__crawl_watermarks.items():
+            if implementation_id in self.__failed_implementations:
+                continue
+
+            watermark = self.get_watermark(implementation_id)
+            if watermark is None or key > watermark:
+                self.watermark_store.set(implementation_id, key)
+
+    async def __parse_in_executor(
+            self,
+            executor_type: str,
+            parser: Any,
+            response: Response,
+            kwargs: dict,
+            labels: dict
+    ) -> AsyncGenerator:
+        """
+        Run a parser in a pool of threads or processes and pass on its output
+
+        :param executor_type: The executor of the implementation
+        :param parser: The parser of the implementation
+        :param response: The response to parse
+        :param kwargs: The keyword arguments of the callback
+        :param labels: The labels of the implementation
+        :return: The output of the parser
+        """
+        output, duration = await self.__parser_executor.parse(executor_type, parser, response, self, kwargs)
+        if self.metrics.enabled:
+            self.metrics.observe('scrapingcord_parse_seconds', duration, labels)
+
+        for result in output:
+            yield result
+
+    def __measure_parser(self, output: Iterable, labels: dict) -> Generator:
+        """
+        Pass on the output of a parser, recording the time spent in the parser itself
+
+        :param output: The output of the parser
+        :param labels: The labels of the implementation
+        :return: The output of the parser
+        """
+        duration = 0.0
+        iterator = iter(output)
+        while True:
+            started_at = time.perf_counter()
+            try:
+                result = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                duration += time.perf_counter() - started_at
+            yield result
+
+        self.metrics.observe('scrapingcord_parse_seconds', duration, labels)
+
+    async def __measure_async_parser(self, output: AsyncIterable, labels: dict) -> AsyncGenerator:
+        """
+        Pass on the output of an asynchronous parser, recording the time spent in the parser itself
+
+        :param output: The output of the parser
+        :param labels: The labels of the implementation
+        :return: The output of the parser
+        """
+        duration = 0.0
+        iterator = aiter(output)
+        while True:
+            started_at = time.perf_counter()
+            try:
+                result = await anext(iterator)
+            except StopAsyncIteration:
+                break
+            finally:
+                duration += time.perf_counter() - started_at
+            yield result
+
+        self.metrics.observe('scrapingcord_parse_seconds', duration, labels)
@@ -1,4 +1,73 @@
-from scrapingcord.utils.recipient import Recipient
-from scrapingcord.utils.message_template import MessageTemplate
-from scrapingcord.utils.scraping_implementation import ScrapingImplementation
-from scrapingcord.utils.message_sender import MessageSender
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from scrapingcord.utils.recipient import Recipient
+    from scrapingcord.utils.start_url_source import StartUrlSource, StartUrls
+    from scrapingcord.utils.message_template import MessageTemplate
+    from scrapingcord.utils.scraping_implementation import ScrapingImplementation
+    from scrapingcord.utils.metrics import Metrics
+    from scrapingcord.utils.metrics_exporter import MetricsExporter
+    from scrapingcord.utils.prometheus_metrics_exporter import PrometheusMetricsExporter
+    from scrapingcord.utils.json_metrics_exporter import JsonMetricsExporter
+    from scrapingcord.utils.message_sender import MessageSender
+    from scrapingcord.utils.queued_message_sender import QueuedMessageSender
+    from scrapingcord.utils.forwarding_message_sender import ForwardingMessageSender
+    from scrapingcord.utils.seen_item_store import SeenItemStore
+    from scrapingcord.utils.memory_seen_item_store import MemorySeenItemStore
+    from scrapingcord.utils.sqlite_seen_item_store import SqliteSeenItemStore
+    from scrapingcord.utils.conditional_request_store import ConditionalRequestStore
+    from scrapingcord.utils.memory_conditional_request_store import MemoryConditionalRequestStore
+    from scrapingcord.utils.sqlite_conditional_request_store import SqliteConditionalRequestStore
+    from scrapingcord.utils.message_outbox import MessageOutbox
+    from scrapingcord.utils.memory_message_outbox import MemoryMessageOutbox
+    from scrapingcord.utils.sqlite_message_outbox import SqliteMessageOutbox
+    from scrapingcord.utils.watermark_store import WatermarkStore
+    from scrapingcord.utils.memory_watermark_store import MemoryWatermarkStore
+    from scrapingcord.utils.sqlite_watermark_store import SqliteWatermarkStore
+
+# Exported names and the modules they are defined in, imported when they are first used
+_EXPORTS = {
+    'Recipient': 'scrapingcord.utils.recipient',
+    'StartUrlSource': 'scrapingcord.utils.start_url_source',
+    'StartUrls': 'scrapingcord.utils.start_url_source',
+    'MessageTemplate': 'scrapingcord.utils.message_template',
+    'ScrapingImplementation': 'scrapingcord.utils.scraping_implementation',
+    'Metrics': 'scrapingcord.utils.metrics',
+    'MetricsExporter': 'scrapingcord.utils.metrics_exporter',
+    'PrometheusMetricsExporter': 'scrapingcord.utils.prometheus_metrics_exporter',
+    'JsonMetricsExporter': 'scrapingcord.utils.json_metrics_exporter',
+    'MessageSender': 'scrapingcord.utils.message_sender',
+    'QueuedMessageSender': 'scrapingcord.utils.queued_message_sender',
+    'ForwardingMessageSender': 'scrapingcord.utils.forwarding_message_sender',
+    'SeenItemStore': 'scrapingcord.utils.seen_item_store',
+    'MemorySeenItemStore': 'scrapingcord.utils.memory_seen_item_store',
+    'SqliteSeenItemStore': 'scrapingcord.utils.sqlite_seen_item_store',
+    'ConditionalRequestStore': 'scrapingcord.utils.conditional_request_store',
+    'MemoryConditionalRequestStore': 'scrapingcord.utils.memory_conditional_request_store',
+    'SqliteConditionalRequestStore': 'scrapingcord.utils.sqlite_conditional_request_store',
+    'MessageOutbox': 'scrapingcord.utils.message_outbox',
+    'MemoryMessageOutbox': 'scrapingcord.utils.memory_message_outbox',
+    'SqliteMessageOutbox': 'scrapingcord.utils.sqlite_message_outbox',
+    'WatermarkStore': 'scrapingcord.utils.watermark_store',
+    'MemoryWatermarkStore': 'scrapingcord.utils.memory_watermark_store',
+    'SqliteWatermarkStore': 'scrapingcord.utils.sqlite_watermark_store',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """
+    Import the exported names when they are first used, so only the modules that are used get imported
+    """
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_EXPORTS])
@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class ConditionalRequestStore(ABC):
+    """
+    Interface describing a store of the validators (ETag, Last-Modified and body hash) of start urls,
+    used to skip parsing pages that have not changed since the previous run
+    """
+
+    @abstractmethod
+    def get(self, implementation_id: str, url: str) -> Optional[dict]:
+        """
+        Get the validators of a url
+
+        :param implementation_id: The id of the implementation the url belongs to
+        :param url: The start url
+        :return: Dict with the 'etag', 'last_modified' and 'body_hash' (all optional) or None if unknown
+        """
+        pass
+
+    @abstractmethod
+    def set(self, implementation_id: str, url: str, validators: dict) -> None:
+        """
+        Store the validators of a url
+
+        :param implementation_id: The id of the implementation the url belongs to
+        :param url: The start url
+        :param validators: Dict with the 'etag', 'last_modified' and 'body_hash'
+        """
+        pass
+
+    def flush(self) -> None:
+        """
+        Persist all pending writes
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Persist everything and release the resources of the store
+        """
+        self.flush()
@@ -0,0 +1,54 @@
+import asyncio
+import queue
+from multiprocessing.queues import Queue
+
+from scrapingcord.utils.message_sender import MessageSender
+from scrapingcord.utils.message_template import MessageTemplate
+from scrapingcord.utils.scraping_implementation import ScrapingImplementation
+
+
+class ForwardingMessageSender(MessageSender):
+    """
+    Message sender of a worker process, which forwards the messages to a coordinating process over a queue.
+    Only the implementation id and the template data are forwarded, the coordinator looks up the template itself.
+    """
+    __queue: Queue
+    __implementation_ids: dict[int, str]
+
+    def __init__(self, message_queue: Queue, mapping: dict):
+        """
+        :param message_queue: The multiprocessing queue the coordinator reads the messages from
+        :param mapping: The exported implementations of the worker by id
+        """
+        self.__queue = message_queue
+        self.__implementation_ids = {
+            id(implementation_dict[ScrapingImplementation.KEY_TEMPLATE]): implementation_id
+            for implementation_id, implementation_dict in mapping.items()
+            if implementation_dict.get(ScrapingImplementation.KEY_TEMPLATE) is not None
+        }
+
+    async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
+        """
+        Forward the message to the coordinator. Waits in a thread if the queue is full, so the reactor keeps running.
+
+        :param template: The message template to send
+        :param template_data: The data to substitute in the template
+        :return True if the message was forwarded, False if the template is unknown
+        """
+        implementation_id = self.__implementation_ids.get(id(template))
+        if implementation_id is None:
+            return False
+
+        message = (implementation_id, template_data)
+        try:
+            self.__queue.put_nowait(message)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, self.__queue.put, message)
+
+        return True
+
+    async def flush(self) -> None:
+        """
+        Messages are sent by the coordinator
+        """
+        pass
@@ -0,0 +1,77 @@
+import json
+import os
+from typing import Union, Optional
+
+from scrapingcord.utils.metrics import Metrics
+from scrapingcord.utils.metrics_exporter import MetricsExporter
+
+
+class JsonMetricsExporter(MetricsExporter):
+    """
+    Writes a JSON summary of the metrics once the scraper is done.
+    Histograms are summarized by their count, sum, mean, maximum and the estimated p50 and p99.
+    """
+    __path: Union[str, os.PathLike]
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        """
+        :param path: The file to write the summary to, overwritten every run
+        """
+        self.__path = path
+
+    def close(self, metrics: Metrics) -> None:
+        """
+        Write the summary
+
+        :param metrics: The metrics of the run
+        """
+        with open(self.__path, 'w') as summary_file:
+            json.dump(self.summarize(metrics), summary_file, indent=2)
+
+    @classmethod
+    def summarize(cls, metrics: Metrics) -> dict:
+        """
+        :param metrics: The metrics to summarize
+        :return: The counters, gauges and histograms by name, each a list of series with their labels
+        """
+        snapshot = metrics.snapshot()
+        summary = {
+            metric_type: {
+                name: [{'labels': labels, 'value': value} for labels, value in series]
+                for name, series in snapshot[metric_type].items()
+            }
+            for metric_type in ('counters', 'gauges')
+        }
+        summary['histograms'] = {
+            name: [
+                {
+                    'labels': labels,
+                    'count': histogram['count'],
+                    'sum': histogram['sum'],
+                    'mean': histogram['sum'] / histogram['count'] if histogram['count'] else None,
+                    'max': histogram['max'],
+                    'p50': cls.__estimate_quantile(histogram, 0.5),
+                    'p99': cls.__estimate_quantile(histogram, 0.99),
+                }
+                for labels, histogram in series
+            ]
+            for name, series in snapshot['histograms'].items()
+        }
+
+        return summary
+
+    @staticmethod
+    def __estimate_quantile(histogram: dict, quantile: float) -> Optional[float]:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in, capped by the maximum
+
+        :param histogram: A histogram of a snapshot
+        :param quantile: The quantile between 0 and 1
+        :return: The estimated value or None if the histogram is empty
+        """
+        rank = quantile * histogram['count']
+        for upper_bound, cumulative_count in histogram['buckets']:
+            if cumulative_count >= rank and cumulative_count > 0:
+                return min(upper_bound, histogram['max'])
+
+        return None
@@ -0,0 +1,19 @@
+from typing import Optional
+
+from scrapingcord.utils.conditional_request_store import ConditionalRequestStore
+
+
+class MemoryConditionalRequestStore(ConditionalRequestStore):
+    """
+    Conditional request store that only lives as long as the process
+    """
+    __validators: dict[tuple[str, str], dict]
+
+    def __init__(self):
+        self.__validators = {}
+
+    def get(self, implementation_id: str, url: str) -> Optional[dict]:
+        return self.__validators.get((implementation_id, url))
+
+    def set(self, implementation_id: str, url: str, validators: dict) -> None:
+        self.__validators[(implementation_id, url)] = validators
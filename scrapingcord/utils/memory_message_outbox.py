@@ -0,0 +1,48 @@
+from typing import Iterator
+
+from scrapingcord.utils.message_outbox import MessageOutbox
+from scrapingcord.utils.recipient import Recipient
+
+
+class MemoryMessageOutbox(MessageOutbox):
+    """
+    Message outbox that only lives as long as the process.
+    It holds every undelivered message in memory, without a limit.
+    """
+    __recipients: dict[str, Recipient]
+    __entries: dict[str, dict[int, str]]
+    __entry_recipients: dict[int, str]
+    __next_entry_id: int
+
+    def __init__(self):
+        self.__recipients = {}
+        self.__entries = {}
+        self.__entry_recipients = {}
+        self.__next_entry_id = 1
+
+    def add(self, recipient: Recipient, message: str) -> None:
+        entry_id = self.__next_entry_id
+        self.__next_entry_id += 1
+
+        self.__recipients.setdefault(recipient.recipient_id, recipient)
+        self.__entries.setdefault(recipient.recipient_id, {})[entry_id] = message
+        self.__entry_recipients[entry_id] = recipient.recipient_id
+
+    def get_recipients(self) -> list[Recipient]:
+        return [self.__recipients[recipient_id] for recipient_id in self.__entries]
+
+    def iterate_entries(self, recipient_id: str) -> Iterator[tuple[int, str]]:
+        # Iterate over a copy, so entries can be deleted in between
+        return iter(list(self.__entries.get(recipient_id, {}).items()))
+
+    def delete(self, entry_ids: list[int]) -> None:
+        for entry_id in entry_ids:
+            recipient_id = self.__entry_recipients.pop(entry_id, None)
+            if recipient_id is None:
+                continue
+
+            recipient_entries = self.__entries[recipient_id]
+            recipient_entries.pop(entry_id, None)
+            if not recipient_entries:
+                del self.__entries[recipient_id]
+                del self.__recipients[recipient_id]
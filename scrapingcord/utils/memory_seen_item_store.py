@@ -0,0 +1,29 @@
+import time
+
+from scrapingcord.utils.seen_item_store import SeenItemStore
+
+
+class MemorySeenItemStore(SeenItemStore):
+    """
+    Seen item store that only lives as long as the process
+    """
+    __last_seen: dict[str, dict[str, float]]
+
+    def __init__(self):
+        self.__last_seen = {}
+
+    def contains(self, implementation_id: str, fingerprint: str) -> bool:
+        return fingerprint in self.__last_seen.get(implementation_id, {})
+
+    def add(self, implementation_id: str, fingerprint: str) -> bool:
+        implementation_items = self.__last_seen.setdefault(implementation_id, {})
+        is_new = fingerprint not in implementation_items
+        implementation_items[fingerprint] = time.time()
+        return is_new
+
+    def evict(self, implementation_id: str, last_seen_before: float) -> None:
+        self.__last_seen[implementation_id] = {
+            fingerprint: last_seen
+            for fingerprint, last_seen in self.__last_seen.get(implementation_id, {}).items()
+            if last_seen >= last_seen_before
+        }
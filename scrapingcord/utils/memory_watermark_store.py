@@ -0,0 +1,19 @@
+from typing import Optional, Any
+
+from scrapingcord.utils.watermark_store import WatermarkStore
+
+
+class MemoryWatermarkStore(WatermarkStore):
+    """
+    Watermark store that only lives as long as the process
+    """
+    __watermarks: dict[str, Any]
+
+    def __init__(self):
+        self.__watermarks = {}
+
+    def get(self, implementation_id: str) -> Optional[Any]:
+        return self.__watermarks.get(implementation_id)
+
+    def set(self, implementation_id: str, watermark: Any) -> None:
+        self.__watermarks[implementation_id] = watermark
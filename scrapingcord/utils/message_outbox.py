@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+from scrapingcord.utils.recipient import Recipient
+
+
+class MessageOutbox(ABC):
+    """
+    Interface describing a store of rendered messages that have not been delivered yet, per recipient.
+    Entries keep the order in which they were added and are only deleted once their delivery is confirmed.
+    """
+
+    @abstractmethod
+    def add(self, recipient: Recipient, message: str) -> None:
+        """
+        Add a message for a recipient
+
+        :param recipient: The recipient of the message
+        :param message: The rendered message
+        """
+        pass
+
+    @abstractmethod
+    def get_recipients(self) -> list[Recipient]:
+        """
+        :return: All recipients with pending messages
+        """
+        pass
+
+    @abstractmethod
+    def iterate_entries(self, recipient_id: str) -> Iterator[tuple[int, str]]:
+        """
+        Iterate over the pending messages of a recipient, oldest first.
+        Entries can be deleted while iterating.
+
+        :param recipient_id: The id of the recipient
+        :return: Iterator of entry ids and messages
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, entry_ids: list[int]) -> None:
+        """
+        Delete delivered entries
+
+        :param entry_ids: The ids of the entries
+        """
+        pass
+
+    def flush(self) -> None:
+        """
+        Persist all pending writes
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Persist everything and release the resources of the outbox
+        """
+        self.flush()
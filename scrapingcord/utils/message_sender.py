@@ -1,12 +1,14 @@
+import time
 from abc import ABC, abstractmethod
 
-from scrapingcord.utils import MessageTemplate
+from scrapingcord.utils import MessageTemplate, Metrics, Recipient
 
 
 class MessageSender(ABC):
     """
     Interface describing a service that can send messages
     """
+    metrics: Metrics = Metrics.DISABLED
 
     @abstractmethod
     async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
@@ -19,9 +21,55 @@ class MessageSender(ABC):
         """
         pass
 
+    def set_metrics(self, metrics: Metrics) -> None:
+        """
+        Set the metrics to record while sending. Called before the scraper starts.
+
+        :param metrics: The metrics of the run
+        """
+        self.metrics = metrics
+
+    def render_message(self, template: MessageTemplate, template_data: dict) -> tuple[str, list[Recipient]]:
+        """
+        Render the message of a template, recording the render time if metrics are enabled
+
+        :param template: The message template to render
+        :param template_data: The data to substitute in the template
+        :return: A tuple of the message and all recipients
+        """
+        if not self.metrics.enabled:
+            return template.get_message(template_data)
+
+        start = time.perf_counter()
+        message = template.get_message(template_data)
+        self.metrics.observe('scrapingcord_render_seconds', time.perf_counter() - start)
+        return message
+
+    async def prepare(self, templates: list[MessageTemplate]) -> None:
+        """
+        Prepare for sending messages with the given templates, e.g. by resolving recipients.
+        Called when the spider opens.
+
+        :param templates: The message templates of all implementations
+        """
+        pass
+
+    async def drain(self) -> None:
+        """
+        Wait until all messages that are being sent in the background are handled.
+        Called when the spider closes, while the scraper's event loop is still running.
+        """
+        pass
+
     @abstractmethod
     async def flush(self) -> None:
         """
-        Send all lingering messages and close all connections
+        Send all lingering messages
+        """
+        pass
+
+    async def close(self) -> None:
+        """
+        Close all connections. Called once the scraper is done, after the last flush
         """
         pass
@@ -1,25 +1,136 @@
-from typing import Union
+from string import Formatter
+from typing import Union, Mapping, Iterable, Callable, Optional
 
 from scrapingcord.utils.recipient import Recipient
 
 
 class MessageTemplate:
     """
-    A message template consisting of a formattable string and the recipients
+    A message template consisting of a formattable string and the recipients.
+    The string is validated when the template is created, so broken templates fail before scraping starts.
+    Senders that merge the messages of several templates per channel group them in sections, ordered by priority.
     """
     __formattable_message: str
     __recipients: list[Recipient]
+    __section: Optional[str]
+    __priority: Optional[int]
+    __fields: frozenset[str]
+    __positional_count: int
+    __format: Callable[..., str]
+    __format_map: Callable[[Mapping], str]
 
-    def __init__(self, message_template: str, recipients: list[Recipient]) -> None:
+    def __init__(
+            self,
+            message_template: str,
+            recipients: list[Recipient],
+            section: Optional[str] = None,
+            priority: Optional[int] = None
+    ) -> None:
         """
         :param message_template: A formattable string, e.g.:
             'My template message for my favourite users {name} and {second_name}' -> {name: Monthy, second_name: Python}
             'My template message for my favourite users {0} and {1}' -> [Monthy, Python]
             'My template message for my favourite users {} and {}' -> [Monthy, Python]
         :param recipients: A list of all recipients the message should be sent to
+        :param section: The header of the messages when they are merged with those of other templates.
+            PingScraper uses the id of the implementation if not given
+        :param priority: Sections with a higher priority are sent first.
+            PingScraper uses the priority of the implementation if not given, senders use 0
+        :raises ValueError: If the string is not a valid format string
         """
         self.__formattable_message = message_template
         self.__recipients = recipients
+        self.__section = section
+        self.__priority = priority
+        self.__fields, self.__positional_count = self.__compile(message_template)
+        self.__format = message_template.format
+        self.__format_map = message_template.format_map
+
+    @property
+    def recipients(self) -> list[Recipient]:
+        """
+        :return: All recipients of the message
+        """
+        return self.__recipients
+
+    @property
+    def section(self) -> Optional[str]:
+        """
+        :return: The header of the messages when they are merged with those of other templates
+        """
+        return self.__section
+
+    @property
+    def priority(self) -> Optional[int]:
+        """
+        :return: The priority of the section of the messages, None if not set
+        """
+        return self.__priority
+
+    @property
+    def fields(self) -> frozenset[str]:
+        """
+        :return: The names of the keyword fields used in the template
+        """
+        return self.__fields
+
+    @property
+    def positional_count(self) -> int:
+        """
+        :return: The number of positional arguments the template needs
+        """
+        return self.__positional_count
+
+    def with_section(self, section: Optional[str], priority: Optional[int] = None) -> 'MessageTemplate':
+        """
+        :param section: The header of the messages when they are merged with those of other templates
+        :param priority: Sections with a higher priority are sent first.
+            Keeps the priority of this template if not given
+        :return: A copy of this template with the section
+        """
+        return MessageTemplate(
+            self.__formattable_message,
+            self.__recipients,
+            section,
+            priority if priority is not None else self.__priority
+        )
+
+    def render(self, message_args: Union[list, dict]) -> str:
+        """
+        Fill in the template
+
+        :param message_args: The arguments that can be used for formatting the string
+        :return: The message
+        :raises ValueError: If arguments are missing
+        """
+        try:
+            if isinstance(message_args, Mapping):
+                return self.__format_map(message_args)
+            return self.__format(*message_args)
+        except (KeyError, IndexError) as error:
+            if isinstance(message_args, Mapping):
+                missing = sorted(self.__fields.difference(message_args.keys()))
+            else:
+                missing = [str(index) for index in range(len(message_args), self.__positional_count)]
+            raise ValueError(f"Missing template arguments {missing or error} for '{self.__formattable_message}'") from error
+
+    def render_batch(self, message_args_list: Iterable[Union[list, dict]]) -> list[str]:
+        """
+        Fill in the template for multiple sets of arguments at once
+
+        :param message_args_list: The arguments for every message
+        :return: The messages, in the same order
+        """
+        return [self.render(message_args) for message_args in message_args_list]
+
+    def get_message(self, message_args: Union[list, dict]) -> tuple[str, list[Recipient]]:
+        """
+        Returns the message and the recipients it should be sent to
+
+        :param message_args: The arguments that can be used for formatting the string
+        :return: A tuple of the message and all recipients
+        """
+        return self.render(message_args), self.__recipients
 
     def get_message_list(self, message_args: Union[list, dict]) -> list[tuple[str, Recipient]]:
         """
@@ -28,6 +139,43 @@ class MessageTemplate:
         :param message_args: The arguments that can be used for formatting the string
         :return: A list of tuples containing the message and recipient
         """
-        message = self.__formattable_message.format(**message_args) if \
-            type(message_args) == dict else self.__formattable_message.format(*message_args)
+        message = self.render(message_args)
         return [(message, recipient) for recipient in self.__recipients]
+
+    @classmethod
+    def __compile(cls, message_template: str) -> tuple[frozenset[str], int]:
+        """
+        Parse the format string once to validate it and collect its fields
+
+        :param message_template: The formattable string
+        :return: The names of the keyword fields and the number of positional arguments
+        :raises ValueError: If the string is not a valid format string
+        """
+        fields = set()
+        positional_indices = set()
+        auto_count = 0
+
+        pending = [message_template]
+        while pending:
+            for _, field_name, format_spec, conversion in Formatter().parse(pending.pop()):
+                if field_name is None:
+                    continue
+                if conversion not in (None, 'r', 's', 'a'):
+                    raise ValueError(f"Unknown conversion '!{conversion}' in template '{message_template}'")
+
+                root = field_name.split('.', 1)[0].split('[', 1)[0]
+                if root == '':
+                    auto_count += 1
+                elif root.isdigit():
+                    positional_indices.add(int(root))
+                else:
+                    fields.add(root)
+
+                # Format specs can contain nested fields, e.g. '{value:{width}}'
+                if format_spec:
+                    pending.append(format_spec)
+
+        if auto_count and positional_indices:
+            raise ValueError(f"Template '{message_template}' mixes automatic and manual field numbering")
+
+        return frozenset(fields), max(auto_count, max(positional_indices, default=-1) + 1)
@@ -0,0 +1,157 @@
+import threading
+from bisect import bisect_left
+from typing import Optional
+
+
+class Metrics:
+    """
+    Registry of counters, gauges and histograms, each with optional labels.
+    A disabled registry ignores everything, and callers check `enabled` before timing anything,
+    so metrics cost nothing when they are not used. Metrics.DISABLED is the shared disabled registry.
+    Values can be read from other threads, e.g. by an exporter serving them over HTTP.
+    """
+    # Upper bounds of the histogram buckets in seconds
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    DISABLED: 'Metrics'
+
+    __enabled: bool
+    __buckets: tuple[float, ...]
+    __counters: dict[str, dict[tuple, float]]
+    __gauges: dict[str, dict[tuple, float]]
+    __histograms: dict[str, dict[tuple, list]]
+    __lock: threading.Lock
+
+    def __init__(self, enabled: bool = True, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        :param enabled: Record metrics, a disabled registry ignores all calls
+        :param buckets: The sorted upper bounds of the histogram buckets
+        """
+        self.__enabled = enabled
+        self.__buckets = tuple(sorted(buckets))
+        self.__counters = {}
+        self.__gauges = {}
+        self.__histograms = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        :return: Whether metrics are recorded
+        """
+        return self.__enabled
+
+    @property
+    def buckets(self) -> tuple[float, ...]:
+        """
+        :return: The upper bounds of the histogram buckets
+        """
+        return self.__buckets
+
+    def increment(self, name: str, value: float = 1.0, labels: Optional[dict] = None) -> None:
+        """
+        Increase a counter
+
+        :param name: The name of the counter, ending in _total by convention
+        :param value: The amount to increase the counter with
+        :param labels: The labels of the counter
+        """
+        if not self.__enabled:
+            return
+
+        key = self.__get_key(labels)
+        with self.__lock:
+            series = self.__counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[dict] = None) -> None:
+        """
+        Set a gauge to the current value
+
+        :param name: The name of the gauge
+        :param value: The current value
+        :param labels: The labels of the gauge
+        """
+        if not self.__enabled:
+            return
+
+        key = self.__get_key(labels)
+        with self.__lock:
+            self.__gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, labels: Optional[dict] = None) -> None:
+        """
+        Add an observation, usually a duration in seconds, to a histogram
+
+        :param name: The name of the histogram
+        :param value: The observed value
+        :param labels: The labels of the histogram
+        """
+        if not self.__enabled:
+            return
+
+        key = self.__get_key(labels)
+        with self.__lock:
+            series = self.__histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                # Counts per bucket including +Inf, the sum, the count and the maximum
+                histogram = series[key] = [[0] * (len(self.__buckets) + 1), 0.0, 0, value]
+
+            histogram[0][bisect_left(self.__buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+            histogram[3] = max(histogram[3], value)
+
+    def snapshot(self) -> dict:
+        """
+        Copy the current values, which is safe while other threads are recording
+
+        :return: A dict with the counters, gauges and histograms, each mapping names to lists of (labels, value).
+            The value of a histogram is a dict with the cumulative counts per bucket, the sum, the count and the max
+        """
+        with self.__lock:
+            counters = {name: list(series.items()) for name, series in self.__counters.items()}
+            gauges = {name: list(series.items()) for name, series in self.__gauges.items()}
+            histograms = {
+                name: [(key, [list(histogram[0]), *histogram[1:]]) for key, histogram in series.items()]
+                for name, series in self.__histograms.items()
+            }
+
+        return {
+            'counters': {name: [(dict(key), value) for key, value in series] for name, series in counters.items()},
+            'gauges': {name: [(dict(key), value) for key, value in series] for name, series in gauges.items()},
+            'histograms': {
+                name: [(dict(key), self.__get_histogram_value(histogram)) for key, histogram in series]
+                for name, series in histograms.items()
+            },
+        }
+
+    def __get_histogram_value(self, histogram: list) -> dict:
+        """
+        :param histogram: The internal histogram
+        :return: The histogram with cumulative bucket counts
+        """
+        cumulative_counts = []
+        total = 0
+        for count in histogram[0]:
+            total += count
+            cumulative_counts.append(total)
+
+        return {
+            'buckets': list(zip(self.__buckets + (float('inf'),), cumulative_counts)),
+            'sum': histogram[1],
+            'count': histogram[2],
+            'max': histogram[3],
+        }
+
+    @staticmethod
+    def __get_key(labels: Optional[dict]) -> tuple:
+        """
+        :param labels: The labels of a series
+        :return: A hashable key of the labels
+        """
+        return tuple(sorted((name, str(value)) for name, value in labels.items())) if labels else ()
+
+
+Metrics.DISABLED = Metrics(enabled=False)
@@ -0,0 +1,25 @@
+from abc import ABC
+
+from scrapingcord.utils.metrics import Metrics
+
+
+class MetricsExporter(ABC):
+    """
+    Interface for making the metrics of a run available outside the scraper
+    """
+
+    def start(self, metrics: Metrics) -> None:
+        """
+        Called before the scraper starts
+
+        :param metrics: The metrics of the run
+        """
+        pass
+
+    def close(self, metrics: Metrics) -> None:
+        """
+        Called once the scraper is done, after the message sender is closed
+
+        :param metrics: The metrics of the run
+        """
+        pass
@@ -0,0 +1,131 @@
+import http.server
+import logging
+import threading
+from typing import Optional
+
+from scrapingcord.utils.metrics import Metrics
+from scrapingcord.utils.metrics_exporter import MetricsExporter
+
+
+class PrometheusMetricsExporter(MetricsExporter):
+    """
+    Serves the metrics in the Prometheus text format on a local HTTP endpoint while the scraper runs
+    """
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    __host: str
+    __port: int
+    __path: str
+    __server: Optional[http.server.ThreadingHTTPServer]
+
+    def __init__(self, port: int = 9464, host: str = '127.0.0.1', path: str = '/metrics'):
+        """
+        :param port: The port to serve on, 0 picks a free port
+        :param host: The address to serve on, only local by default
+        :param path: The path of the endpoint
+        """
+        self.__host = host
+        self.__port = port
+        self.__path = path
+        self.__server = None
+
+    @property
+    def port(self) -> int:
+        """
+        :return: The port the endpoint is served on
+        """
+        return self.__server.server_port if self.__server is not None else self.__port
+
+    def start(self, metrics: Metrics) -> None:
+        """
+        Start serving the metrics in a background thread
+
+        :param metrics: The metrics of the run
+        """
+        path = self.__path
+        render = self.render
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?', 1)[0] != path:
+                    self.send_error(404)
+                    return
+
+                body = render(metrics).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', PrometheusMetricsExporter.CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.__server = http.server.ThreadingHTTPServer((self.__host, self.__port), MetricsHandler)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        logging.getLogger('PrometheusMetricsExporter').info(
+            f"Serving metrics on http://{self.__host}:{self.port}{self.__path}"
+        )
+
+    def close(self, metrics: Metrics) -> None:
+        """
+        Stop serving the metrics
+
+        :param metrics: The metrics of the run
+        """
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    @classmethod
+    def render(cls, metrics: Metrics) -> str:
+        """
+        :param metrics: The metrics to render
+        :return: The metrics in the Prometheus text format
+        """
+        snapshot = metrics.snapshot()
+        lines = []
+
+        for metric_type in ('counters', 'gauges'):
+            for name, series in sorted(snapshot[metric_type].items()):
+                lines.append(f"# TYPE {name} {metric_type[:-1]}")
+                lines.extend(
+                    f"{name}{cls.__render_labels(labels)} {cls.__render_value(value)}" for labels, value in series
+                )
+
+        for name, series in sorted(snapshot['histograms'].items()):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series:
+                for upper_bound, count in histogram['buckets']:
+                    bucket_labels = {**labels, 'le': cls.__render_value(upper_bound)}
+                    lines.append(f"{name}_bucket{cls.__render_labels(bucket_labels)} {count}")
+                lines.append(f"{name}_sum{cls.__render_labels(labels)} {cls.__render_value(histogram['sum'])}")
+                lines.append(f"{name}_count{cls.__render_labels(labels)} {histogram['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def __render_labels(labels: dict) -> str:
+        """
+        :param labels: The labels of a series
+        :return: The labels in the Prometheus format, empty if there are none
+        """
+        if not labels:
+            return ''
+
+        escaped = (
+            (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for name, value in labels.items()
+        )
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+    @staticmethod
+    def __render_value(value: float) -> str:
+        """
+        :param value: A metric value
+        :return: The value in the Prometheus format
+        """
+        if value == float('inf'):
+            return '+Inf'
+        return repr(float(value)) if not float(value).is_integer() else str(int(value))
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+from typing import Optional
+
+from scrapingcord.utils.message_sender import MessageSender
+from scrapingcord.utils.message_template import MessageTemplate
+from scrapingcord.utils.metrics import Metrics
+
+
+class QueuedMessageSender(MessageSender):
+    """
+    Outbox for another message sender. Messages are put in a bounded queue and sent by a pool of workers,
+    so slow sending doesn't hold up the scraper. The queue is drained when the spider closes.
+    """
+    POLICY_BLOCK = 'block'
+    POLICY_DROP = 'drop'
+
+    __message_sender: MessageSender
+    __high_water_mark: int
+    __worker_count: int
+    __overflow_policy: str
+    __queue: Optional[asyncio.Queue]
+    __workers: list[asyncio.Task]
+    __stats: dict
+
+    def __init__(
+            self,
+            message_sender: MessageSender,
+            high_water_mark: int = 1000,
+            worker_count: int = 4,
+            overflow_policy: str = POLICY_BLOCK
+    ):
+        """
+        :param message_sender: The message sender that sends the queued messages
+        :param high_water_mark: The maximum number of messages in the queue
+        :param worker_count: The number of workers sending messages at the same time
+        :param overflow_policy: What to do when the queue is full: POLICY_BLOCK waits until there is room again,
+            POLICY_DROP drops the message
+        """
+        if overflow_policy not in (self.POLICY_BLOCK, self.POLICY_DROP):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.__message_sender = message_sender
+        self.__high_water_mark = max(high_water_mark, 1)
+        self.__worker_count = max(worker_count, 1)
+        self.__overflow_policy = overflow_policy
+        self.__queue = None
+        self.__workers = []
+        self.__stats = {'queued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'max_depth': 0}
+
+    @property
+    def stats(self) -> dict:
+        """
+        :return: Counters of the queued, sent, failed and dropped messages, the current depth and the max depth
+        """
+        return {**self.__stats, 'depth': self.__queue.qsize() if self.__queue is not None else 0}
+
+    async def add_message(self, template: MessageTemplate, template_data: dict) -> bool:
+        """
+        Put the message in the queue. Blocks or drops the message if the queue is full, depending on the policy.
+
+        :param template: The message template to send
+        :param template_data: The data to substitute in the template
+        :return True if the message was queued, False if it was dropped
+        """
+        queue = self.__get_queue()
+        if self.__overflow_policy == self.POLICY_DROP and queue.full():
+            self.__stats['dropped'] += 1
+            self.metrics.increment('scrapingcord_queue_dropped_total')
+            return False
+
+        await queue.put((template, template_data))
+        self.__stats['queued'] += 1
+        self.__stats['max_depth'] = max(self.__stats['max_depth'], queue.qsize())
+        self.metrics.set_gauge('scrapingcord_queue_depth', queue.qsize())
+        return True
+
+    def set_metrics(self, metrics: Metrics) -> None:
+        """
+        Record the depth of the queue and pass the metrics on to the underlying sender
+
+        :param metrics: The metrics of the run
+        """
+        super().set_metrics(metrics)
+        self.__message_sender.set_metrics(metrics)
+
+    async def prepare(self, templates: list[MessageTemplate]) -> None:
+        """
+        Prepare the underlying sender
+
+        :param templates: The message templates of all implementations
+        """
+        await self.__message_sender.prepare(templates)
+
+    async def drain(self) -> None:
+        """
+        Wait until all queued messages have been handled and stop the workers.
+        Messages added while draining go into a new queue with new workers, so they are not lost.
+        """
+        queue = self.__queue
+        workers = self.__workers
+        self.__queue = None
+        self.__workers = []
+
+        if queue is not None:
+            await queue.join()
+
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        if queue is not None:
+            # Senders that were blocked on the full queue can still put their message after it was joined
+            await asyncio.sleep(0)
+            while not queue.empty():
+                await self.__send(*queue.get_nowait())
+                queue.task_done()
+                await asyncio.sleep(0)
+
+        logging.getLogger('QueuedMessageSender').info(f"Drained message queue: {self.stats}")
+
+    async def flush(self) -> None:
+        """
+        Send all queued messages and flush the underlying sender
+        """
+        await self.drain()
+        await self.__message_sender.flush()
+
+    async def close(self) -> None:
+        """
+        Close the underlying sender
+        """
+        await self.__message_sender.close()
+
+    def __get_queue(self) -> asyncio.Queue:
+        """
+        Lazy getter for the queue, which also starts the workers in the running loop
+
+        :return: The message queue
+        """
+        if self.__queue is None:
+            self.__queue = asyncio.Queue(self.__high_water_mark)
+            self.__workers = [asyncio.create_task(self.__work(self.__queue)) for _ in range(self.__worker_count)]
+
+        return self.__queue
+
+    async def __work(self, queue: asyncio.Queue) -> None:
+        """
+        Worker which keeps sending messages from a queue
+
+        :param queue: The queue of the worker, which stays the same when a drain replaces the queue of the sender
+        """
+        while True:
+            template, template_data = await queue.get()
+            try:
+                await self.__send(template, template_data)
+            finally:
+                queue.task_done()
+                self.metrics.set_gauge('scrapingcord_queue_depth', queue.qsize())
+
+    async def __send(self, template: MessageTemplate, template_data: dict) -> None:
+        """
+        Send a queued message with the underlying sender and count the result
+
+        :param template: The message template to send
+        :param template_data: The data to substitute in the template
+        """
+        try:
+            sent = await self.__message_sender.add_message(template, template_data)
+            self.__stats['sent' if sent else 'failed'] += 1
+        except Exception:
+            logging.getLogger('QueuedMessageSender').exception('Failed sending queued message')
+            self.__stats['failed'] += 1
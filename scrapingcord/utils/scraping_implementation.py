@@ -1,48 +1,152 @@
-from typing import Callable, Union, Iterable
-
-from scrapy import Request
-from scrapy.http import Response
+from typing import Callable, Union, Iterable, Optional, Any, TYPE_CHECKING
 
 from scrapingcord.utils.message_template import MessageTemplate
+from scrapingcord.utils.start_url_source import StartUrls
+
+if TYPE_CHECKING:
+    # Only needed for the annotations, so the utils can be imported without Scrapy
+    from scrapy import Request
+    from scrapy.http import Response
 
 
 class ScrapingImplementation:
     """
     Container for a complete scraper implementation
     """
+    KEY_ID = 'id'
     KEY_URLS = 'urls'
     KEY_PARSER = 'parser'
     KEY_TEMPLATE = 'template'
+    KEY_DEDUP_KEY = 'dedup_key'
+    KEY_DEDUP_RETENTION = 'dedup_retention'
+    KEY_CONDITIONAL_REQUESTS = 'conditional_requests'
+    KEY_POLL_INTERVAL = 'poll_interval'
+    KEY_POLL_JITTER = 'poll_jitter'
+    KEY_MAX_CONCURRENCY = 'max_concurrency'
+    KEY_DOWNLOAD_DELAY = 'download_delay'
+    KEY_AUTOTHROTTLE_TARGET = 'autothrottle_target'
+    KEY_PRIORITY = 'priority'
+    KEY_PARSE_EXECUTOR = 'parse_executor'
+    KEY_WATERMARK_KEY = 'watermark_key'
+
+    # Executors that parsers can be run in, instead of on the thread of the reactor
+    EXECUTOR_THREAD = 'thread'
+    EXECUTOR_PROCESS = 'process'
 
     implementation_id: str
-    start_urls: list[str]
-    parsing_func: Callable[[Response], Union[Iterable[Request], dict]]
+    start_urls: StartUrls
+    parsing_func: Callable[['Response'], Union[Iterable['Request'], dict]]
     message_template: MessageTemplate
+    dedup_key_func: Optional[Callable[[dict], Any]]
+    dedup_retention: Optional[float]
+    conditional_requests: bool
+    poll_interval: Optional[float]
+    poll_jitter: float
+    max_concurrency: Optional[int]
+    download_delay: Optional[float]
+    autothrottle_target: Optional[float]
+    priority: int
+    parse_executor: Optional[str]
+    watermark_key_func: Optional[Callable[[dict], Any]]
 
     def __init__(
             self,
             implementation_id: str,
-            start_urls: list[str],
-            parsing_func: Callable[[Response], Union[Iterable[Request], dict]],
-            message_template: MessageTemplate
+            start_urls: StartUrls,
+            parsing_func: Callable[['Response'], Union[Iterable['Request'], dict]],
+            message_template: MessageTemplate,
+            dedup_key_func: Optional[Callable[[dict], Any]] = None,
+            dedup_retention: Optional[float] = None,
+            conditional_requests: bool = False,
+            poll_interval: Optional[float] = None,
+            poll_jitter: float = 0.0,
+            max_concurrency: Optional[int] = None,
+            download_delay: Optional[float] = None,
+            autothrottle_target: Optional[float] = None,
+            priority: int = 0,
+            parse_executor: Optional[str] = None,
+            watermark_key_func: Optional[Callable[[dict], Any]] = None
     ):
         """
         :param implementation_id: The unique id for this implementation
-        :param start_urls: List of starting urls for this implementation
+        :param start_urls: Starting urls for this implementation. Can be a list, any (async) iterable,
+            a file path or a function returning an (async) iterable, see StartUrlSource
         :param parsing_func: Function used for parsing Scrapy responses. Should follow https://docs.scrapy.org/en/latest/topics/spiders.html#scrapy.Spider.parse but return a dict for the final result
         :param message_template: The message template that this implementation should return
+        :param dedup_key_func: Function returning the JSON serializable part of a parsed dict that identifies it
+            when deduplicating. The whole dict is used if not given
+        :param dedup_retention: Seconds after which an item that has not been seen again is forgotten,
+            None to remember items forever
+        :param conditional_requests: Only parse start urls if they changed since the previous run,
+            requires a ConditionalRequestStore to be registered
+        :param poll_interval: Seconds between the crawls of this implementation when running forever,
+            PingScraper.DEFAULT_POLL_INTERVAL if not given
+        :param poll_jitter: Maximum number of random seconds added to the poll interval
+        :param max_concurrency: Maximum number of concurrent requests for this implementation
+        :param download_delay: Seconds between consecutive requests of this implementation
+        :param autothrottle_target: Average number of parallel requests the delay of this implementation is
+            adjusted to, based on the latency of the responses. The download delay is used as minimum delay
+        :param priority: Priority of the requests of this implementation, higher priorities are downloaded first
+        :param parse_executor: Run the parser in a pool of threads (EXECUTOR_THREAD) or processes (EXECUTOR_PROCESS),
+            so heavy parsing doesn't block downloading and sending. Parsers run in processes get a copy of the response
+            and should be defined at the top level of a module. Asynchronous parsers always run on the reactor
+        :param watermark_key_func: Function returning the ordering key of a parsed dict, like its id or date as number
+            or string, where newer items have higher keys. The highest key of a complete crawl is remembered,
+            requires a WatermarkStore to be registered. Later crawls don't follow the Requests of pages of which all
+            items are at or below it, so paginated listings stop after the pages with new items
         """
+        if parse_executor not in (None, self.EXECUTOR_THREAD, self.EXECUTOR_PROCESS):
+            raise ValueError(f"Unknown parse executor {parse_executor!r}")
+
         self.implementation_id = implementation_id
         self.start_urls = start_urls
         self.parsing_func = parsing_func
         self.message_template = message_template
+        self.dedup_key_func = dedup_key_func
+        self.dedup_retention = dedup_retention
+        self.conditional_requests = conditional_requests
+        self.poll_interval = poll_interval
+        self.poll_jitter = poll_jitter
+        self.max_concurrency = max_concurrency
+        self.download_delay = download_delay
+        self.autothrottle_target = autothrottle_target
+        self.priority = priority
+        self.parse_executor = parse_executor
+        self.watermark_key_func = watermark_key_func
 
     def export(self) -> dict:
         """
         :return: A PingScraper compatible dictionary
         """
         return {
+            self.KEY_ID: self.implementation_id,
             self.KEY_URLS: self.start_urls,
             self.KEY_PARSER: self.parsing_func,
-            self.KEY_TEMPLATE: self.message_template
+            self.KEY_TEMPLATE: self.message_template,
+            self.KEY_DEDUP_KEY: self.dedup_key_func,
+            self.KEY_DEDUP_RETENTION: self.dedup_retention,
+            self.KEY_CONDITIONAL_REQUESTS: self.conditional_requests,
+            self.KEY_POLL_INTERVAL: self.poll_interval,
+            self.KEY_POLL_JITTER: self.poll_jitter,
+            self.KEY_MAX_CONCURRENCY: self.max_concurrency,
+            self.KEY_DOWNLOAD_DELAY: self.download_delay,
+            self.KEY_AUTOTHROTTLE_TARGET: self.autothrottle_target,
+            self.KEY_PRIORITY: self.priority,
+            self.KEY_PARSE_EXECUTOR: self.parse_executor,
+            self.KEY_WATERMARK_KEY: self.watermark_key_func
         }
+
+    @classmethod
+    def get_download_slot(cls, implementation_dict: dict) -> Optional[str]:
+        """
+        Get the downloader slot of an implementation, which only exists if it limits its requests
+
+        :param implementation_dict: A PingScraper compatible dictionary
+        :return: The name of the slot or None if the requests should use the default per-domain slots
+        """
+        if all(implementation_dict.get(key) is None for key in (
+                cls.KEY_MAX_CONCURRENCY, cls.KEY_DOWNLOAD_DELAY, cls.KEY_AUTOTHROTTLE_TARGET
+        )):
+            return None
+
+        return f"implementation:{implementation_dict.get(cls.KEY_ID)}"
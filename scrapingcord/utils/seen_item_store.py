@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+
+
+class SeenItemStore(ABC):
+    """
+    Interface describing a store of item fingerprints that have been seen before, per implementation
+    """
+
+    @abstractmethod
+    def contains(self, implementation_id: str, fingerprint: str) -> bool:
+        """
+        Check whether an item has been seen before, without marking it
+
+        :param implementation_id: The id of the implementation that yielded the item
+        :param fingerprint: The fingerprint of the item
+        :return: True if the item has been seen before, else False
+        """
+        pass
+
+    @abstractmethod
+    def add(self, implementation_id: str, fingerprint: str) -> bool:
+        """
+        Mark an item as seen
+
+        :param implementation_id: The id of the implementation that yielded the item
+        :param fingerprint: The fingerprint of the item
+        :return: True if the item had not been seen before, else False
+        """
+        pass
+
+    @abstractmethod
+    def evict(self, implementation_id: str, last_seen_before: float) -> None:
+        """
+        Forget the items of an implementation which have not been seen since the given time
+
+        :param implementation_id: The id of the implementation
+        :param last_seen_before: Unix timestamp
+        """
+        pass
+
+    def flush(self) -> None:
+        """
+        Persist all pending writes
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Persist everything and release the resources of the store
+        """
+        self.flush()
@@ -0,0 +1,46 @@
+import sqlite3
+from typing import Optional
+
+from scrapingcord.utils.conditional_request_store import ConditionalRequestStore
+
+
+class SqliteConditionalRequestStore(ConditionalRequestStore):
+    """
+    Conditional request store in a SQLite database, so validators are remembered between runs
+    """
+    __connection: sqlite3.Connection
+
+    def __init__(self, path: str):
+        """
+        :param path: Path to the database file, which is created if it doesn't exist
+        """
+        self.__connection = sqlite3.connect(path)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS url_validators ('
+            'implementation_id TEXT NOT NULL, url TEXT NOT NULL, etag TEXT, last_modified TEXT, body_hash TEXT, '
+            'PRIMARY KEY (implementation_id, url)) WITHOUT ROWID'
+        )
+        self.__connection.commit()
+
+    def get(self, implementation_id: str, url: str) -> Optional[dict]:
+        row = self.__connection.execute(
+            'SELECT etag, last_modified, body_hash FROM url_validators WHERE implementation_id = ? AND url = ?',
+            (implementation_id, url)
+        ).fetchone()
+
+        return {'etag': row[0], 'last_modified': row[1], 'body_hash': row[2]} if row is not None else None
+
+    def set(self, implementation_id: str, url: str, validators: dict) -> None:
+        self.__connection.execute(
+            'INSERT OR REPLACE INTO url_validators (implementation_id, url, etag, last_modified, body_hash) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (implementation_id, url, validators.get('etag'), validators.get('last_modified'), validators.get('body_hash'))
+        )
+
+    def flush(self) -> None:
+        self.__connection.commit()
+
+    def close(self) -> None:
+        self.flush()
+        self.__connection.close()
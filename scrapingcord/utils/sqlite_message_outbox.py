@@ -0,0 +1,81 @@
+import sqlite3
+from typing import Iterator
+
+from scrapingcord.utils.message_outbox import MessageOutbox
+from scrapingcord.utils.recipient import Recipient
+
+
+class SqliteMessageOutbox(MessageOutbox):
+    """
+    Message outbox in a SQLite database, so undelivered messages survive crashes and are sent by the next run.
+    Messages are written in batches as they are added and read back in pages, so memory stays bounded
+    by the batch and page sizes.
+    """
+    __connection: sqlite3.Connection
+    __batch_size: int
+    __page_size: int
+    __pending_entries: list[tuple[str, str, str]]
+
+    def __init__(self, path: str, batch_size: int = 500, page_size: int = 500):
+        """
+        :param path: Path to the database file, which is created if it doesn't exist
+        :param batch_size: Number of messages that are written at once
+        :param page_size: Number of messages that are read at once
+        """
+        self.__connection = sqlite3.connect(path)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('PRAGMA synchronous=NORMAL')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'id INTEGER PRIMARY KEY, recipient_id TEXT NOT NULL, recipient_type TEXT NOT NULL, message TEXT NOT NULL)'
+        )
+        self.__connection.execute('CREATE INDEX IF NOT EXISTS outbox_recipient ON outbox (recipient_id, id)')
+        self.__connection.commit()
+        self.__batch_size = max(batch_size, 1)
+        self.__page_size = max(page_size, 1)
+        self.__pending_entries = []
+
+    def add(self, recipient: Recipient, message: str) -> None:
+        self.__pending_entries.append((recipient.recipient_id, recipient.recipient_type, message))
+        if len(self.__pending_entries) >= self.__batch_size:
+            self.flush()
+
+    def get_recipients(self) -> list[Recipient]:
+        self.flush()
+        return [
+            Recipient(recipient_id, recipient_type)
+            for recipient_id, recipient_type in self.__connection.execute(
+                'SELECT DISTINCT recipient_id, recipient_type FROM outbox ORDER BY recipient_id'
+            )
+        ]
+
+    def iterate_entries(self, recipient_id: str) -> Iterator[tuple[int, str]]:
+        self.flush()
+        last_entry_id = 0
+        while True:
+            page = self.__connection.execute(
+                'SELECT id, message FROM outbox WHERE recipient_id = ? AND id > ? ORDER BY id LIMIT ?',
+                (recipient_id, last_entry_id, self.__page_size)
+            ).fetchall()
+            yield from page
+
+            if len(page) < self.__page_size:
+                return
+            last_entry_id = page[-1][0]
+
+    def delete(self, entry_ids: list[int]) -> None:
+        with self.__connection:
+            self.__connection.executemany('DELETE FROM outbox WHERE id = ?', [(entry_id,) for entry_id in entry_ids])
+
+    def flush(self) -> None:
+        if self.__pending_entries:
+            with self.__connection:
+                self.__connection.executemany(
+                    'INSERT INTO outbox (recipient_id, recipient_type, message) VALUES (?, ?, ?)',
+                    self.__pending_entries
+                )
+            self.__pending_entries = []
+
+    def close(self) -> None:
+        self.flush()
+        self.__connection.close()
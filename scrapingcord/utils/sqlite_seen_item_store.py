@@ -0,0 +1,72 @@
+import sqlite3
+import time
+
+from scrapingcord.utils.seen_item_store import SeenItemStore
+
+
+class SqliteSeenItemStore(SeenItemStore):
+    """
+    Seen item store in a SQLite database, so items are remembered between runs.
+    Writes are committed in batches to keep the overhead per item low.
+    """
+    __connection: sqlite3.Connection
+    __batch_size: int
+    __pending_writes: int
+
+    def __init__(self, path: str, batch_size: int = 500):
+        """
+        :param path: Path to the database file, which is created if it doesn't exist
+        :param batch_size: Number of writes after which they are committed
+        """
+        self.__connection = sqlite3.connect(path)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS seen_items ('
+            'implementation_id TEXT NOT NULL, fingerprint TEXT NOT NULL, last_seen REAL NOT NULL, '
+            'PRIMARY KEY (implementation_id, fingerprint)) WITHOUT ROWID'
+        )
+        self.__connection.commit()
+        self.__batch_size = max(batch_size, 1)
+        self.__pending_writes = 0
+
+    def contains(self, implementation_id: str, fingerprint: str) -> bool:
+        return self.__connection.execute(
+            'SELECT 1 FROM seen_items WHERE implementation_id = ? AND fingerprint = ?',
+            (implementation_id, fingerprint)
+        ).fetchone() is not None
+
+    def add(self, implementation_id: str, fingerprint: str) -> bool:
+        now = time.time()
+        is_new = self.__connection.execute(
+            'INSERT OR IGNORE INTO seen_items (implementation_id, fingerprint, last_seen) VALUES (?, ?, ?)',
+            (implementation_id, fingerprint, now)
+        ).rowcount > 0
+
+        # Refresh items that are still being seen, so they don't get evicted
+        if not is_new:
+            self.__connection.execute(
+                'UPDATE seen_items SET last_seen = ? WHERE implementation_id = ? AND fingerprint = ?',
+                (now, implementation_id, fingerprint)
+            )
+
+        self.__pending_writes += 1
+        if self.__pending_writes >= self.__batch_size:
+            self.__connection.commit()
+            self.__pending_writes = 0
+
+        return is_new
+
+    def evict(self, implementation_id: str, last_seen_before: float) -> None:
+        with self.__connection:
+            self.__connection.execute(
+                'DELETE FROM seen_items WHERE implementation_id = ? AND last_seen < ?',
+                (implementation_id, last_seen_before)
+            )
+
+    def flush(self) -> None:
+        self.__connection.commit()
+        self.__pending_writes = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.__connection.close()
@@ -0,0 +1,45 @@
+import json
+import sqlite3
+from typing import Optional, Any
+
+from scrapingcord.utils.watermark_store import WatermarkStore
+
+
+class SqliteWatermarkStore(WatermarkStore):
+    """
+    Watermark store in a SQLite database, so watermarks are remembered between runs.
+    Watermarks are stored as JSON, so they should be numbers or strings to compare the same after loading.
+    """
+    __connection: sqlite3.Connection
+
+    def __init__(self, path: str):
+        """
+        :param path: Path to the database file, which is created if it doesn't exist
+        """
+        self.__connection = sqlite3.connect(path)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS watermarks (implementation_id TEXT PRIMARY KEY, watermark TEXT NOT NULL)'
+        )
+        self.__connection.commit()
+
+    def get(self, implementation_id: str) -> Optional[Any]:
+        row = self.__connection.execute(
+            'SELECT watermark FROM watermarks WHERE implementation_id = ?',
+            (implementation_id,)
+        ).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, implementation_id: str, watermark: Any) -> None:
+        self.__connection.execute(
+            'INSERT OR REPLACE INTO watermarks (implementation_id, watermark) VALUES (?, ?)',
+            (implementation_id, json.dumps(watermark))
+        )
+
+    def flush(self) -> None:
+        self.__connection.commit()
+
+    def close(self) -> None:
+        self.flush()
+        self.__connection.close()
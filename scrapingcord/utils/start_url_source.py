@@ -0,0 +1,75 @@
+import os
+from typing import Union, Iterable, AsyncIterable, Callable, AsyncIterator
+
+StartUrls = Union[
+    str,
+    os.PathLike,
+    Iterable[str],
+    AsyncIterable[str],
+    Callable[[], Union[Iterable[str], AsyncIterable[str]]]
+]
+
+
+class StartUrlSource:
+    """
+    Lazily yields the start urls of an implementation, so they never have to be in memory all at once. Supports:
+    * A single url
+    * A path to a file with one url per line (as pathlib.Path or other os.PathLike), read again for every crawl
+    * Any iterable or async iterable of urls. Iterators and generators are exhausted after the first crawl
+    * A function returning an iterable or async iterable, called again for every crawl
+
+    A source can be split in shards, of which each only yields every n-th url of the underlying urls.
+    """
+    __urls: StartUrls
+    __shard_index: int
+    __shard_count: int
+
+    def __init__(self, urls: StartUrls, shard_index: int = 0, shard_count: int = 1):
+        """
+        :param urls: The start urls in any of the supported forms
+        :param shard_index: The index of the shard of the urls to yield
+        :param shard_count: The number of shards the urls are split in
+        """
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(f"Invalid shard {shard_index} of {shard_count}")
+
+        self.__urls = urls
+        self.__shard_index = shard_index
+        self.__shard_count = shard_count
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        """
+        :return: Async iterator over the urls
+        """
+        return self.__iterate_all() if self.__shard_count == 1 else self.__iterate()
+
+    async def __iterate(self) -> AsyncIterator[str]:
+        """
+        Yield the urls of the shard one by one
+        """
+        index = 0
+        async for url in self.__iterate_all():
+            if index % self.__shard_count == self.__shard_index:
+                yield url
+            index += 1
+
+    async def __iterate_all(self) -> AsyncIterator[str]:
+        """
+        Yield all urls of the source one by one
+        """
+        urls = self.__urls() if callable(self.__urls) else self.__urls
+
+        if isinstance(urls, str):
+            yield urls
+        elif isinstance(urls, os.PathLike):
+            with open(urls) as url_file:
+                for line in url_file:
+                    url = line.strip()
+                    if url and not url.startswith('#'):
+                        yield url
+        elif isinstance(urls, AsyncIterable):
+            async for url in urls:
+                yield url
+        else:
+            for url in urls:
+                yield url
@@ -0,0 +1,41 @@
+from abc import ABC, abstractmethod
+from typing import Optional, Any
+
+
+class WatermarkStore(ABC):
+    """
+    Interface describing a store of the high-water marks of implementations: the highest ordering key of the items
+    of the last complete crawl, used to stop following pages that only contain items that were seen before
+    """
+
+    @abstractmethod
+    def get(self, implementation_id: str) -> Optional[Any]:
+        """
+        Get the watermark of an implementation
+
+        :param implementation_id: The id of the implementation
+        :return: The watermark or None if the implementation has not been crawled completely yet
+        """
+        pass
+
+    @abstractmethod
+    def set(self, implementation_id: str, watermark: Any) -> None:
+        """
+        Store the watermark of an implementation
+
+        :param implementation_id: The id of the implementation
+        :param watermark: The highest ordering key, JSON serializable
+        """
+        pass
+
+    def flush(self) -> None:
+        """
+        Persist all pending writes
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Persist everything and release the resources of the store
+        """
+        self.flush()